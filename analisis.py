@@ -0,0 +1,328 @@
+import math
+import os
+import threading
+import numpy as np
+from datos import ANCHO_NUMERO, RUTA_DATOS, RUTA_HISTORICO, abrir_historico, escritura_atomica, ruta_fuente
+
+# ============ ANÁLISIS DE PATRONES ============
+# Todo el análisis trabaja sobre el arreglo uint8 de dígitos (ver datos.py):
+# frecuencias y transiciones salen de un np.bincount cada una, sin recorrer
+# los dígitos en Python.
+
+def contar_digitos(digitos):
+    """Cantidad de cada dígito 0-9, forma (10,)"""
+    return np.bincount(digitos, minlength=10)
+
+def matriz_transiciones(digitos):
+    """Matriz 10x10: [a, b] = veces que el dígito b sigue al dígito a"""
+    codigos = digitos[:-1] * np.uint8(10) + digitos[1:]  # 0-99, cabe en uint8
+    return np.bincount(codigos, minlength=100).reshape(10, 10)
+
+def frecuencias_desde_conteos(conteos):
+    """[(dígito, cantidad, porcentaje)] de los dígitos presentes, en orden 0-9"""
+    total = int(np.sum(conteos))
+    return [(str(d), int(f), (int(f) / total) * 100)
+            for d, f in enumerate(conteos) if f > 0]
+
+def tabla_frecuencias(digitos):
+    """[(dígito, cantidad, porcentaje)] de los dígitos presentes, en orden 0-9"""
+    return frecuencias_desde_conteos(contar_digitos(digitos))
+
+def primeras_apariciones(codigos, conteos):
+    """
+    Índice de la primera aparición de cada código presente. Se busca en bloques
+    crecientes desde el principio: casi siempre todos aparecen muy pronto.
+    """
+    ausente = len(codigos)
+    primera = np.full(len(conteos), ausente)
+    inicio, bloque = 0, 1024
+    while inicio < len(codigos) and (primera[conteos > 0] == ausente).any():
+        valores, indices = np.unique(codigos[inicio:inicio + bloque], return_index=True)
+        nuevos = primera[valores] == ausente
+        primera[valores[nuevos]] = indices[nuevos] + inicio
+        inicio, bloque = inicio + bloque, bloque * 2
+    return primera
+
+def transiciones_ordenadas(digitos):
+    """
+    [("a->b", cantidad)] de mayor a menor cantidad. Los empates quedan en el
+    orden en que cada transición aparece por primera vez en la serie.
+    """
+    if len(digitos) < 2:
+        return []
+
+    conteos = matriz_transiciones(digitos).ravel()
+    primera = primeras_apariciones(digitos[:-1] * np.uint8(10) + digitos[1:], conteos)
+    return ordenar_transiciones(conteos, primera)
+
+def ordenar_transiciones(conteos, primera):
+    """[("a->b", cantidad)] a partir de los conteos y la primera aparición de cada código"""
+    presentes = np.flatnonzero(conteos)
+    orden = presentes[np.lexsort((primera[presentes], -conteos[presentes]))]
+
+    return [(f"{c // 10}->{c % 10}", int(conteos[c])) for c in orden]
+
+def mediana_desde_conteos(conteos):
+    """Mediana exacta (igual que np.median) a partir de la cantidad de cada dígito"""
+    acumulada = np.cumsum(conteos)
+    n = acumulada[-1]
+    bajo = np.searchsorted(acumulada, (n - 1) // 2, side="right")
+    alto = np.searchsorted(acumulada, n // 2, side="right")
+    return np.float64((bajo + alto) / 2)
+
+def estadisticas_desde_conteos(conteos):
+    """
+    Media, mediana, desviación estándar, mínimo, máximo y rango (sin redondear).
+    Con dígitos enteros los conteos bastan: las sumas se hacen con enteros de
+    Python, así que no acumulan error aunque se vayan sumando datos nuevos.
+    """
+    conteos = [int(c) for c in conteos]
+    total = sum(conteos)
+    suma = sum(d * c for d, c in enumerate(conteos))
+    suma_cuadrados = sum(d * d * c for d, c in enumerate(conteos))
+    presentes = [d for d, c in enumerate(conteos) if c > 0]
+    minimo, maximo = presentes[0], presentes[-1]
+    return {
+        "media": suma / total,
+        "mediana": float(mediana_desde_conteos(conteos)),
+        "desv_estandar": math.sqrt((total * suma_cuadrados - suma * suma) / (total * total)),
+        "minimo": minimo,
+        "maximo": maximo,
+        "rango": maximo - minimo,
+        "total_digitos": total
+    }
+
+def estadisticas_digitos(digitos):
+    """Media, mediana, desviación estándar, mínimo, máximo y rango (sin redondear)"""
+    return estadisticas_desde_conteos(contar_digitos(digitos))
+
+# ============ N-GRAMAS ============
+# Un n-grama de orden k son k dígitos seguidos, codificados como entero
+# (7,1,3 -> 713). Sus conteos se guardan en un arreglo denso de 10^k, de modo
+# que los n-gramas con un prefijo dado ocupan un tramo contiguo del arreglo.
+ORDEN_MAXIMO_NGRAMAS = 5
+MAX_TOP_NGRAMAS = 100
+
+def codigos_ngramas(digitos, orden_maximo=ORDEN_MAXIMO_NGRAMAS):
+    """(orden, código de cada ventana de ese orden), cada orden a partir del anterior"""
+    codigos = digitos.astype(np.int32)
+    yield 1, codigos
+    for orden in range(2, min(orden_maximo, len(digitos)) + 1):
+        codigos = codigos[:-1] * 10 + digitos[orden - 1:]
+        yield orden, codigos
+
+def consultar_ngramas(conteos, orden, prefijo="", top=10):
+    """N-gramas de `orden` que empiezan por `prefijo`, de mayor a menor cantidad"""
+    if not 1 <= orden <= ORDEN_MAXIMO_NGRAMAS:
+        raise ValueError(f"orden debe estar entre 1 y {ORDEN_MAXIMO_NGRAMAS}")
+    if len(prefijo) > orden or not all(c in "0123456789" for c in prefijo):
+        raise ValueError(f"prefijo debe tener como máximo {orden} dígitos")
+    if not 1 <= top <= MAX_TOP_NGRAMAS:
+        raise ValueError(f"top debe estar entre 1 y {MAX_TOP_NGRAMAS}")
+    
+    ancho = 10 ** (orden - len(prefijo))
+    inicio = int(prefijo or 0) * ancho
+    tramo = conteos[inicio:inicio + ancho]
+    total = int(tramo.sum())
+    mayores = np.argsort(-tramo, kind="stable")[:top]  # Empates: menor código primero
+    
+    return {
+        "orden": orden,
+        "prefijo": prefijo,
+        "total": total,
+        "ngramas": [{
+            "ngrama": f"{inicio + i:0{orden}d}",
+            "cantidad": int(tramo[i]),
+            "porcentaje": round((int(tramo[i]) / total) * 100, 2)
+        } for i in mayores if tramo[i] > 0]
+    }
+
+class AnalisisIncremental:
+    """
+    Estado acumulado del análisis: conteos de n-gramas de orden 1 a 5 (el orden
+    1 son los dígitos y el 2 las transiciones) y primera aparición de cada
+    transición. agregar() solo recorre los dígitos nuevos y resultado() se
+    calcula con los conteos, sin la serie completa.
+    """
+    
+    FORMATO = 1  # Versión del archivo .npz de guardar()
+    
+    def __init__(self):
+        self.ngramas = {orden: np.zeros(10 ** orden, dtype=np.int64)
+                        for orden in range(1, ORDEN_MAXIMO_NGRAMAS + 1)}
+        self.primera = np.zeros(100, dtype=np.int64)
+        self.total = 0
+        self.ultimos = np.zeros(0, dtype=np.uint8)  # Cola de la serie para las ventanas que cruzan
+    
+    @property
+    def conteos(self):
+        return self.ngramas[1]
+    
+    @property
+    def transiciones(self):
+        return self.ngramas[2]
+    
+    def agregar(self, digitos):
+        """Sumar al estado los dígitos añadidos al final de la serie"""
+        if len(digitos) == 0:
+            return self
+        
+        # Las ventanas que empiezan en la cola anterior y acaban en dígitos nuevos también cuentan
+        previos = len(self.ultimos)
+        serie = np.concatenate((self.ultimos, digitos))
+        
+        for orden, codigos in codigos_ngramas(serie):
+            nuevos = codigos[max(0, previos - orden + 1):]
+            conteos = np.bincount(nuevos, minlength=10 ** orden)
+            if orden == 2:
+                primera = primeras_apariciones(nuevos, conteos)
+                sin_aparecer = (self.transiciones == 0) & (conteos > 0)
+                self.primera[sin_aparecer] = primera[sin_aparecer] + self.total - min(previos, 1)
+            self.ngramas[orden] += conteos
+        
+        self.total += len(digitos)
+        self.ultimos = serie[-(ORDEN_MAXIMO_NGRAMAS - 1):].copy()
+        return self
+    
+    def resultado(self, top_transiciones=10):
+        """Análisis completo para la API: frecuencia, estadísticas y transiciones más comunes"""
+        estadisticas = estadisticas_desde_conteos(self.conteos)
+        for clave in ("media", "mediana", "desv_estandar"):
+            estadisticas[clave] = round(estadisticas[clave], 2)
+        
+        return {
+            "frecuencia": [{
+                "digito": d,
+                "cantidad": f,
+                "porcentaje": round(p, 2)
+            } for d, f, p in frecuencias_desde_conteos(self.conteos)],
+            "estadisticas": estadisticas,
+            "transiciones": [{
+                "transicion": t,
+                "cantidad": c,
+                "porcentaje": round((c / (self.total - 1)) * 100, 2)
+            } for t, c in ordenar_transiciones(self.transiciones, self.primera)[:top_transiciones]]
+        }
+    
+    def guardar(self, ruta, **metadatos):
+        """Escribir el estado en un .npz (de forma atómica) junto con metadatos escalares"""
+        with escritura_atomica(ruta) as f:
+            np.savez(f, formato=self.FORMATO, primera=self.primera, total=self.total,
+                     ultimos=self.ultimos, **metadatos,
+                     **{f"orden_{orden}": conteos for orden, conteos in self.ngramas.items()})
+    
+    @classmethod
+    def cargar(cls, ruta):
+        """(estado, metadatos) desde un archivo de guardar()"""
+        with np.load(ruta) as datos:
+            if int(datos["formato"]) != cls.FORMATO:
+                raise ValueError(f"{ruta} tiene un formato distinto; se reconstruirá")
+            estado = cls()
+            for orden in estado.ngramas:
+                estado.ngramas[orden] = datos[f"orden_{orden}"]
+            estado.primera = datos["primera"]
+            estado.total = int(datos["total"])
+            estado.ultimos = datos["ultimos"]
+            reservadas = {"formato", "primera", "total", "ultimos"} | \
+                {f"orden_{orden}" for orden in estado.ngramas}
+            metadatos = {k: datos[k].item() for k in datos.files if k not in reservadas}
+        return estado, metadatos
+
+def analizar(digitos, top_transiciones=10):
+    """Análisis completo para la API: frecuencia, estadísticas y transiciones más comunes"""
+    return AnalisisIncremental().agregar(digitos).resultado(top_transiciones)
+
+# ============ CACHÉ POR VERSIÓN DEL HISTÓRICO ============
+RUTA_INDICE = "ngramas.npz"
+
+class AnalisisCacheado:
+    """
+    Análisis del histórico guardado según la versión del CSV (mtime y tamaño)
+    o, si solo se distribuye historico.npz, según la de este.
+    Si el archivo no cambió se devuelve el mismo resultado; si el almacén de
+    dígitos solo creció se procesan únicamente los sorteos nuevos; si se
+    reconstruyó (otra generación) se recalcula todo. El estado, con el índice
+    de n-gramas, se guarda en ruta_indice para no recalcular al reiniciar.
+    """
+    
+    def __init__(self, ruta=RUTA_DATOS, ruta_indice=RUTA_INDICE, top_transiciones=10,
+                 ruta_historico=RUTA_HISTORICO):
+        self.ruta = ruta
+        self.ruta_historico = ruta_historico
+        self.ruta_indice = ruta_indice
+        self.top_transiciones = top_transiciones
+        self.lock = threading.Lock()
+        self.version = None
+        self.analisis = None
+        self.resultado = None
+        self.generacion = None  # Generación del almacén y sorteos ya procesados
+        self.filas = 0
+        self.recalculos = 0
+        self.actualizaciones = 0
+    
+    def _refrescar(self):
+        """Poner el estado al día con el archivo (llamar con el lock tomado)"""
+        fuente = ruta_fuente(self.ruta, self.ruta_historico)
+        estado = os.stat(fuente)
+        version = (fuente, estado.st_mtime_ns, estado.st_size)
+        if version != self.version:
+            if self.analisis is None and self.ruta_indice:
+                self._cargar_indice()
+            self._actualizar()
+            self.version = version
+    
+    def obtener(self):
+        """Resultado del análisis para la versión actual del archivo"""
+        with self.lock:
+            self._refrescar()
+            return self.resultado
+    
+    def consultar_ngramas(self, orden, prefijo="", top=10):
+        """N-gramas de `orden` con ese prefijo en la versión actual del archivo"""
+        with self.lock:
+            self._refrescar()
+            return consultar_ngramas(self.analisis.ngramas.get(orden), orden, prefijo, top)
+    
+    def _cargar_indice(self):
+        if not os.path.exists(self.ruta_indice):
+            return
+        try:
+            self.analisis, metadatos = AnalisisIncremental.cargar(self.ruta_indice)
+            self.generacion = metadatos.get("generacion")
+            self.filas = metadatos.get("filas", 0)
+        except Exception as e:
+            print(f"⚠ No se pudo leer {self.ruta_indice}: {e}")
+            self.analisis, self.generacion, self.filas = None, None, 0
+    
+    def _actualizar(self):
+        almacen = abrir_historico(self.ruta, self.ruta_historico)
+        
+        cambiado = True
+        if self.analisis is not None and almacen.generacion == self.generacion \
+                and almacen.filas >= self.filas:
+            cambiado = almacen.filas > self.filas
+            if cambiado:
+                self.analisis.agregar(almacen.digitos[self.filas * ANCHO_NUMERO:])
+                self.actualizaciones += 1
+        else:
+            self.analisis = AnalisisIncremental().agregar(almacen.digitos)
+            self.recalculos += 1
+        
+        self.generacion, self.filas = almacen.generacion, almacen.filas
+        self.resultado = self.analisis.resultado(self.top_transiciones)
+        
+        if self.ruta_indice and cambiado:
+            try:
+                self.analisis.guardar(self.ruta_indice, generacion=self.generacion, filas=self.filas)
+            except Exception as e:
+                print(f"⚠ No se pudo guardar {self.ruta_indice}: {e}")
+    
+    def estadisticas(self):
+        """Recálculos completos, actualizaciones incrementales y sorteos procesados"""
+        with self.lock:
+            return {
+                "recalculos": self.recalculos,
+                "actualizaciones": self.actualizaciones,
+                "digitos": self.analisis.total if self.analisis else 0,
+                "filas": self.filas
+            }
@@ -1,34 +1,20 @@
 import pandas as pd
-from collections import Counter
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from analisis import estadisticas_digitos, tabla_frecuencias, transiciones_ordenadas
+from datos import abrir_almacen
 
 # ============ 1. VALIDACIÓN DE DATOS ============
-df = pd.read_csv("numeros.csv")
-
-# Validar que la columna existe
-if "numero" not in df.columns:
-    print("Error: La columna 'numero' no existe en el CSV")
-    exit()
-
-# Validar que no hay valores nulos
-if df["numero"].isnull().any():
-    print("Advertencia: Se encontraron valores nulos, removiendo...")
-    df = df.dropna()
-
-todos = "".join(df["numero"].astype(str))
-
-# Validar que solo contiene dígitos
-if not todos.isdigit():
-    print("Advertencia: Se encontraron caracteres no numéricos")
-    todos = ''.join(c for c in todos if c.isdigit())
-
-print(f"✓ Total de dígitos validados: {len(todos)}\n")
+# La ingesta (datos.py) valida cada fila, completa los ceros a la izquierda
+# ('677' -> '0677') y avisa de las filas inválidas que omite
+digitos_validados = abrir_almacen("numeros.csv").digitos
+print(f"✓ Total de dígitos validados: {len(digitos_validados)}\n")
 
 # ============ 2. FRECUENCIA CON PORCENTAJES ============
-frecuencia = Counter(todos)
-total_digitos = len(todos)
+total_digitos = len(digitos_validados)
+tabla = tabla_frecuencias(digitos_validados)
+frecuencia = {d: f for d, f, _ in tabla}
 
 print("=" * 50)
 print("FRECUENCIA DE DÍGITOS")
@@ -37,26 +23,24 @@ print(f"{'Dígito':<8} {'Cantidad':<12} {'Porcentaje':<12}")
 print("-" * 50)
 
 frecuencia_datos = []
-for d in sorted(frecuencia.keys()):
-    f = frecuencia[d]
-    porcentaje = (f / total_digitos) * 100
+for d, f, porcentaje in tabla:
     print(f"{d:<8} {f:<12} {porcentaje:>6.2f}%")
     frecuencia_datos.append({"Dígito": d, "Cantidad": f, "Porcentaje": porcentaje})
 
 print()
 
 # ============ 3. ESTADÍSTICAS DETALLADAS ============
-digitos_numeros = [int(d) for d in todos]
+estadisticas = estadisticas_digitos(digitos_validados)
 
 print("=" * 50)
 print("ESTADÍSTICAS")
 print("=" * 50)
-print(f"Media: {np.mean(digitos_numeros):.2f}")
-print(f"Mediana: {np.median(digitos_numeros):.2f}")
-print(f"Desv. Estándar: {np.std(digitos_numeros):.2f}")
-print(f"Mín: {np.min(digitos_numeros)}")
-print(f"Máx: {np.max(digitos_numeros)}")
-print(f"Rango: {np.max(digitos_numeros) - np.min(digitos_numeros)}")
+print(f"Media: {estadisticas['media']:.2f}")
+print(f"Mediana: {estadisticas['mediana']:.2f}")
+print(f"Desv. Estándar: {estadisticas['desv_estandar']:.2f}")
+print(f"Mín: {estadisticas['minimo']}")
+print(f"Máx: {estadisticas['maximo']}")
+print(f"Rango: {estadisticas['rango']}")
 print()
 
 # ============ 4. ANÁLISIS DE TRANSICIONES (Secuencias) ============
@@ -64,17 +48,12 @@ print("=" * 50)
 print("ANÁLISIS DE TRANSICIONES (Qué dígito sigue a cuál)")
 print("=" * 50)
 
-transiciones = {}
-for i in range(len(todos) - 1):
-    par = todos[i] + "->" + todos[i+1]
-    transiciones[par] = transiciones.get(par, 0) + 1
-
-transiciones_ordenadas = sorted(transiciones.items(), key=lambda x: x[1], reverse=True)
+transiciones = transiciones_ordenadas(digitos_validados)
 print(f"Top 15 transiciones más frecuentes:\n")
 print(f"{'Transición':<12} {'Cantidad':<12} {'Porcentaje':<12}")
 print("-" * 50)
 
-for transicion, count in transiciones_ordenadas[:15]:
+for transicion, count in transiciones[:15]:
     porcentaje = (count / (total_digitos - 1)) * 100
     print(f"{transicion:<12} {count:<12} {porcentaje:>6.2f}%")
 
@@ -87,7 +66,7 @@ print("✓ Frecuencias exportadas a: analisis_frecuencia.csv")
 
 df_transiciones = pd.DataFrame([
     {"Transición": k, "Cantidad": v, "Porcentaje": (v/(total_digitos-1))*100} 
-    for k, v in transiciones_ordenadas
+    for k, v in transiciones
 ])
 df_transiciones.to_csv("analisis_transiciones.csv", index=False)
 print("✓ Transiciones exportadas a: analisis_transiciones.csv\n")
@@ -115,7 +94,7 @@ ax2.set_title("Distribución Porcentual")
 
 # Gráfico 3: Top 10 transiciones
 ax3 = axes[1, 0]
-top_transiciones = transiciones_ordenadas[:10]
+top_transiciones = transiciones[:10]
 trans_labels = [t[0] for t in top_transiciones]
 trans_counts = [t[1] for t in top_transiciones]
 ax3.barh(range(len(trans_labels)), trans_counts, color=plt.cm.plasma(np.linspace(0, 1, len(trans_labels))))
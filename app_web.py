@@ -1,144 +1,291 @@
-from flask import Flask, render_template, jsonify, request
-import numpy as np
-import pickle
-from tensorflow.keras.models import load_model
-import pandas as pd
-from collections import Counter
+import time
+INICIO_PROCESO = time.perf_counter()  # Referencia para medir el arranque
+
+from flask import Flask, Response, render_template, jsonify, make_response, request
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+from datetime import datetime, timezone
+import functools
+import gzip
+import hashlib
+import io
 import json
-import random
+import os
+import queue
+import threading
 from database import *
+from analisis import AnalisisCacheado
+from datos import ruta_fuente
 from metricas import ModelMetrics
+from inferencia import obtener_motor, BACKEND_INFERENCIA, MAX_CANDIDATOS, MAX_TOP_K
 
 app = Flask(__name__)
 
+# ============ CONFIGURACIÓN DEL AGRUPADOR ============
+AGRUPADOR_VENTANA_MS = float(os.environ.get("AGRUPADOR_VENTANA_MS", 2))
+AGRUPADOR_MAX_LOTE = int(os.environ.get("AGRUPADOR_MAX_LOTE", 64))
+AGRUPADOR_TIMEOUT_S = float(os.environ.get("AGRUPADOR_TIMEOUT_S", 10))  # Espera máxima por petición
+
+# Carga del modelo: "segundo_plano" (hilo de calentamiento al arrancar),
+# "perezosa" (en la primera predicción) o "inmediata" (antes de servir)
+MODO_CARGA = os.environ.get("MODO_CARGA", "segundo_plano")
+
+class AgrupadorNoDisponible(RuntimeError):
+    """El agrupador no respondió a tiempo o su hilo ya no está en marcha"""
+
+class AgrupadorPeticiones:
+    """
+    Agrupa las peticiones de predicción concurrentes en un solo lote.
+    Un hilo espera la primera petición, reúne las que lleguen durante la
+    ventana (o hasta completar max_lote candidatos), ejecuta una única
+    generación por lotes y reparte a cada llamador sus propios candidatos.
+    """
+    
+    def __init__(self, motor, ventana_ms=AGRUPADOR_VENTANA_MS, max_lote=AGRUPADOR_MAX_LOTE,
+                 timeout_s=AGRUPADOR_TIMEOUT_S):
+        self.motor = motor
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self.timeout = timeout_s
+        self.cola = queue.Queue()
+        self.lock = threading.Lock()
+        self.peticiones_atendidas = 0
+        self.lotes_ejecutados = 0
+        self.candidatos_generados = 0
+        self.lote_maximo = 0
+        self.peticiones_agotadas = 0
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+    
+    def enviar(self, n=1):
+        """Encolar una petición de n candidatos y esperar su resultado (como mucho self.timeout)"""
+        if not self.hilo.is_alive():
+            raise AgrupadorNoDisponible("El hilo del agrupador se detuvo")
+        futuro = Future()
+        self.cola.put((n, futuro))
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TiempoAgotado:
+            futuro.cancel()  # Si aún no entró en un lote, ya no se genera
+            with self.lock:
+                self.peticiones_agotadas += 1
+            raise AgrupadorNoDisponible(f"Sin respuesta del agrupador en {self.timeout} s") from None
+    
+    def _reunir_lote(self):
+        """Bloquear hasta la primera petición y reunir las que lleguen en la ventana"""
+        pendientes = [self.cola.get()]
+        total = pendientes[0][0]
+        limite = time.perf_counter() + self.ventana
+        
+        while total < self.max_lote:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                peticion = self.cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            pendientes.append(peticion)
+            total += peticion[0]
+        
+        return pendientes, total
+    
+    def _bucle(self):
+        while True:
+            pendientes, total = self._reunir_lote()
+            # Las peticiones que ya se rindieron (cancelado su futuro) no se generan
+            pendientes = [(n, futuro) for n, futuro in pendientes if futuro.set_running_or_notify_cancel()]
+            total = sum(n for n, _ in pendientes)
+            if not pendientes:
+                continue
+            try:
+                candidatos = self.motor.generar_lote(total)
+            except Exception as e:
+                for _, futuro in pendientes:
+                    futuro.set_exception(e)
+                continue
+            
+            # Repartir a cada llamador su porción del lote
+            inicio = 0
+            for n, futuro in pendientes:
+                futuro.set_result(candidatos[inicio:inicio + n])
+                inicio += n
+            
+            with self.lock:
+                self.peticiones_atendidas += len(pendientes)
+                self.lotes_ejecutados += 1
+                self.candidatos_generados += total
+                self.lote_maximo = max(self.lote_maximo, total)
+    
+    def estadisticas(self):
+        """Profundidad de cola y tamaños de lote"""
+        with self.lock:
+            lotes = self.lotes_ejecutados
+            return {
+                "profundidad_cola": self.cola.qsize(),
+                "peticiones_atendidas": self.peticiones_atendidas,
+                "lotes_ejecutados": lotes,
+                "candidatos_generados": self.candidatos_generados,
+                "peticiones_por_lote": round(self.peticiones_atendidas / lotes, 2) if lotes else 0,
+                "tamano_medio_lote": round(self.candidatos_generados / lotes, 2) if lotes else 0,
+                "tamano_maximo_lote": self.lote_maximo,
+                "peticiones_agotadas": self.peticiones_agotadas,
+                "ventana_ms": self.ventana * 1000,
+                "max_lote": self.max_lote,
+                "timeout_s": self.timeout
+            }
+
 # ============ CARGAR MODELO Y DATOS ============
+agrupador = None
+modelo_listo = threading.Event()
+_lock_modelo = threading.Lock()
+tiempos_arranque = {}
+
+def cargar_modelo():
+    """Cargar motor y agrupador una sola vez; las rutas sin modelo no esperan por esto"""
+    global agrupador
+    with _lock_modelo:
+        if agrupador is None:
+            agrupador = AgrupadorPeticiones(obtener_motor())
+            tiempos_arranque["modelo_listo"] = round(time.perf_counter() - INICIO_PROCESO, 3)
+            modelo_listo.set()
+            print(f"✓ Modelo cargado exitosamente ({tiempos_arranque['modelo_listo']:.2f} s)")
+    return agrupador
+
+def calentar_modelo():
+    """Cargar el modelo en segundo plano"""
+    try:
+        cargar_modelo()
+    except Exception as e:
+        print(f"Error cargando modelo: {e}")
+
 try:
-    model = load_model("modelo_lstm.keras", compile=False)
-    scaler = pickle.load(open("scaler.pkl", "rb"))
-    df = pd.read_csv("numeros.csv")
+    cache_analisis = AnalisisCacheado()
+    cache_analisis.obtener()
     metrics = ModelMetrics()
-    print("✓ Modelo cargado exitosamente")
     print(f"✓ Confianza general: {metrics.calcular_confianza_general()}%")
 except Exception as e:
-    print(f"Error cargando modelo: {e}")
+    print(f"Error cargando datos: {e}")
+
+if MODO_CARGA == "inmediata":
+    calentar_modelo()
+elif MODO_CARGA == "segundo_plano":
+    threading.Thread(target=calentar_modelo, daemon=True).start()
 
 # Inicializar BD
 inicializar_bd()
 
 # Variable global para almacenar la última predicción
-ultima_entrada_global = None
 ultima_prediccion = None
 
+@app.after_request
+def registrar_primera_respuesta(response):
+    """Medir el tiempo desde el arranque hasta la primera respuesta servida"""
+    if "primera_respuesta" not in tiempos_arranque:
+        tiempos_arranque["primera_respuesta"] = round(time.perf_counter() - INICIO_PROCESO, 3)
+        print(f"✓ Primera respuesta a los {tiempos_arranque['primera_respuesta']:.2f} s")
+    return response
+
+# ============ CACHÉ HTTP ============
+# Las rutas de solo lectura llevan ETag y Last-Modified calculados a partir de
+# la versión de sus datos; si el cliente ya tiene esa versión se responde 304
+# sin recalcular nada.
+ARCHIVOS_VERSIONADOS = {
+    "csv": "numeros.csv",
+    "metricas": "metricas_modelo.json",
+}
+MIN_BYTES_GZIP = 500  # Respuestas más pequeñas no compensan comprimirse
+
+def version_datos(fuentes):
+    """Clave de versión y fecha de última modificación de las fuentes ('bd', 'csv', 'metricas')"""
+    claves, fechas = [], []
+    for fuente in fuentes:
+        if fuente == "bd":
+            version, modificado = obtener_version_bd()
+            claves.append(f"bd:{version}")
+            fechas.append(datetime.fromisoformat(modificado).replace(tzinfo=timezone.utc))
+        else:
+            ruta = ARCHIVOS_VERSIONADOS[fuente]
+            if fuente == "csv":
+                ruta = ruta_fuente(ruta)  # historico.npz si no se distribuye el CSV
+            estado = os.stat(ruta)
+            claves.append(f"{fuente}:{estado.st_mtime_ns}:{estado.st_size}")
+            fechas.append(datetime.fromtimestamp(estado.st_mtime, timezone.utc))
+    return "|".join(claves), max(fechas)
+
+def cache_por_version(*fuentes):
+    """Decorador de rutas GET: ETag/Last-Modified por versión de datos y 304 sin recalcular"""
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            version, modificado = version_datos(fuentes)
+            # La consulta forma parte de la clave: cada página del historial es distinta
+            etag = hashlib.sha1(f"{request.full_path}|{version}".encode()).hexdigest()
+            
+            if request.if_none_match:
+                sin_cambios = request.if_none_match.contains_weak(etag)
+            else:
+                sin_cambios = bool(request.if_modified_since) and \
+                    modificado.replace(microsecond=0) <= request.if_modified_since
+            
+            if sin_cambios:
+                response = Response(status=304)
+            else:
+                response = make_response(vista(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            # ETag débil: el mismo contenido se sirve con o sin gzip
+            response.set_etag(etag, weak=True)
+            response.last_modified = modificado
+            response.cache_control.no_cache = True  # Revalidar siempre, pero reutilizar si no cambió
+            return response
+        return envoltura
+    return decorador
+
+@app.after_request
+def comprimir_respuesta(response):
+    """Comprimir con gzip las respuestas JSON si el cliente lo acepta"""
+    if ('gzip' not in request.headers.get('Accept-Encoding', '')
+            or response.status_code != 200
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+    
+    datos = response.get_data()
+    if len(datos) < MIN_BYTES_GZIP:
+        return response
+    
+    response.set_data(gzip.compress(datos, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 # ============ FUNCIONES AUXILIARES ============
 def obtener_predicciones():
     """Genera 4 predicciones usando el modelo LSTM con variabilidad"""
-    global ultima_entrada_global
-    
     try:
-        numeros = df["numero"].astype(str)
-        data = []
-        for n in numeros:
-            data.extend([int(d) for d in n])
-        
-        data = np.array(data).reshape(-1, 1)
-        data = scaler.transform(data)
-        
-        # Seleccionar un punto aleatorio de los últimos 20 dígitos para más variabilidad
-        inicio_aleatorio = max(0, len(data) - random.randint(5, 20))
-        entrada_inicial = data[inicio_aleatorio:inicio_aleatorio + 5]
-        
-        # Si no hay suficientes dígitos, usar los últimos 5
-        if len(entrada_inicial) < 5:
-            entrada_inicial = data[-5:]
-        
-        entrada_temporal = entrada_inicial.reshape(1, 5, 1)
-        
-        predicciones = []
-        
-        for i in range(4):
-            # Obtener predicción del modelo
-            pred = model.predict(entrada_temporal, verbose=0)
-            
-            # Aplicar temperature sampling para variabilidad
-            # Convertir predicción normalizada a escala original
-            pred_valor = scaler.inverse_transform(pred)[0][0]
-            
-            # Añadir ruido gaussiano pequeño para variabilidad
-            ruido = np.random.normal(0, 0.5)
-            pred_valor_ruidoso = pred_valor + ruido
-            
-            # Asegurar que está en rango [0, 9]
-            pred_valor_ruidoso = np.clip(pred_valor_ruidoso, 0, 9)
-            
-            # Redondear al dígito más cercano
-            digito = int(np.round(pred_valor_ruidoso))
-            digito = np.clip(digito, 0, 9)
-            
-            predicciones.append(digito)
-            
-            # Preparar entrada para siguiente predicción
-            digito_escalado = scaler.transform(np.array([[digito]]))[0][0]
-            entrada_temporal = np.append(entrada_temporal[:, 1:, :], 
-                                        np.array([[[digito_escalado]]]), axis=1)
-        
-        # Guardar la última entrada para referencia
-        ultima_entrada_global = entrada_temporal.copy()
-        
-        return ''.join(map(str, predicciones))
+        return cargar_modelo().enviar(1)[0]
     except Exception as e:
         return f"Error: {e}"
 
 def obtener_analisis():
-    """Calcula análisis de patrones"""
+    """Análisis de patrones de la versión actual de numeros.csv (cacheado)"""
     try:
-        todos = "".join(df["numero"].astype(str))
-        frecuencia = Counter(todos)
-        total_digitos = len(todos)
-        
-        # Frecuencia con porcentajes
-        frecuencia_datos = []
-        for d in sorted(frecuencia.keys()):
-            f = frecuencia[d]
-            porcentaje = (f / total_digitos) * 100
-            frecuencia_datos.append({
-                "digito": d,
-                "cantidad": f,
-                "porcentaje": round(porcentaje, 2)
-            })
-        
-        # Estadísticas
-        digitos_numeros = [int(d) for d in todos]
-        estadisticas = {
-            "media": round(np.mean(digitos_numeros), 2),
-            "mediana": round(np.median(digitos_numeros), 2),
-            "desv_estandar": round(np.std(digitos_numeros), 2),
-            "minimo": int(np.min(digitos_numeros)),
-            "maximo": int(np.max(digitos_numeros)),
-            "rango": int(np.max(digitos_numeros) - np.min(digitos_numeros)),
-            "total_digitos": total_digitos
-        }
-        
-        # Transiciones
-        transiciones = {}
-        for i in range(len(todos) - 1):
-            par = todos[i] + "->" + todos[i+1]
-            transiciones[par] = transiciones.get(par, 0) + 1
-        
-        transiciones_ordenadas = sorted(transiciones.items(), key=lambda x: x[1], reverse=True)[:10]
-        transiciones_datos = [{
-            "transicion": k,
-            "cantidad": v,
-            "porcentaje": round((v / (total_digitos - 1)) * 100, 2)
-        } for k, v in transiciones_ordenadas]
-        
-        return {
-            "frecuencia": frecuencia_datos,
-            "estadisticas": estadisticas,
-            "transiciones": transiciones_datos
-        }
+        return cache_analisis.obtener()
     except Exception as e:
         return {"error": str(e)}
 
+def parametro_entero(nombre, defecto):
+    """?nombre= como entero; ValueError si viene y no lo es"""
+    valor = request.args.get(nombre)
+    if valor is None:
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número entero, no '{valor}'") from None
+
 # ============ RUTAS ============
 @app.route("/")
 def home():
@@ -150,7 +297,16 @@ def home():
 def api_prediccion():
     global ultima_prediccion
     try:
-        prediccion = obtener_predicciones()
+        n = parametro_entero('n', 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if n < 1 or n > MAX_CANDIDATOS:
+        return jsonify({"error": f"n debe estar entre 1 y {MAX_CANDIDATOS}"}), 400
+    if n > 1:
+        return api_prediccion_lote(n)
+    
+    try:
+        prediccion = cargar_modelo().enviar(1)[0]
         confianza = metrics.calcular_confianza_general()
         
         # Calcular confianza individual
@@ -159,45 +315,205 @@ def api_prediccion():
         else:
             confianza_individual = confianza
         
-        # Guardar en BD
-        guardar_prediccion(prediccion, confianza_individual)
+        # Guardar en BD: al momento (devuelve el ID) o en la cola del escritor
+        # diferido (devuelve el ID de correlación, propio o enviado por el cliente)
+        if MODO_PERSISTENCIA == "diferida":
+            correlacion = request.headers.get('X-Correlation-ID')
+            referencia = {"correlacion": guardar_predicciones_diferidas(
+                [prediccion], confianza_individual,
+                correlaciones=[correlacion] if correlacion else None)[0]}
+        else:
+            referencia = {"id": guardar_prediccion(prediccion, confianza_individual)}
         
         ultima_prediccion = prediccion
         
         print(f"✓ Predicción generada: {prediccion} (Confianza: {confianza_individual}%)")
         response = jsonify({
             "prediccion": str(prediccion),
-            "confianza": round(confianza_individual, 2)
+            "confianza": round(confianza_individual, 2),
+            **referencia
         })
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response
+    except CorrelacionDuplicada as e:
+        return jsonify({"error": str(e)}), 409
+    except AgrupadorNoDisponible as e:
+        print(f"⚠ /api/prediccion: {e}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         print(f"✗ Error en /api/prediccion: {e}")
         return jsonify({"error": str(e)}), 500
 
+def api_prediccion_lote(n):
+    """Generar n candidatos en un solo lote (4 llamadas al modelo en total)"""
+    try:
+        candidatos = cargar_modelo().enviar(n)
+        confianza = metrics.calcular_confianza_general()
+        
+        # Guardar en BD en una sola transacción, o encolar para el escritor diferido
+        referencia = {}
+        if MODO_PERSISTENCIA == "diferida":
+            referencia["correlaciones"] = guardar_predicciones_diferidas(candidatos, confianza)
+        else:
+            guardar_predicciones(candidatos, confianza)
+        
+        print(f"✓ {n} candidatos generados (Confianza: {confianza}%)")
+        response = jsonify({
+            "predicciones": candidatos,
+            "confianza": round(confianza, 2),
+            **referencia
+        })
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+    except AgrupadorNoDisponible as e:
+        print(f"⚠ /api/prediccion?n={n}: {e}")
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        print(f"✗ Error en /api/prediccion?n={n}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/prediccion/top")
+def api_prediccion_top():
+    """Endpoint con las k secuencias de 4 dígitos más probables y su puntuación"""
+    try:
+        k = parametro_entero('k', 10)
+        haz = parametro_entero('haz', None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if k < 1 or k > MAX_TOP_K:
+        return jsonify({"error": f"k debe estar entre 1 y {MAX_TOP_K}"}), 400
+    if haz is not None and haz < k:
+        return jsonify({"error": "haz debe ser mayor o igual que k"}), 400
+    
+    try:
+        secuencias = cargar_modelo().motor.puntuar_secuencias(k, haz)
+        response = jsonify({"secuencias": secuencias})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+    except Exception as e:
+        print(f"✗ Error en /api/prediccion/top: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/agrupador")
+def api_agrupador():
+    """Endpoint con estadísticas del agrupador de peticiones"""
+    if not modelo_listo.is_set():
+        return jsonify({"modelo_listo": False})
+    return jsonify(agrupador.estadisticas())
+
+@app.route("/api/prediccion/correlacion/<correlacion>")
+def api_prediccion_correlacion(correlacion):
+    """Endpoint que resuelve un ID de correlación al ID de la predicción guardada"""
+    prediccion_id = obtener_prediccion_por_correlacion(correlacion)
+    if prediccion_id is None:
+        return jsonify({"correlacion": correlacion, "guardada": False}), 404
+    return jsonify({"correlacion": correlacion, "guardada": True, "id": prediccion_id})
+
+@app.route("/api/escritor")
+def api_escritor():
+    """Endpoint con estadísticas del escritor diferido de predicciones"""
+    if MODO_PERSISTENCIA != "diferida":
+        return jsonify({"modo_persistencia": MODO_PERSISTENCIA})
+    return jsonify({"modo_persistencia": MODO_PERSISTENCIA, **obtener_escritor().estadisticas()})
+
+@app.route("/api/estado")
+def api_estado():
+    """Endpoint de disponibilidad: indica si el modelo ya está cargado"""
+    listo = modelo_listo.is_set()
+    response = jsonify({
+        "modelo_listo": listo,
+        "backend": BACKEND_INFERENCIA,
+        "modo_carga": MODO_CARGA,
+        "segundos_activo": round(time.perf_counter() - INICIO_PROCESO, 3),
+        "segundos_primera_respuesta": tiempos_arranque.get("primera_respuesta"),
+        "segundos_modelo_listo": tiempos_arranque.get("modelo_listo")
+    })
+    return response, 200 if listo else 503
+
 @app.route("/api/analisis")
+@cache_por_version("csv")
 def api_analisis():
     analisis = obtener_analisis()
     return jsonify(analisis)
 
+@app.route("/api/ngramas")
+@cache_por_version("csv")
+def api_ngramas():
+    """Endpoint con los n-gramas (orden 1-5) que empiezan por ?prefijo=, de mayor a menor"""
+    try:
+        orden = parametro_entero('orden', 2)
+        top = parametro_entero('top', 10)
+        return jsonify(cache_analisis.consultar_ngramas(orden, request.args.get('prefijo', ''), top))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/metricas")
+@cache_por_version("metricas")
 def api_metricas():
     """Endpoint para obtener métricas del modelo"""
+    # El ETag sale del archivo actual: servir también su contenido, no el del arranque
+    metrics.refrescar()
     return jsonify(metrics.obtener_reporte_json())
 
+def leer_pagina(obtener_pagina):
+    """Responder una página de obtener_pagina según ?limite= y ?cursor="""
+    try:
+        limite = parametro_entero('limite', 10)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if limite < 1 or limite > MAX_PAGINA:
+        return jsonify({"error": f"limite debe estar entre 1 y {MAX_PAGINA}"}), 400
+    
+    try:
+        return jsonify(obtener_pagina(limite, request.args.get('cursor')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def exportar_ndjson(obtener_pagina, clave):
+    """Respuesta en streaming con una fila JSON por línea"""
+    lineas = (json.dumps(fila, ensure_ascii=False) + "\n"
+              for fila in exportar_todo(obtener_pagina, clave))
+    return Response(lineas, mimetype="application/x-ndjson")
+
 @app.route("/api/historial")
+@cache_por_version("bd")
 def api_historial():
-    """Endpoint para obtener historial de predicciones"""
-    limite = request.args.get('limite', 10, type=int)
-    historial = obtener_ultimas_predicciones(limite)
-    return jsonify({"predicciones": historial})
+    """Endpoint para obtener historial de predicciones, paginado por cursor"""
+    return leer_pagina(obtener_pagina_predicciones)
+
+@app.route("/api/historial/exportar")
+def api_historial_exportar():
+    """Endpoint que exporta todas las predicciones en NDJSON"""
+    return exportar_ndjson(obtener_pagina_predicciones, "predicciones")
+
+@app.route("/api/comparaciones")
+@cache_por_version("bd")
+def api_comparaciones():
+    """Endpoint para obtener historial de comparaciones, paginado por cursor"""
+    return leer_pagina(obtener_pagina_comparaciones)
+
+@app.route("/api/comparaciones/exportar")
+def api_comparaciones_exportar():
+    """Endpoint que exporta todas las comparaciones en NDJSON"""
+    return exportar_ndjson(obtener_pagina_comparaciones, "comparaciones")
 
 @app.route("/api/estadisticas-bd")
+@cache_por_version("bd")
 def api_estadisticas_bd():
     """Endpoint para obtener estadísticas de la BD"""
     stats = obtener_estadisticas_generales()
     return jsonify(stats)
 
+@app.route("/api/aciertos-posicion")
+@cache_por_version("bd")
+def api_aciertos_posicion():
+    """Endpoint con el porcentaje de acierto de cada posición (millares a unidades)"""
+    return jsonify(obtener_aciertos_por_posicion())
+
 @app.route("/api/resultado-real", methods=['POST'])
 def api_resultado_real():
     """Endpoint para guardar resultado real (ganador)"""
@@ -214,6 +530,39 @@ def api_resultado_real():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/resultados-reales", methods=['POST'])
+def api_resultados_reales():
+    """
+    Endpoint de carga masiva de resultados reales (upsert por fecha).
+    Acepta un arreglo JSON [{fecha, numeros}, ...], un archivo CSV en el
+    campo 'archivo' o un cuerpo text/csv con columnas 'numero,fecha'.
+    """
+    try:
+        if request.is_json:
+            data = request.json
+            if not isinstance(data, list):
+                return jsonify({"error": "Se esperaba un arreglo JSON"}), 400
+            filas = ((d.get('fecha'), d.get('numeros')) if isinstance(d, dict) else (None, None)
+                     for d in data)
+        elif 'archivo' in request.files:
+            archivo = io.TextIOWrapper(request.files['archivo'].stream, encoding="utf-8-sig",
+                                       errors="replace", newline="")
+            filas = leer_resultados_csv(archivo)
+        elif request.mimetype == 'text/csv':
+            filas = leer_resultados_csv(io.StringIO(request.get_data().decode("utf-8-sig", errors="replace"),
+                                                    newline=""))
+        else:
+            return jsonify({"error": "Envía JSON, un archivo CSV o text/csv"}), 415
+        
+        resumen = guardar_resultados_reales(filas)
+        return jsonify({"success": True, **resumen})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        # Error de la BD: no se guardó nada
+        print(f"✗ Error al guardar resultados: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/comparar", methods=['POST'])
 def api_comparar():
     """Endpoint para comparar predicción con resultado"""
@@ -230,5 +579,13 @@ def api_comparar():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/comparar/pendientes", methods=['POST'])
+def api_comparar_pendientes():
+    """Endpoint para comparar todas las predicciones pendientes con su resultado"""
+    resumen = comparar_pendientes()
+    if resumen is None:
+        return jsonify({"error": "No se pudieron comparar las predicciones"}), 500
+    return jsonify(resumen)
+
 if __name__ == "__main__":
     app.run(debug=True, host="127.0.0.1", port=5000)
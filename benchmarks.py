@@ -0,0 +1,692 @@
+import sys
+import time
+import numpy as np
+
+# ============ UTILIDADES ============
+def medir(funcion, repeticiones):
+    """Ejecutar una función varias veces y devolver la media en milisegundos"""
+    funcion()  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+def mostrar(nombre, ms):
+    print(f"{nombre:<40} {ms:>10.3f} ms")
+
+# ============ INFERENCIA ============
+def benchmark_inferencia(repeticiones=50):
+    """Comparar el bucle con model.predict contra los backends del motor"""
+    import pickle
+    from tensorflow.keras.models import load_model
+    from inferencia import cargar_motor, VENTANA, DIGITOS_PREDICHOS
+
+    model = load_model("modelo_lstm.keras", compile=False)
+    scaler = pickle.load(open("scaler.pkl", "rb"))
+    motor_keras = cargar_motor("keras")
+    motor_numpy = cargar_motor("numpy")
+    motor_tabla = cargar_motor("tabla")
+    entrada = scaler.transform(motor_keras.digitos[-VENTANA:].reshape(-1, 1)).reshape(1, VENTANA, 1)
+
+    def bucle_predict():
+        # Bucle anterior de obtener_predicciones: 4 llamadas a model.predict
+        entrada_temporal = entrada
+        for _ in range(DIGITOS_PREDICHOS):
+            pred = model.predict(entrada_temporal, verbose=0)
+            digito = int(np.clip(np.round(scaler.inverse_transform(pred)[0][0]), 0, 9))
+            digito_escalado = scaler.transform(np.array([[digito]]))[0][0]
+            entrada_temporal = np.append(entrada_temporal[:, 1:, :],
+                                         np.array([[[digito_escalado]]]), axis=1)
+
+    print("=" * 60)
+    print("INFERENCIA (una predicción de 4 dígitos)")
+    print("=" * 60)
+    antes = medir(bucle_predict, repeticiones)
+    keras = medir(motor_keras.generar, repeticiones)
+    numpy = medir(motor_numpy.generar, repeticiones)
+    tabla = medir(motor_tabla.generar, repeticiones)
+    mostrar("model.predict x4", antes)
+    mostrar("Llamada compilada (backend keras)", keras)
+    mostrar("Backend numpy", numpy)
+    mostrar("Backend tabla", tabla)
+    print(f"Aceleración keras: {antes / keras:.1f}x, numpy: {antes / numpy:.1f}x, "
+          f"tabla: {antes / tabla:.1f}x\n")
+
+def benchmark_arranque():
+    """Tiempo y memoria para construir el motor con cada backend (procesos nuevos)"""
+    import subprocess
+
+    codigo = (
+        "import time; t = time.perf_counter(); "
+        "from inferencia import cargar_motor; m = cargar_motor('{}'); m.generar(); "
+        "pico = [l for l in open('/proc/self/status') if l.startswith('VmHWM')][0]; "
+        "print(time.perf_counter() - t, pico.split()[1])"
+    )
+
+    print("=" * 60)
+    print("ARRANQUE (importar + cargar motor + primera predicción)")
+    print("=" * 60)
+    for backend in ("keras", "numpy", "tabla"):
+        salida = subprocess.run([sys.executable, "-c", codigo.format(backend)],
+                                capture_output=True, text=True).stdout.split()
+        segundos, rss_kb = float(salida[-2]), int(salida[-1])
+        print(f"{backend:<10} {segundos:>8.2f} s {rss_kb / 1024:>10.1f} MB RSS")
+    print()
+
+def benchmark_arranque_web():
+    """Segundos hasta la primera respuesta de una ruta sin modelo (/api/historial)"""
+    import os
+    import subprocess
+
+    codigo = (
+        "import time; t = time.perf_counter(); import app_web; "
+        "app_web.app.test_client().get('/api/historial'); "
+        "print(time.perf_counter() - t)"
+    )
+
+    print("=" * 60)
+    print("ARRANQUE WEB (backend keras, hasta responder /api/historial)")
+    print("=" * 60)
+    for modo in ("inmediata", "segundo_plano"):
+        entorno = dict(os.environ, BACKEND_INFERENCIA="keras", MODO_CARGA=modo)
+        salida = subprocess.run([sys.executable, "-c", codigo], env=entorno,
+                                capture_output=True, text=True).stdout.split()
+        print(f"{modo:<15} {float(salida[-1]):>8.2f} s")
+    print()
+
+# ============ AGRUPADOR DE PETICIONES ============
+def benchmark_agrupador(hilos=32, peticiones_por_hilo=20):
+    """Predicciones/s con clientes concurrentes, sin y con agrupación en lotes"""
+    from concurrent.futures import ThreadPoolExecutor
+    from inferencia import cargar_motor
+    from app_web import AgrupadorPeticiones
+
+    motor = cargar_motor()
+    agrupador = AgrupadorPeticiones(motor)
+
+    def carga(funcion):
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(hilos) as ejecutor:
+            list(ejecutor.map(lambda _: funcion(), range(hilos * peticiones_por_hilo)))
+        return hilos * peticiones_por_hilo / (time.perf_counter() - inicio)
+
+    print("=" * 60)
+    print(f"AGRUPADOR ({hilos} clientes concurrentes)")
+    print("=" * 60)
+    print(f"{'Sin agrupar':<40} {carga(motor.generar):>10.0f} pred/s")
+    print(f"{'Agrupando':<40} {carga(lambda: agrupador.enviar(1)):>10.0f} pred/s")
+    print(f"Tamaño medio de lote: {agrupador.estadisticas()['tamano_medio_lote']}\n")
+
+# ============ BOT DE TELEGRAM ============
+def benchmark_bot(chats=50):
+    """
+    Simular muchos chats a la vez contra un sustituto local de la API de
+    Telegram y medir el retraso máximo del event loop mientras se atienden.
+    """
+    import asyncio
+    import os
+    import tempfile
+    from types import SimpleNamespace
+    import database
+
+    # Base de datos temporal para no ensuciar predicciones.db
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    import bot_telegram
+
+    class MensajeLocal:
+        """Sustituto de telegram.Message: guarda las respuestas en lugar de enviarlas"""
+        def __init__(self):
+            self.respuestas = []
+
+        async def reply_text(self, texto, **kwargs):
+            self.respuestas.append(texto)
+
+    async def bloqueante(update, context):
+        # Forma anterior del manejador: inferencia y BD dentro del event loop
+        numeros, _ = bot_telegram.generar_y_guardar_prediccion()
+        await update.message.reply_text(numeros)
+
+    async def simular(manejador):
+        retraso_maximo = 0.0
+        activo = True
+
+        async def pulso():
+            # Un loop sano despierta a este latido cada ~1 ms
+            nonlocal retraso_maximo
+            while activo:
+                inicio = time.perf_counter()
+                await asyncio.sleep(0.001)
+                retraso_maximo = max(retraso_maximo, time.perf_counter() - inicio - 0.001)
+
+        latido = asyncio.create_task(pulso())
+        updates = [SimpleNamespace(message=MensajeLocal()) for _ in range(chats)]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(manejador(u, None) for u in updates))
+        total = time.perf_counter() - inicio
+        activo = False
+        await latido
+        return total, retraso_maximo
+
+    print("=" * 60)
+    print(f"BOT ({chats} chats simultáneos con /prediccion)")
+    print("=" * 60)
+    for nombre, manejador in (("En el event loop", bloqueante),
+                              ("En el ejecutor", bot_telegram.prediccion)):
+        total, retraso = asyncio.run(simular(manejador))
+        print(f"{nombre:<20} total {total * 1000:>8.1f} ms   "
+              f"retraso máx. del loop {retraso * 1000:>8.1f} ms")
+    print()
+
+# ============ BASE DE DATOS ============
+def benchmark_bd(escritores=4, lectores=4, operaciones=500):
+    """Inserciones/s y lecturas/s con escritores concurrentes: conexión por llamada vs pool WAL"""
+    import contextlib
+    import io
+    import os
+    import sqlite3
+    import tempfile
+    import threading
+    import database
+
+    def por_llamada_insertar(numeros):
+        # Forma anterior: abrir, ejecutar, confirmar y cerrar en cada llamada
+        conn = sqlite3.connect(database.DB_PATH, timeout=30)
+        conn.execute("INSERT INTO predicciones (numero, confianza) VALUES (?, ?)",
+                     (numeros, 50))
+        conn.commit()
+        conn.close()
+
+    def por_llamada_leer():
+        conn = sqlite3.connect(database.DB_PATH, timeout=30)
+        conn.execute("SELECT id, fecha, numeros_predichos, confianza FROM predicciones "
+                     "ORDER BY fecha DESC LIMIT 10").fetchall()
+        conn.close()
+
+    def pool_leer():
+        database.obtener_ultimas_predicciones(10)
+
+    def ejecutar(insertar, leer):
+        tiempos = {}
+
+        def escritor(n):
+            for i in range(operaciones):
+                insertar(n * operaciones + i)  # Números distintos de 4 dígitos
+
+        def lector():
+            for _ in range(operaciones):
+                leer()
+
+        for nombre, hilos in (("inserciones", [threading.Thread(target=escritor, args=(n,))
+                                               for n in range(escritores)]),
+                              ("lecturas", [threading.Thread(target=lector)
+                                            for _ in range(lectores)])):
+            inicio = time.perf_counter()
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            tiempos[nombre] = len(hilos) * operaciones / (time.perf_counter() - inicio)
+        return tiempos
+
+    print("=" * 60)
+    print(f"BASE DE DATOS ({escritores} escritores, {lectores} lectores)")
+    print("=" * 60)
+    directorio = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.DB_PATH = os.path.join(directorio, "por_llamada.db")
+        database.inicializar_bd()
+        database.cerrar_conexiones()
+        sqlite3.connect(database.DB_PATH).execute("PRAGMA journal_mode=DELETE").close()
+        antes = ejecutar(por_llamada_insertar, por_llamada_leer)
+
+        database.DB_PATH = os.path.join(directorio, "pool.db")
+        database.inicializar_bd()
+        despues = ejecutar(database.guardar_prediccion, pool_leer)
+
+    for nombre, tiempos in (("Conexión por llamada", antes), ("Pool WAL", despues)):
+        print(f"{nombre:<22} {tiempos['inserciones']:>10.0f} inserciones/s "
+              f"{tiempos['lecturas']:>10.0f} lecturas/s")
+    print()
+
+def sembrar_bd(ruta, predicciones=1_000_000, resultados=2000, comparaciones=300_000):
+    """Crear una base de datos de prueba con muchas filas (inserción directa por lotes)"""
+    import contextlib
+    import io
+    import database
+
+    database.DB_PATH = ruta
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.inicializar_bd()
+    with database.conexion() as conn:
+        conn.executemany(
+            "INSERT INTO predicciones (fecha, numero, confianza) "
+            "VALUES (datetime('2020-01-01', '+' || ? || ' minutes'), ?, 50)",
+            ((i, i % 10000) for i in range(predicciones)))
+        conn.executemany(
+            "INSERT INTO resultados_reales (fecha, numero) "
+            "VALUES (date('2020-01-01', '+' || ? || ' days'), ?)",
+            ((i, (i * 7919) % 10000) for i in range(resultados)))
+        # Una de cada tres predicciones tiene comparación, con la fecha de su predicción
+        conn.executemany(
+            "INSERT INTO comparaciones (prediccion_id, resultado_id, aciertos_totales, "
+            "aciertos_secuencia, porcentaje_acierto, fecha_prediccion) "
+            "VALUES (?, ?, ?, ?, ?, datetime('2020-01-01', '+' || ? || ' minutes'))",
+            ((i * 3 + 1, i % resultados + 1, i % 5, int(i % 5 == 4), (i % 5) * 25.0, i * 3)
+             for i in range(comparaciones)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.inicializar_bd()  # Vuelve a pasar PRAGMA optimize con datos
+
+def benchmark_planes(predicciones=1_000_000):
+    """Planes de consulta y tiempos de las consultas críticas sobre una BD grande"""
+    import os
+    import tempfile
+    import database
+
+    print("=" * 60)
+    print(f"PLANES DE CONSULTA ({predicciones:,} predicciones)")
+    print("=" * 60)
+    sembrar_bd(os.path.join(tempfile.mkdtemp(), "planes.db"), predicciones)
+
+    informe = database.verificar_planes_consulta()
+    with database.conexion() as conn:
+        for nombre, (sql, parametros) in database.CONSULTAS_CRITICAS.items():
+            ms = medir(lambda: conn.execute(sql, parametros).fetchall(), 20)
+            estado = "✗" if informe[nombre]["recorrido_completo"] else "✓"
+            print(f"{estado} {nombre:<28} {ms:>8.3f} ms  {' | '.join(informe[nombre]['plan'])}")
+    print()
+
+def benchmark_comparar(predicciones=100_000, por_par=1000):
+    """Comparación predicción a predicción frente a comparar_pendientes en bloque"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import time
+    import database
+
+    print("=" * 60)
+    print(f"COMPARACIÓN DE PENDIENTES ({predicciones:,} predicciones)")
+    print("=" * 60)
+    sembrar_bd(os.path.join(tempfile.mkdtemp(), "comparar.db"), predicciones, comparaciones=0)
+
+    with database.conexion() as conn:
+        pares = conn.execute(
+            "SELECT p.id, r.id FROM predicciones p JOIN resultados_reales r "
+            "ON r.fecha = date(p.fecha) ORDER BY p.id LIMIT ?", (por_par,)).fetchall()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for prediccion_id, resultado_id in pares:
+            database.comparar_prediccion_con_resultado(prediccion_id, resultado_id)
+        ms_par = (time.perf_counter() - inicio) * 1000 / len(pares)
+
+        inicio = time.perf_counter()
+        resumen = database.comparar_pendientes()
+        segundos_lote = time.perf_counter() - inicio
+
+    print(f"Por par:  {ms_par:.3f} ms/comparación (≈ {ms_par * predicciones / 1000:.1f} s para todas)")
+    print(f"En bloque: {resumen['comparadas']:,} comparaciones en {segundos_lote:.2f} s")
+
+    print()
+
+def benchmark_estadisticas(predicciones=1_000_000):
+    """Estadísticas recalculadas sobre las tablas frente a la fila acumulada"""
+    import os
+    import tempfile
+    import database
+
+    print("=" * 60)
+    print(f"ESTADÍSTICAS ({predicciones:,} predicciones)")
+    print("=" * 60)
+    sembrar_bd(os.path.join(tempfile.mkdtemp(), "estadisticas.db"), predicciones)
+
+    with database.conexion() as conn:
+        # Recalcular dentro de una transacción que se deshace: solo se mide
+        conn.execute("SAVEPOINT medir")
+        ms_recalculo = medir(lambda: database.recalcular_estadisticas(conn.cursor()), 5)
+        conn.execute("ROLLBACK TO medir")
+
+    ms_fila = medir(database.obtener_estadisticas_generales, 200)
+    mostrar("Recalcular sobre las tablas", ms_recalculo)
+    mostrar("Leer la fila acumulada", ms_fila)
+    print()
+
+def benchmark_persistencia(predicciones=5000):
+    """Latencia de guardar cada predicción con commit frente a la cola diferida"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import time
+    import database
+
+    print("=" * 60)
+    print(f"PERSISTENCIA DE PREDICCIONES ({predicciones:,} predicciones)")
+    print("=" * 60)
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(), "persistencia.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.inicializar_bd()
+
+    # Números distintos en cada modo para que ninguna sea duplicada
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for i in range(predicciones):
+            database.guardar_prediccion(f"{i:04d}", 50.0)
+        ms_sincrona = (time.perf_counter() - inicio) * 1000 / predicciones
+
+    escritor = database.EscritorDiferido()
+    inicio = time.perf_counter()
+    for i in range(predicciones, 2 * predicciones):
+        escritor.encolar([f"{i:04d}"], 50.0)
+    ms_diferida = (time.perf_counter() - inicio) * 1000 / predicciones
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        escritor.cerrar()
+    ms_volcado = (time.perf_counter() - inicio) * 1000
+
+    mostrar("Síncrona (commit por predicción)", ms_sincrona)
+    mostrar("Diferida (encolar)", ms_diferida)
+    print(f"Volcado final al cerrar: {ms_volcado:.1f} ms, {escritor.lotes} lotes en total")
+
+    print()
+
+def benchmark_archivo(predicciones=1_000_000, fecha_corte="2021-06-01"):
+    """Archivar las predicciones antiguas: tamaño de la BD, estadísticas y consultas"""
+    import os
+    import tempfile
+    import time
+    import database
+
+    print("=" * 60)
+    print(f"RETENCIÓN Y ARCHIVO ({predicciones:,} predicciones, corte {fecha_corte})")
+    print("=" * 60)
+    carpeta = tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, "archivo.db")
+    sembrar_bd(ruta, predicciones)
+
+    def tamano_mb():
+        with database.conexion() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return os.path.getsize(ruta) / 1e6
+
+    mb_antes = tamano_mb()
+    ms_antes = medir(lambda: database.obtener_pagina_comparaciones(100), 20)
+
+    inicio = time.perf_counter()
+    resumen = database.archivar_antiguas(ruta_archivo=os.path.join(carpeta, "historico.db"),
+                                         fecha_corte=fecha_corte)
+    segundos = time.perf_counter() - inicio
+
+    mb_despues = tamano_mb()
+    ms_despues = medir(lambda: database.obtener_pagina_comparaciones(100), 20)
+    print(f"Archivado en {segundos:.2f} s")
+    print(f"Tamaño de la BD: {mb_antes:.1f} MB -> {mb_despues:.1f} MB")
+    mostrar("Página de comparaciones (antes)", ms_antes)
+    mostrar("Página de comparaciones (después)", ms_despues)
+    print(f"{resumen['predicciones']:,} predicciones archivadas")
+    print()
+
+def benchmark_cache_http(predicciones=100_000):
+    """Respuesta completa frente a 304 Not Modified en las rutas de solo lectura"""
+    import contextlib
+    import io
+    import os
+    import tempfile
+    import database
+
+    print("=" * 60)
+    print(f"CACHÉ HTTP ({predicciones:,} predicciones)")
+    print("=" * 60)
+    sembrar_bd(os.path.join(tempfile.mkdtemp(), "cache.db"), predicciones)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app_web
+    cliente = app_web.app.test_client()
+
+    for ruta in ("/api/analisis", "/api/metricas", "/api/estadisticas-bd",
+                 "/api/historial?limite=100", "/api/aciertos-posicion"):
+        completa = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+        etag = completa.headers["ETag"]
+        ms_completa = medir(lambda: cliente.get(ruta, headers={"Accept-Encoding": "gzip"}), 20)
+        ms_304 = medir(lambda: cliente.get(ruta, headers={"If-None-Match": etag}), 20)
+        sin_gzip = len(cliente.get(ruta).data)
+        print(f"{ruta:<28} 200: {ms_completa:>7.3f} ms  304: {ms_304:>6.3f} ms  "
+              f"{sin_gzip:>6} B -> {len(completa.data):>5} B")
+    print()
+
+# ============ ANÁLISIS DE PATRONES ============
+def analisis_anterior(todos):
+    """Implementación anterior (Counter y bucle de cadenas), como referencia"""
+    from collections import Counter
+    import numpy as np
+
+    frecuencia = Counter(todos)
+    total_digitos = len(todos)
+    frecuencia_datos = [{"digito": d, "cantidad": frecuencia[d],
+                         "porcentaje": round((frecuencia[d] / total_digitos) * 100, 2)}
+                        for d in sorted(frecuencia.keys())]
+    digitos_numeros = [int(d) for d in todos]
+    estadisticas = {
+        "media": round(np.mean(digitos_numeros), 2),
+        "mediana": round(np.median(digitos_numeros), 2),
+        "desv_estandar": round(np.std(digitos_numeros), 2),
+        "minimo": int(np.min(digitos_numeros)),
+        "maximo": int(np.max(digitos_numeros)),
+        "rango": int(np.max(digitos_numeros) - np.min(digitos_numeros)),
+        "total_digitos": total_digitos
+    }
+    transiciones = {}
+    for i in range(len(todos) - 1):
+        par = todos[i] + "->" + todos[i+1]
+        transiciones[par] = transiciones.get(par, 0) + 1
+    transiciones_ordenadas = sorted(transiciones.items(), key=lambda x: x[1], reverse=True)
+    return {
+        "frecuencia": frecuencia_datos,
+        "estadisticas": estadisticas,
+        "transiciones": [{"transicion": k, "cantidad": v,
+                          "porcentaje": round((v / (total_digitos - 1)) * 100, 2)}
+                         for k, v in transiciones_ordenadas[:10]]
+    }, transiciones_ordenadas
+
+def benchmark_analisis(total=10_000_000):
+    """Análisis de patrones con Counter y bucles frente al motor vectorizado"""
+    import time
+    import numpy as np
+    from analisis import analizar
+    from datos import digitos_desde_texto
+
+    print("=" * 60)
+    print(f"ANÁLISIS DE PATRONES ({total:,} dígitos)")
+    print("=" * 60)
+
+    # Serie sesgada para que haya transiciones con mucha diferencia y también empates
+    rng = np.random.default_rng(0)
+    todos = "".join(map(str, rng.choice(10, size=total, p=np.linspace(1, 2, 10) / 15)))
+
+    inicio = time.perf_counter()
+    analisis_anterior(todos)
+    segundos_anterior = time.perf_counter() - inicio
+
+    digitos = digitos_desde_texto(todos)
+    inicio = time.perf_counter()
+    analizar(digitos)
+    segundos_vectorizado = time.perf_counter() - inicio
+
+    print(f"Counter y bucles:  {segundos_anterior:>8.3f} s")
+    print(f"Vectorizado:       {segundos_vectorizado:>8.3f} s")
+    print()
+
+def benchmark_analisis_cache(filas=2_500_000, nuevas=1):
+    """Análisis cacheado: lectura sin cambios, filas añadidas y recálculo completo"""
+    import os
+    import tempfile
+    from analisis import AnalisisCacheado, analizar
+    from datos import cargar_digitos
+
+    print("=" * 60)
+    print(f"CACHÉ DE ANÁLISIS ({filas:,} filas, {filas * 4:,} dígitos)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    ruta = os.path.join(tempfile.mkdtemp(), "numeros.csv")
+    with open(ruta, "w") as f:
+        f.write("numero,fecha\n")
+        f.writelines(f"{n},01/01/2026\n" for n in rng.integers(1000, 10000, filas))
+
+    cache = AnalisisCacheado(ruta, ruta_indice=None)
+    inicio = time.perf_counter()
+    cache.obtener()
+    mostrar("Primera carga (recálculo completo)", (time.perf_counter() - inicio) * 1000)
+    mostrar("Lectura sin cambios", medir(cache.obtener, 1000))
+
+    with open(ruta, "a") as f:
+        f.writelines(f"{n},02/01/2026\n" for n in rng.integers(1000, 10000, nuevas))
+    inicio = time.perf_counter()
+    cache.obtener()
+    mostrar(f"Añadir {nuevas} fila(s) (incremental)", (time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    analizar(cargar_digitos(ruta))
+    mostrar("Recalcular todo (analizar el almacén)", (time.perf_counter() - inicio) * 1000)
+    print()
+
+def benchmark_ngramas(filas=2_500_000):
+    """Índice de n-gramas: construcción, reinicio desde el .npz y consultas por prefijo"""
+    import os
+    import tempfile
+    from analisis import AnalisisCacheado
+
+    print("=" * 60)
+    print(f"ÍNDICE DE N-GRAMAS ({filas:,} filas, {filas * 4:,} dígitos)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    carpeta = tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, "numeros.csv")
+    indice = os.path.join(carpeta, "ngramas.npz")
+    with open(ruta, "w") as f:
+        f.write("numero,fecha\n")
+        f.writelines(f"{n},01/01/2026\n" for n in rng.integers(1000, 10000, filas))
+
+    inicio = time.perf_counter()
+    AnalisisCacheado(ruta, indice).obtener()
+    mostrar("Construir desde el CSV y guardar", (time.perf_counter() - inicio) * 1000)
+    print(f"{'Tamaño de ' + os.path.basename(indice):<40} {os.path.getsize(indice) / 1e6:>10.1f} MB")
+
+    cache = AnalisisCacheado(ruta, indice)
+    inicio = time.perf_counter()
+    cache.obtener()
+    mostrar("Reiniciar desde el .npz", (time.perf_counter() - inicio) * 1000)
+
+    for orden, prefijo in ((2, "7"), (3, "71"), (5, "7139"), (5, "")):
+        ms = medir(lambda: cache.consultar_ngramas(orden, prefijo, 10), 100)
+        mostrar(f"Consulta orden={orden} prefijo='{prefijo}'", ms)
+    print()
+
+def benchmark_ingesta(filas=2_500_000, nuevas=1000):
+    """Ingesta por bloques al almacén memmap frente a pandas y unión de cadenas"""
+    import os
+    import tempfile
+    import pandas as pd
+    from datos import AlmacenDigitos, abrir_almacen, fecha_desde_dia, ingerir_csv
+
+    print("=" * 60)
+    print(f"INGESTA DEL HISTÓRICO ({filas:,} filas)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    ruta = os.path.join(tempfile.mkdtemp(), "numeros.csv")
+    numeros = rng.integers(0, 10000, filas)  # Incluye números con ceros a la izquierda
+    dias = np.sort(rng.integers(0, 20000, filas))
+    with open(ruta, "w") as f:
+        f.write("numero,fecha\n")
+        # Sin ceros a la izquierda, como los deja un CSV guardado desde pandas
+        f.writelines(f"{n},{fecha_desde_dia(d)}\n" for n, d in zip(numeros, dias))
+        f.write("12345,01/01/2026\nabc,01/01/2026\n0677,32/01/2026\n")
+
+    inicio = time.perf_counter()
+    df = pd.read_csv(ruta)
+    anterior = "".join(df["numero"].astype(str))
+    mostrar("pandas + unión de cadenas (anterior)", (time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    resultado = ingerir_csv(ruta)
+    mostrar("Ingesta completa por bloques", (time.perf_counter() - inicio) * 1000)
+    mostrar("Abrir el almacén sin cambios", medir(lambda: abrir_almacen(ruta), 100))
+
+    esperado = "".join(f"{n:04d}" for n in numeros)
+    almacen = AlmacenDigitos(ruta)
+    print(f"✓ {resultado['filas']:,} filas, {resultado['errores']} inválidas omitidas; la versión anterior "
+          f"perdía {len(esperado) - len(anterior.replace('nan', ''))} ceros a la izquierda")
+
+    desde, hasta = fecha_desde_dia(5000), fecha_desde_dia(5100)
+    mostrar("Dígitos entre dos fechas (sin copia)", medir(lambda: almacen.digitos_entre(desde, hasta), 100))
+
+    with open(ruta, "a") as f:
+        f.writelines(f"{n},{fecha_desde_dia(20000)}\n" for n in rng.integers(0, 10000, nuevas))
+    inicio = time.perf_counter()
+    ingerir_csv(ruta)
+    mostrar(f"Añadir {nuevas} filas (incremental)", (time.perf_counter() - inicio) * 1000)
+    print()
+
+def benchmark_historico(filas=2_500_000):
+    """Cargar el histórico desde historico.npz frente a pandas y desde el almacén"""
+    import os
+    import tempfile
+    import pandas as pd
+    from datos import abrir_almacen, cargar_historico, exportar_historico, fecha_desde_dia
+
+    print("=" * 60)
+    print(f"FORMATO BINARIO DEL HISTÓRICO ({filas:,} filas)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    carpeta = tempfile.mkdtemp()
+    ruta_csv = os.path.join(carpeta, "numeros.csv")
+    ruta = os.path.join(carpeta, "historico.npz")
+    numeros = rng.integers(0, 10000, filas)
+    dias = np.sort(rng.integers(0, 20000, filas))
+    with open(ruta_csv, "w") as f:
+        f.write("numero,fecha\n")
+        f.writelines(f"{n:04d},{fecha_desde_dia(d)}\n" for n, d in zip(numeros, dias))
+
+    inicio = time.perf_counter()
+    df = pd.read_csv(ruta_csv, dtype={"numero": str})
+    np.frombuffer("".join(df["numero"]).encode(), dtype=np.uint8) - 48
+    mostrar("pandas + unión de cadenas (anterior)", (time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    cabecera = exportar_historico(ruta_csv, ruta)
+    mostrar("Exportar historico.npz", (time.perf_counter() - inicio) * 1000)
+    mostrar("Cargar historico.npz (con CRC32)", medir(lambda: cargar_historico(ruta), 20))
+    mostrar("Cargar historico.npz (sin CRC32)", medir(lambda: cargar_historico(ruta, verificar=False), 20))
+    mostrar("Abrir el almacén memmap", medir(lambda: abrir_almacen(ruta_csv), 20))
+
+    print(f"✓ {cabecera['filas']:,} sorteos, {os.path.getsize(ruta) / 1e6:.1f} MB "
+          f"(CSV: {os.path.getsize(ruta_csv) / 1e6:.1f} MB)")
+    print()
+
+BENCHMARKS = {
+    "inferencia": benchmark_inferencia,
+    "arranque": benchmark_arranque,
+    "arranque_web": benchmark_arranque_web,
+    "agrupador": benchmark_agrupador,
+    "bot": benchmark_bot,
+    "bd": benchmark_bd,
+    "planes": benchmark_planes,
+    "comparar": benchmark_comparar,
+    "estadisticas": benchmark_estadisticas,
+    "persistencia": benchmark_persistencia,
+    "archivo": benchmark_archivo,
+    "cache_http": benchmark_cache_http,
+    "analisis": benchmark_analisis,
+    "analisis_cache": benchmark_analisis_cache,
+    "ngramas": benchmark_ngramas,
+    "ingesta": benchmark_ingesta,
+    "historico": benchmark_historico,
+}
+
+if __name__ == "__main__":
+    # Uso: python benchmarks.py [nombre ...]  (sin argumentos ejecuta todos)
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in nombres:
+        BENCHMARKS[nombre]()
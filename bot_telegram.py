@@ -1,24 +1,29 @@
 from telegram import Bot, Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from datetime import datetime
-import numpy as np
-import pickle
-from tensorflow.keras.models import load_model
-import pandas as pd
 from database import *
 from metricas import ModelMetrics
-import random
+from inferencia import obtener_motor
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import functools
 
 # ============ CONFIGURACIÓN ============
 TOKEN = "TU_TOKEN_AQUI"  # Obtén tu token de @BotFather
 CHAT_ID = "TU_CHAT_ID"   # Tu ID de chat
+MAX_HILOS_BOT = 4        # Hilos para inferencia y BD fuera del event loop
+
+# Ejecutor acotado: la inferencia y SQLite no bloquean el loop de la Application
+ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS_BOT, thread_name_prefix="bot")
+
+async def en_segundo_plano(funcion, *args):
+    """Ejecutar una función bloqueante en el ejecutor sin detener el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ejecutor, functools.partial(funcion, *args))
 
 # Cargar modelo
 try:
-    model = load_model("modelo_lstm.keras", compile=False)
-    scaler = pickle.load(open("scaler.pkl", "rb"))
-    df = pd.read_csv("numeros.csv")
+    motor = obtener_motor()
     metrics = ModelMetrics()
     print("✓ Modelo cargado para Bot")
 except Exception as e:
@@ -27,49 +32,20 @@ except Exception as e:
 inicializar_bd()
 
 # ============ GENERADOR DE PREDICCIONES ============
-ultima_entrada_global = None
-
 def obtener_prediccion_bot():
     """Generar predicción para el bot"""
-    global ultima_entrada_global
-    
     try:
-        numeros = df["numero"].astype(str)
-        data = []
-        for n in numeros:
-            data.extend([int(d) for d in n])
-        
-        data = np.array(data).reshape(-1, 1)
-        data = scaler.transform(data)
-        
-        inicio_aleatorio = max(0, len(data) - random.randint(5, 20))
-        entrada_inicial = data[inicio_aleatorio:inicio_aleatorio + 5]
-        
-        if len(entrada_inicial) < 5:
-            entrada_inicial = data[-5:]
-        
-        entrada_temporal = entrada_inicial.reshape(1, 5, 1)
-        predicciones = []
-        
-        for i in range(4):
-            pred = model.predict(entrada_temporal, verbose=0)
-            pred_valor = scaler.inverse_transform(pred)[0][0]
-            ruido = np.random.normal(0, 0.5)
-            pred_valor_ruidoso = pred_valor + ruido
-            pred_valor_ruidoso = np.clip(pred_valor_ruidoso, 0, 9)
-            digito = int(np.round(pred_valor_ruidoso))
-            digito = np.clip(digito, 0, 9)
-            predicciones.append(digito)
-            
-            digito_escalado = scaler.transform(np.array([[digito]]))[0][0]
-            entrada_temporal = np.append(entrada_temporal[:, 1:, :], 
-                                        np.array([[[digito_escalado]]]), axis=1)
-        
-        ultima_entrada_global = entrada_temporal.copy()
-        return ''.join(map(str, predicciones))
+        return motor.generar()
     except Exception as e:
         return f"Error: {e}"
 
+def generar_y_guardar_prediccion():
+    """Generar una predicción y guardarla (bloqueante, para el ejecutor)"""
+    numeros = obtener_prediccion_bot()
+    confianza = metrics.calcular_confianza_general()
+    guardar_prediccion(numeros, confianza)
+    return numeros, confianza
+
 # ============ MANEJADORES DE COMANDOS ============
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /start"""
@@ -91,10 +67,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def prediccion(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /prediccion"""
     try:
-        numeros = obtener_prediccion_bot()
-        confianza = metrics.calcular_confianza_general()
-        
-        guardar_prediccion(numeros, confianza)
+        numeros, confianza = await en_segundo_plano(generar_y_guardar_prediccion)
         
         mensaje = f"""
 🔮 *Predicción del Día*
@@ -112,7 +85,7 @@ Hora: {datetime.now().strftime('%H:%M:%S')}
 async def estadisticas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /estadisticas"""
     try:
-        stats = obtener_estadisticas_generales()
+        stats = await en_segundo_plano(obtener_estadisticas_generales)
         
         mensaje = f"""
 📊 *Estadísticas del Modelo*
@@ -133,7 +106,7 @@ Peor predicción: {stats.get('peor_prediccion', '-')} ({stats.get('peor_porcenta
 async def historial(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /historial"""
     try:
-        predicciones = obtener_ultimas_predicciones(10)
+        predicciones = await en_segundo_plano(obtener_ultimas_predicciones, 10)
         
         mensaje = "*📜 Últimas 10 Predicciones*\n\n"
         
@@ -161,10 +134,7 @@ async def manejo_general(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def enviar_prediccion_diaria(context: ContextTypes.DEFAULT_TYPE):
     """Enviar predicción automática a las 9:00 AM"""
     try:
-        numeros = obtener_prediccion_bot()
-        confianza = metrics.calcular_confianza_general()
-        
-        guardar_prediccion(numeros, confianza)
+        numeros, confianza = await en_segundo_plano(generar_y_guardar_prediccion)
         
         mensaje = f"""
 🎰 *Predicción Diaria* 🎰
@@ -1,82 +1,521 @@
 import sqlite3
-from datetime import datetime
+import atexit
+import base64
+import csv
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import json
 import os
+import queue
+import threading
+import uuid
+from datos import validar_fecha, validar_numero
 
 # ============ CONFIGURACIÓN DE BD ============
 DB_PATH = "predicciones.db"
+TAMANO_POOL = 8             # Conexiones abiertas reutilizables por base de datos
+CACHE_SENTENCIAS = 128      # Sentencias preparadas en caché por conexión
 
-def inicializar_bd():
-    """Crear tablas de la base de datos"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Persistencia de predicciones: "sincrona" (commit en cada petición) o "diferida"
+# (cola en memoria que un hilo escritor vuelca por lotes)
+MODO_PERSISTENCIA = os.environ.get("MODO_PERSISTENCIA", "sincrona")
+VOLCADO_INTERVALO_MS = float(os.environ.get("VOLCADO_INTERVALO_MS", 200))   # Máximo tiempo sin volcar
+VOLCADO_MAX_PENDIENTES = int(os.environ.get("VOLCADO_MAX_PENDIENTES", 1000))  # Máximo de filas sin volcar
+
+# Retención: las predicciones con más de DIAS_RETENCION días pasan a la BD de archivo
+RUTA_ARCHIVO = "predicciones_archivo.db"
+DIAS_RETENCION = int(os.environ.get("DIAS_RETENCION", 90))
+
+MAX_PAGINA = 100                # Máximo de filas por página en los historiales
+TAMANO_BLOQUE_EXPORTACION = 1000  # Filas leídas por consulta al exportar completo
+
+# ============ CONSULTAS CRÍTICAS ============
+# Consultas del camino caliente; verificar_planes_consulta() comprueba que
+# ninguna recorre una tabla completa
+SQL_ULTIMAS_PREDICCIONES = '''
+    SELECT id, fecha, numeros_predichos, confianza
+    FROM predicciones
+    ORDER BY fecha DESC, id DESC
+    LIMIT ?
+'''
+
+# Paginación por clave (fecha, id): la página siguiente empieza justo después de
+# la última fila vista, con una búsqueda en el índice en lugar de un OFFSET
+SQL_PAGINA_PREDICCIONES = '''
+    SELECT id, fecha, numeros_predichos, confianza
+    FROM predicciones
+    WHERE (fecha, id) < (?, ?)
+    ORDER BY fecha DESC, id DESC
+    LIMIT ?
+'''
+
+SQL_RESULTADO_POR_FECHA = '''
+    SELECT id, numeros_ganadores
+    FROM resultados_reales
+    WHERE fecha = ?
+'''
+
+SQL_MEJOR_PREDICCION = '''
+    SELECT p.numeros_predichos, MAX(c.porcentaje_acierto)
+    FROM comparaciones c
+    JOIN predicciones p ON c.prediccion_id = p.id
+'''
+
+SQL_PEOR_PREDICCION = '''
+    SELECT p.numeros_predichos, MIN(c.porcentaje_acierto)
+    FROM comparaciones c
+    JOIN predicciones p ON c.prediccion_id = p.id
+'''
+
+# Se recorre comparaciones en el orden de idx_comparaciones_fecha (fecha de la
+# predicción copiada en la comparación) y cada fila busca su predicción y su
+# resultado por clave primaria: el LIMIT corta el recorrido tras `limite` filas.
+# CROSS JOIN fija ese orden aunque sqlite_stat1 solo tenga datos de algunas
+# tablas (con resultados_reales analizada y comparaciones no, SQLite la recorría
+# primero y ordenaba todas las comparaciones).
+SQL_HISTORIAL_COMPARACIONES = '''
+    SELECT c.fecha_prediccion, p.numeros_predichos, r.numeros_ganadores, 
+           c.aciertos_totales, c.porcentaje_acierto, c.aciertos_secuencia, c.prediccion_id, c.id
+    FROM comparaciones c
+    CROSS JOIN predicciones p ON p.id = c.prediccion_id
+    CROSS JOIN resultados_reales r ON r.id = c.resultado_id
+    ORDER BY c.fecha_prediccion DESC, c.prediccion_id DESC, c.id DESC
+    LIMIT ?
+'''
+
+SQL_PAGINA_COMPARACIONES = '''
+    SELECT c.fecha_prediccion, p.numeros_predichos, r.numeros_ganadores, 
+           c.aciertos_totales, c.porcentaje_acierto, c.aciertos_secuencia, c.prediccion_id, c.id
+    FROM comparaciones c
+    CROSS JOIN predicciones p ON p.id = c.prediccion_id
+    CROSS JOIN resultados_reales r ON r.id = c.resultado_id
+    WHERE (c.fecha_prediccion, c.prediccion_id, c.id) < (?, ?, ?)
+    ORDER BY c.fecha_prediccion DESC, c.prediccion_id DESC, c.id DESC
+    LIMIT ?
+'''
+
+# Compara de una vez todas las predicciones sin comparar con el resultado de su
+# día. Recorre los resultados y, por cada uno, el rango de ese día en el índice
+# de fecha de predicciones; los aciertos se cuentan con los dígitos por posición.
+SQL_COMPARAR_PENDIENTES = '''
+    INSERT INTO comparaciones (prediccion_id, resultado_id, aciertos_totales,
+                               aciertos_secuencia, porcentaje_acierto, fecha_prediccion)
+    SELECT prediccion_id, resultado_id, aciertos, secuencia, aciertos * 100.0 / 4, fecha
+    FROM (
+        SELECT p.id AS prediccion_id, r.id AS resultado_id, p.fecha AS fecha,
+               (p.d1 = r.d1) + (p.d2 = r.d2) + (p.d3 = r.d3) + (p.d4 = r.d4) AS aciertos,
+               p.numero = r.numero AS secuencia
+        FROM resultados_reales r
+        CROSS JOIN predicciones p
+            ON p.fecha >= r.fecha AND p.fecha < date(r.fecha, '+1 day')
+        WHERE NOT EXISTS (SELECT 1 FROM comparaciones c WHERE c.prediccion_id = p.id)
+    )
+'''
+
+# ============ ESQUEMA ============
+# Cada número de 4 dígitos se guarda como INTEGER. El texto con ceros a la
+# izquierda y los dígitos por posición (d1 = millares ... d4 = unidades) son
+# columnas generadas virtuales: no ocupan espacio y se leen como columnas normales.
+SQL_TABLA_PREDICCIONES = '''
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        numero INTEGER NOT NULL CHECK (numero BETWEEN 0 AND 9999),
+        confianza REAL,
+        punto_inicio TEXT,
+        correlacion TEXT,
+        numeros_predichos TEXT GENERATED ALWAYS AS (printf('%04d', numero)) VIRTUAL,
+        d1 INTEGER GENERATED ALWAYS AS (numero / 1000) VIRTUAL,
+        d2 INTEGER GENERATED ALWAYS AS (numero / 100 % 10) VIRTUAL,
+        d3 INTEGER GENERATED ALWAYS AS (numero / 10 % 10) VIRTUAL,
+        d4 INTEGER GENERATED ALWAYS AS (numero % 10) VIRTUAL,
+        UNIQUE(fecha, numero)
+    )
+'''
+
+SQL_TABLA_RESULTADOS = '''
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha DATE UNIQUE NOT NULL,
+        numero INTEGER NOT NULL CHECK (numero BETWEEN 0 AND 9999),
+        numeros_ganadores TEXT GENERATED ALWAYS AS (printf('%04d', numero)) VIRTUAL,
+        d1 INTEGER GENERATED ALWAYS AS (numero / 1000) VIRTUAL,
+        d2 INTEGER GENERATED ALWAYS AS (numero / 100 % 10) VIRTUAL,
+        d3 INTEGER GENERATED ALWAYS AS (numero / 10 % 10) VIRTUAL,
+        d4 INTEGER GENERATED ALWAYS AS (numero % 10) VIRTUAL
+    )
+'''
+
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_predicciones_fecha ON predicciones(fecha)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_predicciones_correlacion ON predicciones(correlacion)",
+    "CREATE INDEX IF NOT EXISTS idx_comparaciones_prediccion ON comparaciones(prediccion_id)",
+    "CREATE INDEX IF NOT EXISTS idx_comparaciones_resultado ON comparaciones(resultado_id)",
+    "CREATE INDEX IF NOT EXISTS idx_comparaciones_porcentaje ON comparaciones(porcentaje_acierto)",
+    "CREATE INDEX IF NOT EXISTS idx_comparaciones_fecha "
+    "ON comparaciones(fecha_prediccion, prediccion_id, id)",
+]
+
+# ============ ESTADÍSTICAS ACUMULADAS ============
+# La fila id = 1 de estadisticas guarda los agregados de todas las predicciones
+# y comparaciones. Los triggers la actualizan en la misma transacción de cada
+# inserción, así leer las estadísticas no depende del tamaño de las tablas.
+COLUMNAS_ESTADISTICAS = {
+    "total_comparaciones": "INTEGER DEFAULT 0",
+    "suma_porcentaje": "REAL DEFAULT 0",
+    "mejor_porcentaje": "REAL",
+    "peor_porcentaje": "REAL",
+    # Aciertos de cada posición, para que no dependan de las filas aún sin archivar
+    "aciertos_d1": "INTEGER DEFAULT 0",
+    "aciertos_d2": "INTEGER DEFAULT 0",
+    "aciertos_d3": "INTEGER DEFAULT 0",
+    "aciertos_d4": "INTEGER DEFAULT 0",
+}
+
+# Suma 1 a aciertos_dN si la posición N de la nueva comparación acertó
+SQL_ACIERTOS_POSICION = ",\n".join(
+    f"aciertos_d{n} = aciertos_d{n} + COALESCE((SELECT p.d{n} = r.d{n} "
+    f"FROM predicciones p, resultados_reales r "
+    f"WHERE p.id = NEW.prediccion_id AND r.id = NEW.resultado_id), 0)"
+    for n in range(1, 5))
+
+TRIGGERS_ESTADISTICAS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_prediccion
+    AFTER INSERT ON predicciones
+    BEGIN
+        UPDATE estadisticas
+        SET total_predicciones = total_predicciones + 1,
+            fecha = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END
+    ''',
+    # En un UPDATE todas las expresiones ven los valores anteriores de la fila.
+    # Con empates se queda la última comparación para la mejor y la primera para
+    # la peor, igual que MAX/MIN sobre idx_comparaciones_porcentaje
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_comparacion
+    AFTER INSERT ON comparaciones
+    BEGIN
+        UPDATE estadisticas
+        SET total_comparaciones = total_comparaciones + 1,
+            suma_porcentaje = suma_porcentaje + NEW.porcentaje_acierto,
+            tasa_acierto_promedio = (suma_porcentaje + NEW.porcentaje_acierto) / (total_comparaciones + 1),
+            aciertos = aciertos + NEW.aciertos_secuencia,
+            mejor_prediccion = CASE
+                WHEN mejor_porcentaje IS NULL OR NEW.porcentaje_acierto >= mejor_porcentaje
+                THEN (SELECT numeros_predichos FROM predicciones WHERE id = NEW.prediccion_id)
+                ELSE mejor_prediccion END,
+            mejor_porcentaje = MAX(COALESCE(mejor_porcentaje, NEW.porcentaje_acierto), NEW.porcentaje_acierto),
+            peor_prediccion = CASE
+                WHEN peor_porcentaje IS NULL OR NEW.porcentaje_acierto < peor_porcentaje
+                THEN (SELECT numeros_predichos FROM predicciones WHERE id = NEW.prediccion_id)
+                ELSE peor_prediccion END,
+            peor_porcentaje = MIN(COALESCE(peor_porcentaje, NEW.porcentaje_acierto), NEW.porcentaje_acierto),
+            {SQL_ACIERTOS_POSICION},
+            fecha = CURRENT_TIMESTAMP
+        WHERE id = 1;
+    END
+    ''',
+]
+
+# ============ VERSIÓN DE LOS DATOS ============
+# Contador que sube una vez por cada transacción que modifica filas (lo hace
+# PoolConexiones.conexion al confirmar). Sirve de clave de caché (ETag) para
+# las respuestas de solo lectura.
+SQL_SUBIR_VERSION = "UPDATE version_bd SET version = version + 1, modificado = CURRENT_TIMESTAMP WHERE id = 1"
+
+# Triggers por fila de versiones anteriores; se eliminan en inicializar_bd
+TRIGGERS_VERSION_ANTERIORES = [
+    f"trg_version_{tabla}_{operacion}"
+    for tabla in ("predicciones", "resultados_reales", "comparaciones")
+    for operacion in ("insert", "update", "delete")
+]
+
+CONSULTAS_CRITICAS = {
+    "ultimas_predicciones": (SQL_ULTIMAS_PREDICCIONES, (10,)),
+    "resultado_por_fecha": (SQL_RESULTADO_POR_FECHA, ("2026-01-01",)),
+    "mejor_prediccion": (SQL_MEJOR_PREDICCION, ()),
+    "peor_prediccion": (SQL_PEOR_PREDICCION, ()),
+    "historial_comparaciones": (SQL_HISTORIAL_COMPARACIONES, (10,)),
+    "pagina_predicciones": (SQL_PAGINA_PREDICCIONES, ("2026-01-01 00:00:00", 1, 10)),
+    "pagina_comparaciones": (SQL_PAGINA_COMPARACIONES, ("2026-01-01 00:00:00", 1, 1, 10)),
+}
+
+# ============ POOL DE CONEXIONES ============
+class PoolConexiones:
+    """
+    Conexiones SQLite abiertas y reutilizables, en modo WAL.
+    Cada conexión guarda en caché sus sentencias preparadas, así que reusarla
+    evita abrir el archivo, leer el esquema y preparar el SQL en cada llamada.
+    """
     
-    # Tabla de predicciones
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS predicciones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            numeros_predichos TEXT NOT NULL,
-            confianza REAL,
-            punto_inicio TEXT,
-            UNIQUE(fecha, numeros_predichos)
-        )
-    ''')
+    def __init__(self, ruta, tamano=TAMANO_POOL):
+        self.ruta = ruta
+        self.libres = queue.LifoQueue(maxsize=tamano)
     
-    # Tabla de resultados reales (ganadores)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS resultados_reales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha DATE UNIQUE NOT NULL,
-            numeros_ganadores TEXT NOT NULL
-        )
-    ''')
+    def _crear(self):
+        conn = sqlite3.connect(self.ruta, timeout=5, check_same_thread=False,
+                               cached_statements=CACHE_SENTENCIAS)
+        # Antes que WAL, que escribe la cabecera: en una BD nueva deja activado el
+        # vacuum incremental; en una existente no cambia nada (ver inicializar_bd)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL: los lectores no bloquean al escritor ni al revés
+        conn.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL solo sincroniza al hacer checkpoint (sigue siendo seguro ante caídas del proceso)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-16000")  # ~16 MB de caché de páginas
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
     
-    # Tabla de comparaciones
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS comparaciones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prediccion_id INTEGER,
-            resultado_id INTEGER,
-            aciertos_totales INTEGER,
-            aciertos_secuencia INTEGER,
-            porcentaje_acierto REAL,
-            FOREIGN KEY(prediccion_id) REFERENCES predicciones(id),
-            FOREIGN KEY(resultado_id) REFERENCES resultados_reales(id)
-        )
-    ''')
+    @contextmanager
+    def conexion(self):
+        """
+        Prestar una conexión; confirma al salir o deshace si hubo excepción.
+        Si se modificó alguna fila, sube la versión de los datos en la misma
+        transacción (una vez por transacción, no por fila).
+        """
+        try:
+            conn = self.libres.get_nowait()
+        except queue.Empty:
+            conn = self._crear()
+        try:
+            with conn:
+                cambios = conn.total_changes
+                yield conn
+                if conn.total_changes != cambios:
+                    conn.execute(SQL_SUBIR_VERSION)
+        finally:
+            try:
+                self.libres.put_nowait(conn)
+            except queue.Full:
+                conn.close()
     
-    # Tabla de estadísticas
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS estadisticas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_predicciones INTEGER,
-            aciertos INTEGER,
-            tasa_acierto_promedio REAL,
-            mejor_prediccion TEXT,
-            peor_prediccion TEXT
-        )
-    ''')
+    def cerrar(self):
+        """Cerrar todas las conexiones libres"""
+        while True:
+            try:
+                self.libres.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pools = {}
+_lock_pools = threading.Lock()
+
+def conexion():
+    """Conexión del pool de DB_PATH, para usar con 'with conexion() as conn:'"""
+    with _lock_pools:
+        if DB_PATH not in _pools:
+            _pools[DB_PATH] = PoolConexiones(DB_PATH)
+        pool = _pools[DB_PATH]
+    return pool.conexion()
+
+def cerrar_conexiones():
+    """Cerrar las conexiones abiertas de todos los pools"""
+    with _lock_pools:
+        for pool in _pools.values():
+            pool.cerrar()
+        _pools.clear()
+
+# Al cerrar la última conexión SQLite vuelca el WAL a la base de datos
+atexit.register(cerrar_conexiones)
+
+def migrar_numeros_enteros(conn, tabla, sql_tabla, columna_texto, columnas):
+    """
+    Reconstruir una tabla que guarda los números como TEXT con el esquema de
+    número entero. Acepta '0677', '677' y representaciones de lista como
+    '[0, 6, 7, 7]'; las filas que no son un número de 4 dígitos (p. ej. los
+    "Error: ..." que guardaba la API antigua) se apartan, completas, en
+    <tabla>_no_migradas. Devuelve cuántas se apartaron.
+    """
+    digitos = columna_texto
+    for caracter in ("[", "]", ",", " ", "'"):
+        literal = "'" + caracter.replace("'", "''") + "'"
+        digitos = f"replace({digitos}, {literal}, '')"
+    numero = (f"CASE WHEN {digitos} <> '' AND {digitos} NOT GLOB '*[^0-9]*' AND length({digitos}) <= 4 "
+              f"THEN CAST({digitos} AS INTEGER) END")
+    
+    invalidas = conn.execute(
+        f"SELECT id, {columna_texto} FROM {tabla} WHERE ({numero}) IS NULL").fetchall()
     
+    lista = ", ".join(columnas)
+    secuencia = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,)).fetchone()
+    
+    conn.execute("BEGIN")
+    # Los triggers de estadísticas leen de estas tablas; se recrean al final de inicializar_bd
+    for trigger in ("trg_estadisticas_prediccion", "trg_estadisticas_comparacion"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    if invalidas:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {tabla}_no_migradas AS SELECT * FROM {tabla} WHERE 0")
+        conn.execute(f"INSERT INTO {tabla}_no_migradas SELECT * FROM {tabla} WHERE ({numero}) IS NULL")
+    conn.execute(sql_tabla.format(tabla=f"{tabla}_nueva"))
+    conn.execute(f"INSERT INTO {tabla}_nueva ({lista}, numero) "
+                 f"SELECT {lista}, {numero} FROM {tabla} WHERE ({numero}) IS NOT NULL")
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+    # Conservar el contador de AUTOINCREMENT (los IDs archivados no se reutilizan)
+    if secuencia:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (secuencia[0], tabla))
     conn.commit()
-    conn.close()
+    
+    print(f"✓ {tabla}: números migrados a formato entero")
+    if invalidas:
+        print(f"⚠ {tabla}: {len(invalidas)} filas que no son un número de 4 dígitos apartadas en "
+              f"{tabla}_no_migradas (id, valor): {invalidas[:10]}")
+    return len(invalidas)
+
+def inicializar_bd():
+    """Crear tablas de la base de datos"""
+    with conexion() as conn:
+        cursor = conn.cursor()
+        
+        # Vacuum incremental, para devolver al disco el espacio que libera el
+        # archivado. Las BD nuevas lo tienen desde que se abren (PoolConexiones);
+        # una existente necesita un VACUUM completo, que no se hace al arrancar
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("⚠ La BD no usa vacuum incremental: el archivado no devolverá espacio al disco. "
+                  "Ejecuta una vez: python database.py vacuum-incremental")
+        
+        # Tabla de predicciones
+        cursor.execute(SQL_TABLA_PREDICCIONES.format(tabla="predicciones"))
+        
+        # Migrar tablas de predicciones creadas antes del ID de correlación
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(predicciones)")}
+        if "correlacion" not in columnas:
+            cursor.execute("ALTER TABLE predicciones ADD COLUMN correlacion TEXT")
+        
+        # Tabla de resultados reales (ganadores)
+        cursor.execute(SQL_TABLA_RESULTADOS.format(tabla="resultados_reales"))
+        
+        # Migrar números guardados como TEXT al formato entero
+        apartadas = 0
+        if "numero" not in columnas:
+            apartadas += migrar_numeros_enteros(conn, "predicciones", SQL_TABLA_PREDICCIONES, "numeros_predichos",
+                                   ["id", "fecha", "confianza", "punto_inicio", "correlacion"])
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(resultados_reales)")}
+        if "numero" not in columnas:
+            apartadas += migrar_numeros_enteros(conn, "resultados_reales", SQL_TABLA_RESULTADOS, "numeros_ganadores",
+                                   ["id", "fecha"])
+        
+        # Tabla de comparaciones
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS comparaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                prediccion_id INTEGER,
+                resultado_id INTEGER,
+                aciertos_totales INTEGER,
+                aciertos_secuencia INTEGER,
+                porcentaje_acierto REAL,
+                fecha_prediccion TIMESTAMP,
+                FOREIGN KEY(prediccion_id) REFERENCES predicciones(id),
+                FOREIGN KEY(resultado_id) REFERENCES resultados_reales(id)
+            )
+        ''')
+        
+        # Migrar comparaciones creadas antes de copiar la fecha de su predicción
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(comparaciones)")}
+        if "fecha_prediccion" not in columnas:
+            cursor.execute("ALTER TABLE comparaciones ADD COLUMN fecha_prediccion TIMESTAMP")
+            cursor.execute('''
+                UPDATE comparaciones
+                SET fecha_prediccion = (SELECT fecha FROM predicciones WHERE id = prediccion_id)
+            ''')
+        
+        # Tabla de estadísticas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS estadisticas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                total_predicciones INTEGER,
+                aciertos INTEGER,
+                tasa_acierto_promedio REAL,
+                mejor_prediccion TEXT,
+                peor_prediccion TEXT,
+                total_comparaciones INTEGER DEFAULT 0,
+                suma_porcentaje REAL DEFAULT 0,
+                mejor_porcentaje REAL,
+                peor_porcentaje REAL,
+                aciertos_d1 INTEGER DEFAULT 0,
+                aciertos_d2 INTEGER DEFAULT 0,
+                aciertos_d3 INTEGER DEFAULT 0,
+                aciertos_d4 INTEGER DEFAULT 0
+            )
+        ''')
+        
+        # Migrar tablas de estadísticas creadas antes de los agregados acumulados;
+        # el trigger de comparaciones anterior no los mantiene y se recrea
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(estadisticas)")}
+        faltantes = [columna for columna in COLUMNAS_ESTADISTICAS if columna not in columnas]
+        for columna in faltantes:
+            cursor.execute(f"ALTER TABLE estadisticas ADD COLUMN {columna} {COLUMNAS_ESTADISTICAS[columna]}")
+        if faltantes:
+            cursor.execute("DROP TRIGGER IF EXISTS trg_estadisticas_comparacion")
+        
+        # Versión de los datos (una sola fila)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS version_bd (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0,
+                modificado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO version_bd (id) VALUES (1)")
+        
+        # Triggers que mantienen la fila de estadísticas al insertar
+        for trigger in TRIGGERS_ESTADISTICAS:
+            cursor.execute(trigger)
+        for trigger in TRIGGERS_VERSION_ANTERIORES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        
+        # Calcular la fila acumulada una sola vez, a partir de los datos existentes
+        # (o de nuevo si la migración apartó filas que ya estaban contadas)
+        cursor.execute("SELECT 1 FROM estadisticas WHERE id = 1")
+        if cursor.fetchone() is None or apartadas or faltantes:
+            recalcular_estadisticas(cursor)
+        
+        # Índices (CREATE IF NOT EXISTS también migra bases de datos existentes)
+        for indice in INDICES:
+            cursor.execute(indice)
+        
+        # Actualizar estadísticas del planificador si han cambiado mucho
+        cursor.execute("PRAGMA optimize")
+    
     print("✓ Base de datos inicializada")
 
 # ============ FUNCIONES PARA PREDICCIONES ============
+_lock_fechas = threading.Lock()
+_ultima_fecha = None
+
+def fecha_prediccion():
+    """
+    Hora UTC actual con microsegundos, estrictamente creciente en el proceso.
+    Con CURRENT_TIMESTAMP (segundos) y UNIQUE(fecha, numero), dos candidatos
+    iguales guardados en el mismo segundo chocarían.
+    """
+    global _ultima_fecha
+    with _lock_fechas:
+        ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+        if _ultima_fecha is not None and ahora <= _ultima_fecha:
+            ahora = _ultima_fecha + timedelta(microseconds=1)
+        _ultima_fecha = ahora
+    return ahora
+
+def texto_fecha(fecha):
+    """datetime -> texto de la columna fecha de predicciones"""
+    return fecha.isoformat(sep=" ", timespec="microseconds")
+
 def guardar_prediccion(numeros, confianza=None, punto_inicio=None):
     """Guardar una predicción en la BD"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO predicciones (numeros_predichos, confianza, punto_inicio)
-            VALUES (?, ?, ?)
-        ''', (str(numeros), confianza, punto_inicio))
-        
-        conn.commit()
-        prediccion_id = cursor.lastrowid
-        conn.close()
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO predicciones (fecha, numero, confianza, punto_inicio)
+                VALUES (?, ?, ?, ?)
+            ''', (texto_fecha(fecha_prediccion()), int(validar_numero(numeros)), confianza, punto_inicio))
+            
+            prediccion_id = cursor.lastrowid
         
         print(f"✓ Predicción guardada: {numeros} (ID: {prediccion_id})")
         return prediccion_id
@@ -87,21 +526,227 @@ def guardar_prediccion(numeros, confianza=None, punto_inicio=None):
         print(f"✗ Error al guardar predicción: {e}")
         return None
 
-def obtener_ultimas_predicciones(limite=10):
-    """Obtener las últimas predicciones"""
+def guardar_predicciones(lista_numeros, confianza=None, punto_inicio=None):
+    """Guardar varias predicciones en una sola transacción"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            # Cada candidato con su propia fecha: los repetidos también se guardan
+            cursor.executemany('''
+                INSERT INTO predicciones (fecha, numero, confianza, punto_inicio)
+                VALUES (?, ?, ?, ?)
+            ''', [(texto_fecha(fecha_prediccion()), int(validar_numero(n)), confianza, punto_inicio)
+                  for n in lista_numeros])
+            
+            guardadas = cursor.rowcount
         
-        cursor.execute('''
-            SELECT id, fecha, numeros_predichos, confianza
-            FROM predicciones
-            ORDER BY fecha DESC
-            LIMIT ?
-        ''', (limite,))
+        print(f"✓ {guardadas} predicciones guardadas")
+        return guardadas
+    except Exception as e:
+        print(f"✗ Error al guardar predicciones: {e}")
+        return 0
+
+def obtener_prediccion_por_correlacion(correlacion):
+    """ID de la predicción guardada con ese ID de correlación, o None si aún no está"""
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id FROM predicciones WHERE correlacion = ?
+            ''', (correlacion,))
+            
+            resultado = cursor.fetchone()
+        
+        return resultado[0] if resultado else None
+    except Exception as e:
+        print(f"✗ Error al buscar predicción: {e}")
+        return None
+
+# ============ ESCRITURA DIFERIDA ============
+REINTENTOS_AL_CERRAR = 5  # Volcados fallidos que se reintentan al cerrar antes de rendirse
+
+SQL_INSERTAR_DIFERIDA = '''
+    INSERT INTO predicciones (fecha, numero, confianza, punto_inicio, correlacion)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+class CorrelacionDuplicada(ValueError):
+    """El ID de correlación ya está encolado o guardado"""
+
+class EscritorDiferido:
+    """
+    Cola en memoria de predicciones por guardar y un hilo que la vuelca en
+    transacciones por lotes. Cada predicción lleva un ID de correlación para
+    encontrarla en la BD después. Durabilidad acotada: se vuelca al menos cada
+    intervalo_ms, y si hay max_pendientes filas sin volcar quien encola espera.
+    Un lote que falla se reintenta en el siguiente volcado; nada de lo
+    encolado se descarta mientras el proceso siga vivo.
+    """
+    
+    def __init__(self, intervalo_ms=VOLCADO_INTERVALO_MS, max_pendientes=VOLCADO_MAX_PENDIENTES):
+        self.intervalo = intervalo_ms / 1000
+        self.max_pendientes = max_pendientes
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        self.despertar = threading.Event()
+        self.lock = threading.Lock()
+        self.correlaciones = set()  # Encoladas y aún sin guardar
+        self.ultima_fecha = None
+        self.cerrado = False
+        self.escritas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.reintentos = 0
+        self.hilo = threading.Thread(target=self._bucle, name="escritor-predicciones", daemon=True)
+        self.hilo.start()
+    
+    def _fecha(self):
+        """Hora de la petición (ver fecha_prediccion)"""
+        self.ultima_fecha = fecha_prediccion()
+        return texto_fecha(self.ultima_fecha)
+    
+    def encolar(self, lista_numeros, confianza=None, punto_inicio=None, correlaciones=None):
+        """
+        Encolar predicciones y devolver sus IDs de correlación sin esperar a la BD.
+        La fecha es la de la petición, no la del volcado. CorrelacionDuplicada si
+        algún ID de correlación propio ya está encolado o guardado.
+        """
+        if self.cerrado:
+            raise RuntimeError("El escritor diferido está cerrado")
         
-        resultados = cursor.fetchall()
-        conn.close()
+        numeros = [int(validar_numero(n)) for n in lista_numeros]
+        propias = correlaciones is not None
+        correlaciones = list(correlaciones) if propias else [uuid.uuid4().hex for _ in numeros]
+        
+        with self.lock:
+            if propias:
+                repetidas = {c for c in correlaciones if c in self.correlaciones}
+                repetidas |= {c for c in correlaciones if correlaciones.count(c) > 1}
+                repetidas |= {c for c in correlaciones if obtener_prediccion_por_correlacion(c) is not None}
+                if repetidas:
+                    raise CorrelacionDuplicada(f"ID de correlación ya usado: {sorted(repetidas)[0]}")
+            self.correlaciones.update(correlaciones)
+            filas = [(self._fecha(), numero, confianza, punto_inicio, correlacion)
+                     for numero, correlacion in zip(numeros, correlaciones)]
+        
+        for fila in filas:
+            if self.cola.qsize() >= self.max_pendientes // 2:
+                self.despertar.set()  # Volcar antes del intervalo si se acumulan filas
+            self.cola.put(fila)
+        return correlaciones
+    
+    def _bucle(self):
+        fallidas = []  # Filas de un volcado que falló, se reintentan en el siguiente
+        fallos = 0
+        while True:
+            self.despertar.wait(self.intervalo)
+            self.despertar.clear()
+            
+            filas = fallidas
+            while True:
+                try:
+                    filas.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            
+            fallidas = []
+            if filas:
+                try:
+                    self._escribir(filas)
+                    fallos = 0
+                except Exception as e:
+                    fallos += 1
+                    self.reintentos += 1
+                    if self.cerrado and fallos >= REINTENTOS_AL_CERRAR:
+                        print(f"✗ {len(filas)} predicciones sin guardar al cerrar: {e}")
+                        self._resolver(filas)
+                    else:
+                        print(f"⚠ Error al volcar {len(filas)} predicciones, se reintentará: {e}")
+                        fallidas = filas
+            
+            if self.cerrado and self.cola.empty() and not fallidas:
+                return
+    
+    def _escribir(self, filas):
+        """Guardar un lote en una transacción; si falla entero (BD bloqueada, disco...) lanza la excepción"""
+        try:
+            with conexion() as conn:
+                conn.executemany(SQL_INSERTAR_DIFERIDA, filas)
+            insertadas = len(filas)
+        except sqlite3.IntegrityError:
+            # Alguna fila choca con otra guardada desde otro proceso: el resto se guarda
+            insertadas = 0
+            with conexion() as conn:
+                for fila in filas:
+                    try:
+                        conn.execute(SQL_INSERTAR_DIFERIDA, fila)
+                        insertadas += 1
+                    except sqlite3.IntegrityError as e:
+                        print(f"✗ Predicción {fila[4]} descartada: {e}")
+        
+        self.escritas += insertadas
+        self.descartadas += len(filas) - insertadas
+        self.lotes += 1
+        self._resolver(filas)
+    
+    def _resolver(self, filas):
+        """Dar por terminadas filas guardadas o descartadas"""
+        with self.lock:
+            self.correlaciones.difference_update(fila[4] for fila in filas)
+        for _ in filas:
+            self.cola.task_done()
+    
+    def volcar(self):
+        """Esperar a que todo lo encolado hasta ahora esté guardado"""
+        self.despertar.set()
+        self.cola.join()
+    
+    def cerrar(self):
+        """Volcar lo pendiente y detener el hilo escritor"""
+        if not self.cerrado:
+            self.cerrado = True
+            self.despertar.set()
+            self.hilo.join()
+            print(f"✓ Escritor diferido cerrado ({self.escritas} predicciones en {self.lotes} lotes)")
+    
+    def estadisticas(self):
+        return {
+            "pendientes": self.cola.qsize(),
+            "escritas": self.escritas,
+            "descartadas": self.descartadas,
+            "lotes": self.lotes,
+            "reintentos": self.reintentos,
+            "intervalo_ms": self.intervalo * 1000,
+            "max_pendientes": self.max_pendientes
+        }
+
+_escritor = None
+_lock_escritor = threading.Lock()
+
+def obtener_escritor():
+    """Escritor diferido del proceso, creado la primera vez que se pide"""
+    global _escritor
+    with _lock_escritor:
+        if _escritor is None:
+            _escritor = EscritorDiferido()
+            # Registrado después de cerrar_conexiones: atexit lo ejecuta antes
+            atexit.register(_escritor.cerrar)
+        return _escritor
+
+def guardar_predicciones_diferidas(lista_numeros, confianza=None, punto_inicio=None, correlaciones=None):
+    """Encolar predicciones para el escritor diferido; devuelve sus IDs de correlación"""
+    return obtener_escritor().encolar(lista_numeros, confianza, punto_inicio, correlaciones)
+
+def obtener_ultimas_predicciones(limite=10):
+    """Obtener las últimas predicciones"""
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(SQL_ULTIMAS_PREDICCIONES, (limite,))
+            
+            resultados = cursor.fetchall()
         
         return [
             {
@@ -120,17 +765,15 @@ def obtener_ultimas_predicciones(limite=10):
 def guardar_resultado_real(fecha, numeros_ganadores):
     """Guardar números ganadores del día"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO resultados_reales (fecha, numeros_ganadores)
-            VALUES (?, ?)
-        ''', (fecha, str(numeros_ganadores)))
-        
-        conn.commit()
-        resultado_id = cursor.lastrowid
-        conn.close()
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO resultados_reales (fecha, numero)
+                VALUES (?, ?)
+            ''', (validar_fecha(fecha), int(validar_numero(numeros_ganadores))))
+            
+            resultado_id = cursor.lastrowid
         
         print(f"✓ Resultado real guardado: {numeros_ganadores} (ID: {resultado_id})")
         return resultado_id
@@ -138,20 +781,63 @@ def guardar_resultado_real(fecha, numeros_ganadores):
         print(f"✗ Error al guardar resultado: {e}")
         return None
 
-def obtener_resultado_por_fecha(fecha):
-    """Obtener el resultado ganador de una fecha"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
+def guardar_resultados_reales(filas):
+    """
+    Guardar muchos resultados (fecha, numeros) en una sola transacción.
+    Si la fecha ya existe se actualizan sus números (upsert). Las filas
+    inválidas se omiten. Devuelve {"guardados": n, "errores": [...]}.
+    Un error de la BD se propaga: en ese caso no se guarda ninguna fila.
+    """
+    errores = []
+    
+    def filas_validas():
+        for i, (fecha, numeros) in enumerate(filas, 1):
+            try:
+                yield validar_fecha(fecha), int(validar_numero(numeros))
+            except (ValueError, TypeError) as e:
+                errores.append({"fila": i, "error": str(e)})
+    
+    with conexion() as conn:
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, numeros_ganadores
-            FROM resultados_reales
-            WHERE fecha = ?
-        ''', (fecha,))
+        cursor.executemany('''
+            INSERT INTO resultados_reales (fecha, numero)
+            VALUES (?, ?)
+            ON CONFLICT(fecha) DO UPDATE SET numero = excluded.numero
+        ''', filas_validas())
         
-        resultado = cursor.fetchone()
-        conn.close()
+        guardados = cursor.rowcount
+    
+    print(f"✓ {guardados} resultados reales guardados ({len(errores)} filas inválidas)")
+    return {"guardados": guardados, "errores": errores}
+
+def leer_resultados_csv(lineas):
+    """
+    Filas (fecha, numeros) de un CSV con cabecera, como numeros.csv ('numero,fecha').
+    Acepta también las columnas 'numeros' o 'numeros_ganadores'. Lee en streaming.
+    """
+    lector = csv.DictReader(lineas)
+    columnas = lector.fieldnames or []
+    columna_numero = next((c for c in ("numero", "numeros", "numeros_ganadores") if c in columnas), None)
+    if "fecha" not in columnas or columna_numero is None:
+        raise ValueError("El CSV debe tener las columnas 'fecha' y 'numero'")
+    
+    return ((fila["fecha"], fila[columna_numero]) for fila in lector)
+
+def importar_resultados_csv(ruta):
+    """Importar un archivo CSV de resultados reales (como la ingesta: BOM opcional, bytes no UTF-8 inválidos)"""
+    with open(ruta, newline="", encoding="utf-8-sig", errors="replace") as f:
+        return guardar_resultados_reales(leer_resultados_csv(f))
+
+def obtener_resultado_por_fecha(fecha):
+    """Obtener el resultado ganador de una fecha"""
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(SQL_RESULTADO_POR_FECHA, (fecha,))
+            
+            resultado = cursor.fetchone()
         
         if resultado:
             return {"id": resultado[0], "numeros": resultado[1]}
@@ -164,33 +850,26 @@ def obtener_resultado_por_fecha(fecha):
 def comparar_prediccion_con_resultado(prediccion_id, resultado_id):
     """Comparar predicción con resultado real"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT numeros_predichos FROM predicciones WHERE id = ?
-        ''', (prediccion_id,))
-        prediccion = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            SELECT numeros_ganadores FROM resultados_reales WHERE id = ?
-        ''', (resultado_id,))
-        resultado = cursor.fetchone()[0]
-        
-        # Contar aciertos
-        aciertos_totales = sum(1 for p, r in zip(str(prediccion), str(resultado)) if p == r)
-        aciertos_secuencia = 1 if str(prediccion) == str(resultado) else 0
-        porcentaje_acierto = (aciertos_totales / 4) * 100
-        
-        # Guardar comparación
-        cursor.execute('''
-            INSERT INTO comparaciones (prediccion_id, resultado_id, aciertos_totales, 
-                                      aciertos_secuencia, porcentaje_acierto)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (prediccion_id, resultado_id, aciertos_totales, aciertos_secuencia, porcentaje_acierto))
-        
-        conn.commit()
-        conn.close()
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            # Contar aciertos con los dígitos por posición
+            cursor.execute('''
+                SELECT (p.d1 = r.d1) + (p.d2 = r.d2) + (p.d3 = r.d3) + (p.d4 = r.d4),
+                       p.numero = r.numero, p.fecha
+                FROM predicciones p, resultados_reales r
+                WHERE p.id = ? AND r.id = ?
+            ''', (prediccion_id, resultado_id))
+            aciertos_totales, aciertos_secuencia, fecha_prediccion = cursor.fetchone()
+            porcentaje_acierto = (aciertos_totales / 4) * 100
+            
+            # Guardar comparación
+            cursor.execute('''
+                INSERT INTO comparaciones (prediccion_id, resultado_id, aciertos_totales, 
+                                          aciertos_secuencia, porcentaje_acierto, fecha_prediccion)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (prediccion_id, resultado_id, aciertos_totales, aciertos_secuencia, porcentaje_acierto,
+                  fecha_prediccion))
         
         print(f"✓ Comparación guardada: {aciertos_totales}/4 aciertos ({porcentaje_acierto:.1f}%)")
         
@@ -203,85 +882,138 @@ def comparar_prediccion_con_resultado(prediccion_id, resultado_id):
         print(f"✗ Error en comparación: {e}")
         return None
 
-# ============ FUNCIONES DE ESTADÍSTICAS ============
-def obtener_estadisticas_generales():
-    """Obtener estadísticas generales de predicciones"""
+def comparar_pendientes():
+    """
+    Comparar en una sola transacción todas las predicciones pendientes con el
+    resultado real de su misma fecha. Devuelve un resumen de lo insertado.
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Total de predicciones
-        cursor.execute('SELECT COUNT(*) FROM predicciones')
-        total_predicciones = cursor.fetchone()[0]
-        
-        # Comparaciones realizadas
-        cursor.execute('SELECT COUNT(*) FROM comparaciones')
-        total_comparaciones = cursor.fetchone()[0]
-        
-        if total_comparaciones > 0:
-            # Tasa promedio de acierto
-            cursor.execute('SELECT AVG(porcentaje_acierto) FROM comparaciones')
-            tasa_promedio = cursor.fetchone()[0]
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM comparaciones')
+            ultimo_id = cursor.fetchone()[0]
             
-            # Secuencias acertadas
-            cursor.execute('SELECT SUM(aciertos_secuencia) FROM comparaciones')
-            aciertos_secuencia_total = cursor.fetchone()[0] or 0
+            cursor.execute(SQL_COMPARAR_PENDIENTES)
             
-            # Mejor predicción
             cursor.execute('''
-                SELECT p.numeros_predichos, MAX(c.porcentaje_acierto)
-                FROM comparaciones c
-                JOIN predicciones p ON c.prediccion_id = p.id
-            ''')
-            mejor = cursor.fetchone()
+                SELECT COUNT(*), COALESCE(SUM(aciertos_secuencia), 0), AVG(porcentaje_acierto)
+                FROM comparaciones WHERE id > ?
+            ''', (ultimo_id,))
+            comparadas, aciertos_secuencia, promedio = cursor.fetchone()
+        
+        print(f"✓ {comparadas} predicciones comparadas ({aciertos_secuencia} aciertos exactos)")
+        
+        return {
+            "comparadas": comparadas,
+            "aciertos_secuencia": aciertos_secuencia,
+            "porcentaje_promedio": round(promedio or 0, 2)
+        }
+    except Exception as e:
+        print(f"✗ Error al comparar pendientes: {e}")
+        return None
+
+# ============ FUNCIONES DE ESTADÍSTICAS ============
+def recalcular_estadisticas(cursor):
+    """Recalcular la fila acumulada (id = 1) recorriendo las tablas completas"""
+    cursor.execute('SELECT COUNT(*) FROM predicciones')
+    total_predicciones = cursor.fetchone()[0]
+    
+    cursor.execute('''
+        SELECT COUNT(*), COALESCE(SUM(porcentaje_acierto), 0), COALESCE(SUM(aciertos_secuencia), 0)
+        FROM comparaciones
+    ''')
+    total_comparaciones, suma_porcentaje, aciertos = cursor.fetchone()
+    
+    cursor.execute('''
+        SELECT COALESCE(SUM(p.d1 = r.d1), 0), COALESCE(SUM(p.d2 = r.d2), 0),
+               COALESCE(SUM(p.d3 = r.d3), 0), COALESCE(SUM(p.d4 = r.d4), 0)
+        FROM comparaciones c
+        JOIN predicciones p ON c.prediccion_id = p.id
+        JOIN resultados_reales r ON c.resultado_id = r.id
+    ''')
+    aciertos_posicion = cursor.fetchone()
+    
+    cursor.execute(SQL_MEJOR_PREDICCION)
+    mejor = cursor.fetchone()
+    
+    cursor.execute(SQL_PEOR_PREDICCION)
+    peor = cursor.fetchone()
+    
+    cursor.execute('''
+        INSERT OR REPLACE INTO estadisticas (id, total_predicciones, aciertos, tasa_acierto_promedio,
+                                             mejor_prediccion, peor_prediccion, total_comparaciones,
+                                             suma_porcentaje, mejor_porcentaje, peor_porcentaje,
+                                             aciertos_d1, aciertos_d2, aciertos_d3, aciertos_d4)
+        VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (total_predicciones, aciertos,
+          suma_porcentaje / total_comparaciones if total_comparaciones else 0,
+          mejor[0], peor[0], total_comparaciones, suma_porcentaje, mejor[1], peor[1], *aciertos_posicion))
+
+def obtener_version_bd():
+    """(versión, fecha UTC de la última modificación) de las tablas de datos"""
+    with conexion() as conn:
+        return conn.execute("SELECT version, modificado FROM version_bd WHERE id = 1").fetchone()
+
+def obtener_estadisticas_generales():
+    """Obtener estadísticas generales de predicciones"""
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
             
-            # Peor predicción
+            # Una sola fila, mantenida por los triggers de inserción
             cursor.execute('''
-                SELECT p.numeros_predichos, MIN(c.porcentaje_acierto)
-                FROM comparaciones c
-                JOIN predicciones p ON c.prediccion_id = p.id
+                SELECT total_predicciones, total_comparaciones, tasa_acierto_promedio, aciertos,
+                       mejor_prediccion, mejor_porcentaje, peor_prediccion, peor_porcentaje
+                FROM estadisticas WHERE id = 1
             ''')
-            peor = cursor.fetchone()
-        else:
-            tasa_promedio = 0
-            aciertos_secuencia_total = 0
-            mejor = None
-            peor = None
-        
-        conn.close()
+            (total_predicciones, total_comparaciones, tasa_promedio, aciertos_secuencia_total,
+             mejor_prediccion, mejor_porcentaje, peor_prediccion, peor_porcentaje) = cursor.fetchone()
         
         return {
             "total_predicciones": total_predicciones,
             "total_comparaciones": total_comparaciones,
             "tasa_promedio_acierto": round(tasa_promedio, 2) if tasa_promedio else 0,
             "secuencias_acertadas": aciertos_secuencia_total,
-            "mejor_prediccion": mejor[0] if mejor else "-",
-            "mejor_porcentaje": round(mejor[1], 2) if mejor else 0,
-            "peor_prediccion": peor[0] if peor else "-",
-            "peor_porcentaje": round(peor[1], 2) if peor else 0
+            "mejor_prediccion": mejor_prediccion or "-",
+            "mejor_porcentaje": round(mejor_porcentaje, 2) if mejor_porcentaje is not None else 0,
+            "peor_prediccion": peor_prediccion or "-",
+            "peor_porcentaje": round(peor_porcentaje, 2) if peor_porcentaje is not None else 0
         }
     except Exception as e:
         print(f"✗ Error al obtener estadísticas: {e}")
         return {}
 
+def obtener_aciertos_por_posicion():
+    """Porcentaje de acierto de cada una de las 4 posiciones sobre todas las comparaciones"""
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            # Contadores de la fila de estadísticas: incluyen las comparaciones archivadas
+            cursor.execute('''
+                SELECT total_comparaciones, aciertos_d1, aciertos_d2, aciertos_d3, aciertos_d4
+                FROM estadisticas WHERE id = 1
+            ''')
+            total, *aciertos = cursor.fetchone()
+        
+        return {
+            "comparaciones": total,
+            "posiciones": [round(a / total * 100, 2) if total else 0 for a in aciertos]
+        }
+    except Exception as e:
+        print(f"✗ Error al obtener aciertos por posición: {e}")
+        return {}
+
 def obtener_historial_comparaciones(limite=10):
     """Obtener historial de comparaciones"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.fecha, p.numeros_predichos, r.numeros_ganadores, 
-                   c.aciertos_totales, c.porcentaje_acierto, c.aciertos_secuencia
-            FROM comparaciones c
-            JOIN predicciones p ON c.prediccion_id = p.id
-            JOIN resultados_reales r ON c.resultado_id = r.id
-            ORDER BY p.fecha DESC
-            LIMIT ?
-        ''', (limite,))
-        
-        resultados = cursor.fetchall()
-        conn.close()
+        with conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(SQL_HISTORIAL_COMPARACIONES, (limite,))
+            
+            resultados = cursor.fetchall()
         
         return [
             {
@@ -298,7 +1030,266 @@ def obtener_historial_comparaciones(limite=10):
         print(f"✗ Error al obtener historial: {e}")
         return []
 
+# ============ PAGINACIÓN ============
+def codificar_cursor(clave):
+    """Cursor opaco para la clave de la última fila de una página"""
+    return base64.urlsafe_b64encode(json.dumps(clave).encode()).decode()
+
+def _valor_de_tipo(valor, tipo):
+    # bool es subclase de int y SQLite no admite enteros de más de 64 bits
+    if tipo is int:
+        return type(valor) is int and -2 ** 63 <= valor < 2 ** 63
+    return isinstance(valor, tipo)
+
+def decodificar_cursor(cursor, tipos):
+    """
+    Clave de un cursor de codificar_cursor, con un elemento de cada tipo de
+    tipos (p. ej. (str, int)); ValueError si no es válido
+    """
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(clave, list) or len(clave) != len(tipos) \
+            or not all(_valor_de_tipo(valor, tipo) for valor, tipo in zip(clave, tipos)):
+        raise ValueError("Cursor inválido")
+    return clave
+
+def _leer_pagina(sql_inicio, sql_pagina, limite, cursor, tipos_clave):
+    """Filas de una página y cursor de la siguiente (None si es la última)"""
+    clave = decodificar_cursor(cursor, tipos_clave) if cursor else None
+    
+    with conexion() as conn:
+        # Se pide una fila de más para saber si hay otra página
+        if clave is None:
+            filas = conn.execute(sql_inicio, (limite + 1,)).fetchall()
+        else:
+            filas = conn.execute(sql_pagina, (*clave, limite + 1)).fetchall()
+    
+    return filas[:limite], len(filas) > limite
+
+def obtener_pagina_predicciones(limite=10, cursor=None):
+    """Página de predicciones, de la más reciente a la más antigua"""
+    # Clave (fecha, id)
+    filas, hay_mas = _leer_pagina(SQL_ULTIMAS_PREDICCIONES, SQL_PAGINA_PREDICCIONES,
+                                  limite, cursor, (str, int))
+    
+    return {
+        "predicciones": [
+            {
+                "id": r[0],
+                "fecha": r[1],
+                "numeros": r[2],
+                "confianza": r[3]
+            }
+            for r in filas
+        ],
+        "siguiente_cursor": codificar_cursor([filas[-1][1], filas[-1][0]]) if hay_mas else None
+    }
+
+def obtener_pagina_comparaciones(limite=10, cursor=None):
+    """Página del historial de comparaciones, de la más reciente a la más antigua"""
+    # Clave (fecha de la predicción, prediccion_id, id)
+    filas, hay_mas = _leer_pagina(SQL_HISTORIAL_COMPARACIONES, SQL_PAGINA_COMPARACIONES,
+                                  limite, cursor, (str, int, int))
+    
+    return {
+        "comparaciones": [
+            {
+                "fecha": r[0],
+                "prediccion": r[1],
+                "resultado": r[2],
+                "aciertos": r[3],
+                "porcentaje": r[4],
+                "secuencia_completa": bool(r[5])
+            }
+            for r in filas
+        ],
+        "siguiente_cursor": codificar_cursor([filas[-1][0], filas[-1][6], filas[-1][7]]) if hay_mas else None
+    }
+
+def exportar_todo(obtener_pagina, clave):
+    """
+    Recorrer todas las filas página a página. Cada página es una consulta corta,
+    así la exportación no mantiene abierta una transacción de lectura.
+    """
+    cursor = None
+    while True:
+        pagina = obtener_pagina(TAMANO_BLOQUE_EXPORTACION, cursor)
+        yield from pagina[clave]
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            return
+
+# ============ RETENCIÓN Y ARCHIVO ============
+def _preparar_tabla_archivo(conn, tabla):
+    """Crear la tabla en la BD de archivo y añadirle las columnas nuevas de la principal"""
+    # table_info no incluye las columnas generadas: se archivan solo las guardadas
+    columnas = [fila[1] for fila in conn.execute(f"PRAGMA main.table_info({tabla})")]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS archivo.{tabla} AS "
+                 f"SELECT {', '.join(columnas)} FROM main.{tabla} WHERE 0")
+    existentes = {fila[1] for fila in conn.execute(f"PRAGMA archivo.table_info({tabla})")}
+    for columna in columnas:
+        if columna not in existentes:
+            conn.execute(f"ALTER TABLE archivo.{tabla} ADD COLUMN {columna}")
+    return ", ".join(columnas)
+
+def archivar_antiguas(dias=DIAS_RETENCION, ruta_archivo=RUTA_ARCHIVO, fecha_corte=None):
+    """
+    Mover a la BD de archivo las predicciones anteriores a fecha_corte (por
+    defecto, hace dias días) junto con sus comparaciones, en una transacción,
+    y devolver al disco las páginas liberadas con vacuum incremental.
+    Las estadísticas no cambian: la fila acumulada solo se actualiza al
+    insertar, así que sigue contando también lo archivado.
+    """
+    try:
+        with conexion() as conn:
+            conn.execute("ATTACH DATABASE ? AS archivo", (ruta_archivo,))
+            try:
+                columnas_predicciones = _preparar_tabla_archivo(conn, "predicciones")
+                columnas_comparaciones = _preparar_tabla_archivo(conn, "comparaciones")
+                conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_archivo_predicciones_fecha "
+                             "ON predicciones(fecha)")
+                conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_archivo_comparaciones_prediccion "
+                             "ON comparaciones(prediccion_id)")
+                
+                if fecha_corte is None:
+                    # En UTC, como el CURRENT_TIMESTAMP con que se guardan las predicciones
+                    fecha_corte = conn.execute(
+                        "SELECT datetime('now', ?)", (f"-{int(dias)} days",)).fetchone()[0]
+                
+                # Copiar antes de borrar, en una transacción: si algo falla no se borra nada
+                conn.execute("BEGIN")
+                conn.execute(f'''
+                    INSERT INTO archivo.comparaciones ({columnas_comparaciones})
+                    SELECT {columnas_comparaciones} FROM main.comparaciones
+                    WHERE prediccion_id IN (SELECT id FROM main.predicciones WHERE fecha < ?)
+                ''', (fecha_corte,))
+                comparaciones = conn.execute('''
+                    DELETE FROM main.comparaciones
+                    WHERE prediccion_id IN (SELECT id FROM main.predicciones WHERE fecha < ?)
+                ''', (fecha_corte,)).rowcount
+                
+                conn.execute(f'''
+                    INSERT INTO archivo.predicciones ({columnas_predicciones})
+                    SELECT {columnas_predicciones} FROM main.predicciones WHERE fecha < ?
+                ''', (fecha_corte,))
+                predicciones = conn.execute(
+                    "DELETE FROM main.predicciones WHERE fecha < ?", (fecha_corte,)).rowcount
+                conn.commit()
+                
+                paginas_libres = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+                # executescript avanza la sentencia hasta el final; execute solo libera una página
+                conn.executescript("PRAGMA main.incremental_vacuum")
+            finally:
+                conn.rollback()  # Por si falló a medias; DETACH no puede ir en una transacción
+                conn.execute("DETACH DATABASE archivo")
+        
+        print(f"✓ Archivadas {predicciones} predicciones y {comparaciones} comparaciones "
+              f"anteriores a {fecha_corte} ({paginas_libres} páginas liberadas)")
+        
+        return {
+            "predicciones": predicciones,
+            "comparaciones": comparaciones,
+            "fecha_corte": fecha_corte,
+            "paginas_liberadas": paginas_libres
+        }
+    except Exception as e:
+        print(f"✗ Error al archivar: {e}")
+        return None
+
+def activar_vacuum_incremental():
+    """
+    Pasar una BD existente a auto_vacuum incremental. Reescribe la BD entera con
+    VACUUM: bloquea a los demás procesos y necesita otro tanto de espacio libre,
+    así que se ejecuta a mano una sola vez (python database.py vacuum-incremental).
+    """
+    try:
+        with conexion() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                print("✓ La BD ya usa vacuum incremental")
+                return True
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            activado = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        
+        print("✓ Vacuum incremental activado" if activado else "✗ No se pudo activar el vacuum incremental")
+        return activado
+    except Exception as e:
+        print(f"✗ Error al activar el vacuum incremental: {e}")
+        return False
+
+# ============ PLANES DE CONSULTA ============
+def recorre_completo(plan, sql):
+    """
+    Si un plan (pasos de EXPLAIN QUERY PLAN) puede recorrer una tabla completa:
+    un SCAN sin índice, un orden en B-tree temporal, o un SCAN por índice que el
+    ORDER BY ... LIMIT no acota. Un SCAN por índice solo se acepta como primer
+    paso de una consulta con LIMIT cuyos demás pasos buscan por clave primaria:
+    así cada fila recorrida produce una fila del resultado.
+    """
+    for i, paso in enumerate(plan):
+        if "TEMP B-TREE" in paso:
+            return True
+        if paso.startswith("SCAN"):
+            if "USING" not in paso:
+                return True
+            acotado = i == 0 and "LIMIT" in sql.upper() and all(
+                siguiente.startswith("SEARCH") and "PRIMARY KEY" in siguiente
+                for siguiente in plan[1:])
+            if not acotado:
+                return True
+    return False
+
+def verificar_planes_consulta(consultas=None):
+    """
+    Ejecutar EXPLAIN QUERY PLAN sobre las consultas críticas (o las indicadas,
+    {nombre: (sql, parámetros)}). Devuelve {consulta: {"plan": [...],
+    "recorrido_completo": bool}} según recorre_completo().
+    """
+    informe = {}
+    with conexion() as conn:
+        for nombre, (sql, parametros) in (consultas or CONSULTAS_CRITICAS).items():
+            plan = [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+            informe[nombre] = {"plan": plan, "recorrido_completo": recorre_completo(plan, sql)}
+    return informe
+
 # ============ INICIALIZAR BD ============
 if __name__ == "__main__":
+    import sys
+    
     inicializar_bd()
+    
+    if sys.argv[1:2] == ["importar"]:
+        # Uso: python database.py importar resultados.csv
+        for ruta in sys.argv[2:]:
+            try:
+                resumen = importar_resultados_csv(ruta)
+            except Exception as e:
+                print(f"✗ Error al importar {ruta}: {e}")
+                sys.exit(1)
+            for error in resumen["errores"]:
+                print(f"  ⚠ {error}")
+        sys.exit(0)
+    
+    if sys.argv[1:2] == ["comparar"]:
+        # Uso: python database.py comparar
+        sys.exit(0 if comparar_pendientes() is not None else 1)
+    
+    if sys.argv[1:2] == ["vacuum-incremental"]:
+        # Uso: python database.py vacuum-incremental (una vez, con la web y el bot parados)
+        sys.exit(0 if activar_vacuum_incremental() else 1)
+    
+    if sys.argv[1:2] == ["archivar"]:
+        # Uso: python database.py archivar [dias]
+        dias = int(sys.argv[2]) if len(sys.argv) > 2 else DIAS_RETENCION
+        sys.exit(0 if archivar_antiguas(dias) is not None else 1)
+    
+    if "verificar-planes" in sys.argv[1:]:
+        informe = verificar_planes_consulta()
+        for nombre, resultado in informe.items():
+            estado = "✗ RECORRIDO COMPLETO" if resultado["recorrido_completo"] else "✓"
+            print(f"{estado} {nombre}: {' | '.join(resultado['plan'])}")
+        sys.exit(1 if any(r["recorrido_completo"] for r in informe.values()) else 0)
+    
     print("\n✓ Base de datos lista para usar")
@@ -0,0 +1,521 @@
+import csv
+import json
+import mmap
+import os
+import tempfile
+import uuid
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import date
+import numpy as np
+
+try:
+    import fcntl  # Bloqueo entre procesos (no disponible en Windows)
+except ImportError:
+    fcntl = None
+
+# ============ CONFIGURACIÓN DE DATOS ============
+RUTA_DATOS = "numeros.csv"
+ANCHO_NUMERO = 4  # Dígitos de cada número
+BYTES_POR_BLOQUE = 4 * 1024 * 1024  # El CSV se lee por bloques de este tamaño
+MAX_ERRORES_DETALLE = 20  # Filas inválidas que se guardan con detalle
+FORMATO_ALMACEN = 3
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+def digitos_desde_texto(texto):
+    """Convertir una cadena de dígitos '0'-'9' en arreglo uint8"""
+    return np.frombuffer(texto.encode("ascii"), dtype=np.uint8) - ord("0")
+
+# ============ VALIDACIÓN ============
+# Reglas únicas para los números y fechas del histórico y de la BD (database.py)
+def validar_numero(numero):
+    """
+    '677', 677, ' 0677 ', '0 6 7 7' o [0, 6, 7, 7] -> '0677'.
+    ValueError si no son de 1 a 4 dígitos (una lista debe tener los 4).
+    """
+    if isinstance(numero, (list, tuple)):
+        texto = "".join(str(d) for d in numero) if len(numero) == ANCHO_NUMERO else ""
+    else:
+        texto = "".join(str(numero).split())
+    if not (texto.isascii() and texto.isdigit()) or len(texto) > ANCHO_NUMERO:
+        raise ValueError(f"Número inválido: {numero!r}")
+    return texto.zfill(ANCHO_NUMERO)
+
+def dia_desde_fecha(fecha):
+    """'dd/mm/aaaa' o 'aaaa-mm-dd' -> días desde 1970-01-01"""
+    texto = str(fecha).strip()
+    try:
+        if "/" in texto:
+            dia, mes, anio = texto.split("/")
+        else:
+            anio, mes, dia = texto.split("-")
+        return date(int(anio), int(mes), int(dia)).toordinal() - ORDINAL_EPOCA
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {fecha!r}") from None
+
+def validar_fecha(fecha):
+    """'dd/mm/aaaa' o 'aaaa-mm-dd' -> 'aaaa-mm-dd'; ValueError si no es una fecha válida"""
+    return fecha_desde_dia(dia_desde_fecha(fecha))
+
+def fecha_desde_dia(dia):
+    """Días desde 1970-01-01 -> 'aaaa-mm-dd'"""
+    return date.fromordinal(int(dia) + ORDINAL_EPOCA).isoformat()
+
+# ============ ALMACÉN DE DÍGITOS ============
+# El histórico se guarda junto al CSV en archivos binarios de solo añadir,
+# que se leen con np.memmap sin copiarlos:
+#   numeros.digitos        uint8, 4 dígitos por sorteo
+#   numeros.fechas         int32, día de cada sorteo (días desde 1970-01-01)
+#   numeros.almacen.json   filas válidas y parte del CSV ya ingerida
+# Si al CSV solo se le añadieron filas se ingieren únicamente esas; cualquier
+# otro cambio reconstruye el almacén en archivos nuevos (nueva "generacion").
+def rutas_almacen(ruta_csv=RUTA_DATOS):
+    """Rutas de los archivos del almacén asociado a un CSV"""
+    base = os.path.splitext(ruta_csv)[0]
+    return {
+        "digitos": f"{base}.digitos",
+        "fechas": f"{base}.fechas",
+        "metadatos": f"{base}.almacen.json",
+        "bloqueo": f"{base}.almacen.lock",
+    }
+
+@contextmanager
+def _bloqueo(ruta):
+    """Bloqueo exclusivo entre procesos mientras se actualiza o abre el almacén"""
+    with open(ruta, "w") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def _leer_metadatos(ruta):
+    try:
+        with open(ruta) as f:
+            metadatos = json.load(f)
+        return metadatos if metadatos.get("formato") == FORMATO_ALMACEN else None
+    except (OSError, ValueError):
+        return None
+
+@contextmanager
+def escritura_atomica(ruta, modo="wb"):
+    """Archivo temporal propio junto a `ruta` que la sustituye si se escribe sin errores"""
+    descriptor, temporal = tempfile.mkstemp(prefix=f".{os.path.basename(ruta)}.", suffix=".tmp",
+                                            dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(descriptor, modo) as f:
+            yield f
+        os.chmod(temporal, 0o644)  # mkstemp lo crea solo legible por el dueño
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+def _escribir_atomico(ruta, contenido):
+    with escritura_atomica(ruta, "w") as f:
+        f.write(contenido)
+
+def _crc_prefijo(f, fin):
+    """CRC32 de los primeros `fin` bytes del archivo, leídos con mmap sin copiarlos"""
+    if fin == 0:
+        return 0
+    with mmap.mmap(f.fileno(), fin, access=mmap.ACCESS_READ) as m:
+        return zlib.crc32(m)
+
+def _separar_campos(b, total_columnas):
+    """
+    (inicios, fines) de cada campo del bloque de bytes, forma (líneas, columnas),
+    o None si el bloque tiene comillas, líneas vacías o filas irregulares.
+    """
+    if len(b) == 0 or (b == ord('"')).any():
+        return None
+    
+    saltos = np.flatnonzero(b == ord("\n"))
+    if len(saltos) == 0 or saltos[-1] != len(b) - 1:
+        saltos = np.append(saltos, len(b))  # Última línea sin salto (fin del archivo)
+    inicios_linea = np.concatenate(([0], saltos[:-1] + 1))
+    fines_linea = saltos - (b[np.maximum(saltos - 1, 0)] == ord("\r"))
+    
+    # Las comas van en orden: si cada línea empieza antes de su primera coma y
+    # acaba después de la última, todas tienen exactamente total_columnas - 1
+    comas = np.flatnonzero(b == ord(","))
+    if len(comas) != len(saltos) * (total_columnas - 1):
+        return None
+    comas = comas.reshape(len(saltos), total_columnas - 1)
+    if total_columnas > 1 and not (np.all(comas[:, 0] >= inicios_linea)
+                                   and np.all(comas[:, -1] < fines_linea)):
+        return None
+    
+    return np.column_stack((inicios_linea, comas + 1)), np.column_stack((comas, fines_linea))
+
+def _numeros_rapido(b, inicios, fines):
+    """(dígitos (n, 4) uint8, válidos) para los campos de 1 a 4 dígitos sin espacios"""
+    origen = fines[:, None] - ANCHO_NUMERO + np.arange(ANCHO_NUMERO)
+    # Alinear a la derecha: lo que queda antes del campo es un '0'
+    codigos = np.where(origen >= inicios[:, None], b[np.clip(origen, 0, len(b) - 1)], ord("0"))
+    longitudes = fines - inicios
+    validos = (longitudes >= 1) & (longitudes <= ANCHO_NUMERO) & \
+        np.all((codigos >= ord("0")) & (codigos <= ord("9")), axis=1)
+    return np.where(validos[:, None], codigos - ord("0"), 0).astype(np.uint8), validos
+
+def _dias_rapido(b, inicios, fines):
+    """(días int32, válidos) para los campos 'dd/mm/aaaa' o 'aaaa-mm-dd' exactos"""
+    c = b[np.clip(inicios[:, None] + np.arange(10), 0, len(b) - 1)].astype(np.int64) - ord("0")
+    dma = (c[:, 2] == ord("/") - ord("0")) & (c[:, 5] == ord("/") - ord("0"))
+    amd = (c[:, 4] == ord("-") - ord("0")) & (c[:, 7] == ord("-") - ord("0"))
+    posiciones_digitos = np.where(dma[:, None], [0, 1, 3, 4, 6, 7, 8, 9], [0, 1, 2, 3, 5, 6, 8, 9])
+    digitos = np.take_along_axis(c, posiciones_digitos, axis=1)
+    
+    anio = np.where(dma, c[:, 6] * 1000 + c[:, 7] * 100 + c[:, 8] * 10 + c[:, 9],
+                    c[:, 0] * 1000 + c[:, 1] * 100 + c[:, 2] * 10 + c[:, 3])
+    mes = np.where(dma, c[:, 3] * 10 + c[:, 4], c[:, 5] * 10 + c[:, 6])
+    dia = np.where(dma, c[:, 0] * 10 + c[:, 1], c[:, 8] * 10 + c[:, 9])
+    
+    validos = (fines - inicios == 10) & (dma | amd) & \
+        np.all((digitos >= 0) & (digitos <= 9), axis=1) & \
+        (anio >= 1) & (mes >= 1) & (mes <= 12) & (dia >= 1)
+    meses = np.where(validos, (anio - 1970) * 12 + mes - 1, 0).astype("datetime64[M]")
+    inicio_mes = meses.astype("datetime64[D]").astype(np.int64)
+    dias_mes = (meses + 1).astype("datetime64[D]").astype(np.int64) - inicio_mes
+    validos &= dia <= dias_mes
+    return np.where(validos, inicio_mes + dia - 1, 0).astype(np.int32), validos
+
+def _anotar_error(errores, linea, mensaje):
+    errores["total"] += 1
+    if len(errores["detalle"]) < MAX_ERRORES_DETALLE:
+        errores["detalle"].append({"linea": linea, "error": mensaje})
+
+def _validar_fila(numero, fecha, linea, errores):
+    """(dígitos, día) de una fila, o None si es inválida (se anota en errores)"""
+    try:
+        return digitos_desde_texto(validar_numero(numero)), dia_desde_fecha(fecha)
+    except ValueError as e:
+        _anotar_error(errores, linea, str(e))
+        return None
+
+def _filas_bloque(datos, numero_linea, columnas, errores):
+    """
+    Validar un bloque de líneas completas; devuelve (dígitos uint8, días int32,
+    última línea leída). Los campos se localizan y validan sobre los bytes con
+    NumPy; solo las filas que no pasan se revisan una a una, y los bloques con
+    comillas o filas irregulares se leen con csv.reader.
+    """
+    if not datos:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int32), numero_linea
+    
+    columna_numero, columna_fecha, total_columnas = columnas
+    b = np.frombuffer(datos, dtype=np.uint8)
+    campos = _separar_campos(b, total_columnas)
+    if campos is None:
+        return _filas_bloque_csv(datos.decode("utf-8", errors="replace"), numero_linea, columnas, errores)
+    
+    inicios, fines = campos
+    digitos, numeros_ok = _numeros_rapido(b, inicios[:, columna_numero], fines[:, columna_numero])
+    dias, fechas_ok = _dias_rapido(b, inicios[:, columna_fecha], fines[:, columna_fecha])
+    validas = numeros_ok & fechas_ok
+    
+    def campo(i, columna):
+        # Un byte que no es UTF-8 queda como U+FFFD y la fila se anota como inválida
+        return datos[inicios[i, columna]:fines[i, columna]].decode("utf-8", errors="replace")
+    
+    for i in np.flatnonzero(~validas):
+        fila = _validar_fila(campo(i, columna_numero), campo(i, columna_fecha),
+                             numero_linea + 1 + i, errores)
+        if fila is not None:
+            digitos[i], dias[i] = fila
+            validas[i] = True
+    
+    return digitos[validas].ravel(), dias[validas], numero_linea + len(inicios)
+
+def _filas_bloque_csv(texto, numero_linea, columnas, errores):
+    """Lo mismo que _filas_bloque, fila a fila con csv.reader"""
+    columna_numero, columna_fecha, _ = columnas
+    lineas = texto.split("\n")
+    if texto.endswith("\n"):
+        lineas.pop()
+    
+    digitos, dias = [], []
+    for linea, texto_linea in enumerate(lineas, numero_linea + 1):
+        try:
+            fila = next(csv.reader([texto_linea.rstrip("\r")]), [])
+        except csv.Error as e:
+            _anotar_error(errores, linea, f"CSV inválido: {e}")
+            continue
+        if not fila:
+            continue
+        if len(fila) <= max(columna_numero, columna_fecha):
+            _anotar_error(errores, linea, f"Faltan columnas: {fila!r}")
+            continue
+        valida = _validar_fila(fila[columna_numero], fila[columna_fecha], linea, errores)
+        if valida is not None:
+            digitos.append(valida[0])
+            dias.append(valida[1])
+    
+    return (np.concatenate(digitos) if digitos else np.zeros(0, dtype=np.uint8),
+            np.array(dias, dtype=np.int32), numero_linea + len(lineas))
+
+def ingerir_csv(ruta_csv=RUTA_DATOS, bytes_por_bloque=BYTES_POR_BLOQUE):
+    """
+    Llevar al almacén lo que falte del CSV, leyéndolo por bloques.
+    Devuelve {"filas_nuevas", "filas", "reconstruido", "errores", "detalle_errores"}.
+    """
+    rutas = rutas_almacen(ruta_csv)
+    with _bloqueo(rutas["bloqueo"]):
+        return _ingerir(ruta_csv, rutas, bytes_por_bloque)
+
+def _ingerir(ruta_csv, rutas, bytes_por_bloque):
+    metadatos = _leer_metadatos(rutas["metadatos"])
+    estado = os.stat(ruta_csv)
+    if metadatos and metadatos["csv"]["mtime_ns"] == estado.st_mtime_ns \
+            and metadatos["csv"]["bytes"] == estado.st_size:
+        return {"filas_nuevas": 0, "filas": metadatos["filas"], "reconstruido": False,
+                "errores": 0, "detalle_errores": []}
+
+    errores = {"total": 0, "detalle": []}
+    with open(ruta_csv, "rb") as f:
+        cabecera = f.readline()
+        columnas = [c.strip() for c in next(csv.reader([cabecera.decode("utf-8-sig", errors="replace")]), [])]
+        if "numero" not in columnas or "fecha" not in columnas:
+            raise ValueError(f"{ruta_csv} debe tener las columnas 'numero' y 'fecha'")
+        indices = (columnas.index("numero"), columnas.index("fecha"), len(columnas))
+
+        # Solo es un añadido si lo ya ingerido no cambió y lo nuevo empieza en otra línea.
+        # Lo ingerido se comprueba entero con su CRC32 (sin analizarlo de nuevo); la
+        # huella es incremental, así que después solo se le suman los bytes nuevos.
+        es_anadido = False
+        if metadatos and metadatos["csv"]["bytes"] <= estado.st_size:
+            huella = _crc_prefijo(f, metadatos["csv"]["bytes"])
+            f.seek(metadatos["csv"]["bytes"])
+            siguiente = f.read(2)
+            f.seek(metadatos["csv"]["bytes"])
+            es_anadido = huella == metadatos["csv"]["huella"] and (
+                not siguiente or metadatos["csv"]["termina_en_linea"]
+                or siguiente.startswith((b"\n", b"\r\n")))
+
+        if es_anadido:
+            filas, lineas = metadatos["filas"], metadatos["lineas"]
+            if not metadatos["csv"]["termina_en_linea"]:
+                lineas -= 1  # El salto con el que empieza lo nuevo cierra la última línea ya contada
+            generacion, ultima_fecha = metadatos["generacion"], metadatos["ultima_fecha"]
+            fechas_ordenadas = metadatos["fechas_ordenadas"]
+            destinos = {clave: rutas[clave] for clave in ("digitos", "fechas")}
+            # Descartar lo que haya quedado a medias de una ingesta interrumpida
+            for clave, tamano in (("digitos", filas * ANCHO_NUMERO), ("fechas", filas * 4)):
+                with open(destinos[clave], "ab") as salida:
+                    salida.truncate(tamano)
+        else:
+            f.seek(len(cabecera))
+            huella = zlib.crc32(cabecera)
+            filas, lineas = 0, 1
+            generacion, ultima_fecha, fechas_ordenadas = uuid.uuid4().hex, None, True
+            # Archivos nuevos: quien tenga abierto el almacén anterior lo sigue leyendo intacto
+            destinos = {clave: f"{rutas[clave]}.nuevo" for clave in ("digitos", "fechas")}
+            for ruta in destinos.values():
+                open(ruta, "wb").close()
+
+        filas_nuevas = 0
+        pendiente = b""
+        restante = estado.st_size - f.tell()
+        with open(destinos["digitos"], "ab") as salida_digitos, \
+                open(destinos["fechas"], "ab") as salida_fechas:
+            while True:
+                bloque = f.read(min(bytes_por_bloque, restante)) if restante > 0 else b""
+                restante = restante - len(bloque) if bloque else 0
+                huella = zlib.crc32(bloque, huella)
+
+                # La última línea incompleta del bloque pasa al siguiente
+                datos = pendiente + bloque
+                if restante > 0:
+                    corte = datos.rfind(b"\n") + 1
+                    datos, pendiente = datos[:corte], datos[corte:]
+
+                digitos, dias, lineas = _filas_bloque(datos, lineas, indices, errores)
+                if len(dias):
+                    fechas_ordenadas = fechas_ordenadas and bool(np.all(np.diff(dias) >= 0)) \
+                        and (ultima_fecha is None or int(dias[0]) >= ultima_fecha)
+                    ultima_fecha = int(dias[-1])
+                    salida_digitos.write(digitos.tobytes())
+                    salida_fechas.write(dias.tobytes())
+                    filas_nuevas += len(dias)
+
+                if restante == 0:
+                    break
+
+        f.seek(estado.st_size - 1)
+        termina_en_linea = f.read(1) == b"\n"
+
+    if not es_anadido:
+        for clave, ruta in destinos.items():
+            os.replace(ruta, rutas[clave])
+
+    filas += filas_nuevas
+    _escribir_atomico(rutas["metadatos"], json.dumps({
+        "formato": FORMATO_ALMACEN,
+        "ancho": ANCHO_NUMERO,
+        "filas": filas,
+        "lineas": lineas,
+        "generacion": generacion,
+        "fechas_ordenadas": fechas_ordenadas,
+        "ultima_fecha": ultima_fecha,
+        "csv": {
+            "bytes": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+            "huella": huella,
+            "termina_en_linea": termina_en_linea
+        }
+    }, indent=2))
+
+    if errores["total"]:
+        print(f"⚠ {errores['total']} filas inválidas omitidas en {ruta_csv} "
+              f"(línea {errores['detalle'][0]['linea']}: {errores['detalle'][0]['error']})")
+    return {
+        "filas_nuevas": filas_nuevas,
+        "filas": filas,
+        "reconstruido": not es_anadido,
+        "errores": errores["total"],
+        "detalle_errores": errores["detalle"]
+    }
+
+class Historico:
+    """Dígitos y fechas del histórico, con búsquedas por sorteo y por fecha"""
+
+    def __init__(self, digitos, fechas, generacion, fechas_ordenadas):
+        self.digitos = digitos
+        self.fechas = fechas
+        self.generacion = generacion
+        self.fechas_ordenadas = fechas_ordenadas
+        self.filas = len(fechas)
+
+    def numeros(self):
+        """Dígitos agrupados por sorteo, forma (filas, 4), sin copia"""
+        return self.digitos.reshape(-1, ANCHO_NUMERO)
+
+    def digitos_entre(self, desde, hasta):
+        """Dígitos de los sorteos entre dos fechas (incluidas), en orden"""
+        desde, hasta = dia_desde_fecha(desde), dia_desde_fecha(hasta)
+        if self.fechas_ordenadas:
+            inicio, fin = np.searchsorted(self.fechas, [desde, hasta + 1])
+            return self.digitos[inicio * ANCHO_NUMERO:fin * ANCHO_NUMERO]
+        mascara = (self.fechas >= desde) & (self.fechas <= hasta)
+        return self.numeros()[mascara].ravel()
+
+class AlmacenDigitos(Historico):
+    """Vista de solo lectura del almacén: digitos y fechas son np.memmap (sin copia)"""
+
+    def __init__(self, ruta_csv=RUTA_DATOS):
+        rutas = rutas_almacen(ruta_csv)
+        metadatos = _leer_metadatos(rutas["metadatos"])
+        if metadatos is None:
+            raise FileNotFoundError(f"No hay almacén para {ruta_csv}; ejecuta: python datos.py ingerir")
+        filas = metadatos["filas"]
+        super().__init__(self._mapear(rutas["digitos"], np.uint8, filas * ANCHO_NUMERO),
+                         self._mapear(rutas["fechas"], np.int32, filas),
+                         metadatos["generacion"], metadatos["fechas_ordenadas"])
+
+    @staticmethod
+    def _mapear(ruta, tipo, cantidad):
+        # np.memmap no admite archivos vacíos
+        if cantidad == 0:
+            return np.zeros(0, dtype=tipo)
+        return np.memmap(ruta, dtype=tipo, mode="r", shape=(cantidad,))
+
+def abrir_almacen(ruta_csv=RUTA_DATOS):
+    """Ingerir lo que falte del CSV y abrir el almacén"""
+    rutas = rutas_almacen(ruta_csv)
+    with _bloqueo(rutas["bloqueo"]):
+        _ingerir(ruta_csv, rutas, BYTES_POR_BLOQUE)
+        return AlmacenDigitos(ruta_csv)
+
+# ============ FORMATO BINARIO (.npz) ============
+# Archivo único y portable del histórico, pensado para distribuirlo en lugar
+# del CSV. Es solo una exportación: si numeros.csv existe se lee siempre el CSV
+# y el .npz se ignora (con un aviso si es más antiguo). Columnas "digitos" (uint8) y "fechas" (int32, días desde 1970-01-01)
+# sin comprimir, y una "cabecera" JSON con la versión del formato, el número
+# de sorteos y el CRC32 de cada columna.
+RUTA_HISTORICO = "historico.npz"
+VERSION_HISTORICO = 1
+
+def exportar_historico(ruta_csv=RUTA_DATOS, ruta=RUTA_HISTORICO):
+    """Escribir el histórico del CSV (vía el almacén) en el formato .npz; devuelve la cabecera"""
+    almacen = abrir_almacen(ruta_csv)
+    cabecera = {
+        "version": VERSION_HISTORICO,
+        "ancho": ANCHO_NUMERO,
+        "filas": almacen.filas,
+        "generacion": almacen.generacion,
+        "fechas_ordenadas": almacen.fechas_ordenadas,
+        "crc32_digitos": zlib.crc32(almacen.digitos),
+        "crc32_fechas": zlib.crc32(almacen.fechas),
+    }
+    with escritura_atomica(ruta) as f:
+        np.savez(f, cabecera=json.dumps(cabecera), digitos=almacen.digitos, fechas=almacen.fechas)
+    return cabecera
+
+def cargar_historico(ruta=RUTA_HISTORICO, verificar=True):
+    """Leer un archivo de exportar_historico(); ValueError si la versión o el CRC no cuadran"""
+    try:
+        with np.load(ruta) as datos:
+            cabecera = json.loads(str(datos["cabecera"]))
+            if cabecera.get("version") != VERSION_HISTORICO or cabecera.get("ancho") != ANCHO_NUMERO:
+                raise ValueError(f"{ruta}: versión {cabecera.get('version')} no compatible; vuelve a exportarlo")
+            digitos, fechas = datos["digitos"], datos["fechas"]
+    except (KeyError, zipfile.BadZipFile) as e:
+        raise ValueError(f"{ruta}: archivo dañado o incompleto ({e})") from e
+
+    if digitos.dtype != np.uint8 or fechas.dtype != np.int32 \
+            or len(fechas) != cabecera["filas"] or len(digitos) != cabecera["filas"] * ANCHO_NUMERO:
+        raise ValueError(f"{ruta}: columnas con tipo o tamaño inesperado")
+    if verificar and (zlib.crc32(digitos) != cabecera["crc32_digitos"]
+                      or zlib.crc32(fechas) != cabecera["crc32_fechas"]):
+        raise ValueError(f"{ruta}: el CRC32 no coincide, el archivo está dañado")
+    return Historico(digitos, fechas, cabecera["generacion"], cabecera["fechas_ordenadas"])
+
+# ============ ACCESO AL HISTÓRICO ============
+def ruta_fuente(ruta_csv=RUTA_DATOS, ruta_historico=RUTA_HISTORICO):
+    """Archivo del que se lee el histórico: el CSV si existe y, si no, el .npz"""
+    return ruta_csv if os.path.exists(ruta_csv) or not os.path.exists(ruta_historico) else ruta_historico
+
+_avisos_historico = set()  # .npz desactualizados ya avisados (ruta, mtime)
+
+def _avisar_historico_antiguo(ruta_csv, ruta_historico):
+    try:
+        mtime_historico = os.stat(ruta_historico).st_mtime_ns
+    except OSError:
+        return
+    clave = (os.path.abspath(ruta_historico), mtime_historico)
+    if mtime_historico < os.stat(ruta_csv).st_mtime_ns and clave not in _avisos_historico:
+        _avisos_historico.add(clave)
+        print(f"⚠ {ruta_historico} es anterior a {ruta_csv} y no se usa; "
+              f"para actualizarlo: python datos.py exportar")
+
+def abrir_historico(ruta_csv=RUTA_DATOS, ruta_historico=RUTA_HISTORICO):
+    """Histórico desde el almacén del CSV o, si solo se distribuye el .npz, desde este"""
+    if ruta_fuente(ruta_csv, ruta_historico) == ruta_csv:
+        _avisar_historico_antiguo(ruta_csv, ruta_historico)
+        return abrir_almacen(ruta_csv)
+    return cargar_historico(ruta_historico)
+
+def cargar_digitos(ruta=RUTA_DATOS):
+    """Todos los dígitos del histórico en orden, como uint8 (sin pasar por pandas)"""
+    return abrir_historico(ruta).digitos
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python datos.py ingerir [numeros.csv]
+    #      python datos.py exportar [numeros.csv] [historico.npz]
+    orden = sys.argv[1] if len(sys.argv) > 1 else None
+    if orden == "ingerir":
+        ruta = sys.argv[2] if len(sys.argv) > 2 else RUTA_DATOS
+        resultado = ingerir_csv(ruta)
+        tipo = "reconstruido" if resultado["reconstruido"] else "actualizado"
+        print(f"✓ Almacén {tipo}: {resultado['filas_nuevas']} filas nuevas, "
+              f"{resultado['filas']} en total, {resultado['errores']} inválidas")
+        for error in resultado["detalle_errores"]:
+            print(f"  línea {error['linea']}: {error['error']}")
+    elif orden == "exportar":
+        ruta = sys.argv[2] if len(sys.argv) > 2 else RUTA_DATOS
+        destino = sys.argv[3] if len(sys.argv) > 3 else RUTA_HISTORICO
+        cabecera = exportar_historico(ruta, destino)
+        print(f"✓ {destino}: {cabecera['filas']} sorteos (versión {cabecera['version']})")
+    else:
+        print("Uso: python datos.py ingerir [numeros.csv] | exportar [numeros.csv] [historico.npz]")
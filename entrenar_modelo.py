@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from tensorflow.keras.models import Sequential
@@ -8,28 +7,20 @@ from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import pickle
 import json
+from lstm_numpy import exportar_pesos
+from tabla_contextos import construir_tabla
+from datos import cargar_digitos
 
 # ============ CARGAR Y PREPARAR DATOS ============
-df = pd.read_csv("numeros.csv")
-numeros = df["numero"].astype(str)
-
-data = []
-for n in numeros:
-    data.extend([int(d) for d in n])
-
-data = np.array(data).reshape(-1, 1)
+data = cargar_digitos().astype(np.int64).reshape(-1, 1)
 
 # Normalizar datos
 scaler = MinMaxScaler()
 data_scaled = scaler.fit_transform(data)
 
 # Preparar secuencias
-X, y = [], []
-for i in range(len(data_scaled) - 5):
-    X.append(data_scaled[i:i+5])
-    y.append(data_scaled[i+5])
-
-X, y = np.array(X), np.array(y)
+ventanas = np.arange(len(data_scaled) - 5)[:, None] + np.arange(5)
+X, y = data_scaled[ventanas], data_scaled[5:]
 
 # Dividir en entrenamiento y validación
 split_index = int(len(X) * 0.8)
@@ -138,6 +129,13 @@ pickle.dump(scaler, open("scaler.pkl", "wb"))
 print("✓ Modelo guardado en: modelo_lstm.keras")
 print("✓ Scaler guardado en: scaler.pkl")
 
+# Pesos para el backend de inferencia NumPy (sin TensorFlow)
+exportar_pesos(model, scaler)
+
+# Tabla con la salida del modelo para los 100.000 contextos posibles
+from inferencia import cargar_predictor
+construir_tabla(cargar_predictor("numpy"))
+
 # ============ GRÁFICOS DE ENTRENAMIENTO ============
 fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 fig.suptitle("Entrenamiento del Modelo LSTM", fontsize=16, fontweight='bold')
@@ -0,0 +1,207 @@
+import math
+import os
+import numpy as np
+from datos import RUTA_DATOS, cargar_digitos
+from lstm_numpy import RUTA_PESOS
+from tabla_contextos import RUTA_TABLA
+from registro_modelos import (obtener_artefacto, obtener_modelo_keras, obtener_modelo_numpy,
+                              obtener_scaler, obtener_tabla_contextos)
+
+# ============ CONFIGURACIÓN DE INFERENCIA ============
+VENTANA = 5             # Dígitos de entrada del modelo
+DIGITOS_PREDICHOS = 4   # Dígitos generados por predicción
+DESVIACION_RUIDO = 0.5  # Ruido gaussiano para dar variabilidad
+MAX_CANDIDATOS = 256    # Máximo de candidatos por petición
+MAX_TOP_K = 1000        # Máximo de secuencias devueltas por puntuar_secuencias
+
+# Backend de inferencia: "tabla" (búsqueda precalculada), "numpy" (sin TensorFlow) o "keras"
+BACKEND_INFERENCIA = os.environ.get("BACKEND_INFERENCIA", "tabla")
+
+def crear_llamada_rapida(model):
+    """
+    Envolver el modelo en una función compilada con firma fija (lote, 5, 1).
+    Se traza una sola vez y se reutiliza en cada petición, sin el adaptador
+    de datos ni el bucle que model.predict construye en cada llamada.
+    """
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=(None, VENTANA, 1), dtype=tf.float32)])
+    def llamada(entrada):
+        return model(entrada, training=False)
+
+    def predecir(entrada):
+        return llamada(tf.convert_to_tensor(entrada, dtype=tf.float32)).numpy()
+
+    # Trazar ahora para que la primera petición no pague la compilación
+    predecir(np.zeros((1, VENTANA, 1), dtype=np.float32))
+    return predecir
+
+def probabilidades_digito(valores, desviacion=DESVIACION_RUIDO):
+    """
+    Probabilidad de obtener cada dígito 0-9 a partir del valor predicho, forma (n, 10).
+    Es la masa de N(valor, desviacion) que cae en cada intervalo de redondeo, igual
+    que el ruido, recorte y redondeo de generar_lote (0 y 9 absorben las colas).
+    """
+    # Solo se importa al puntuar: scipy alarga el arranque de la web y el bot
+    from scipy.special import erf
+
+    bordes = np.arange(0.5, 9, 1.0)  # 0.5, 1.5, ..., 8.5
+    z = (bordes[None, :] - np.asarray(valores, dtype=np.float64)[:, None]) / (desviacion * math.sqrt(2))
+    acumulada = 0.5 * (1 + erf(z))
+    n = len(acumulada)
+    acumulada = np.hstack([np.zeros((n, 1)), acumulada, np.ones((n, 1))])
+    return np.diff(acumulada, axis=1)
+
+def adaptar_modelo(predecir, scaler):
+    """
+    Convertir un modelo que trabaja en escala normalizada, (n, 5, 1) -> (n, 1),
+    en una función sobre ventanas de dígitos que devuelve el valor en escala 0-9.
+    """
+    # Valor escalado de cada dígito 0-9 (evita llamar al scaler en cada paso)
+    digitos_escalados = scaler.transform(np.arange(10).reshape(-1, 1)).ravel().astype(np.float32)
+
+    def predecir_digitos(ventanas):
+        pred = predecir(digitos_escalados[ventanas][..., None])
+        return scaler.inverse_transform(pred)[:, 0]
+
+    return predecir_digitos
+
+class MotorPrediccion:
+    """Motor de inferencia compartido por la web, el bot y prediccion.py"""
+
+    def __init__(self, predecir_digitos, ruta_datos=RUTA_DATOS):
+        # predecir_digitos: ventanas de dígitos (n, 5) -> valor predicho (n,) en escala 0-9
+        self.predecir_digitos = predecir_digitos
+        self.ultima_entrada = None
+        self.cargar_serie(ruta_datos)
+
+    def cargar_serie(self, ruta_datos=RUTA_DATOS):
+        """Cargar el histórico de dígitos una sola vez y dejarlo en memoria"""
+        self.digitos = cargar_digitos(ruta_datos)
+
+    def ventanas_iniciales(self, n, aleatorio=True):
+        """Ventanas de 5 dígitos desde donde arranca cada candidato, forma (n, 5)"""
+        if not aleatorio or len(self.digitos) < VENTANA:
+            return np.tile(self.digitos[-VENTANA:], (n, 1))
+
+        # Punto aleatorio dentro de los últimos 20 dígitos para más variabilidad,
+        # sorteado de forma independiente para cada candidato
+        inicios = np.maximum(0, len(self.digitos) - np.random.randint(5, 21, size=n))
+        return self.digitos[inicios[:, None] + np.arange(VENTANA)]
+
+    def generar_lote(self, n, aleatorio=True):
+        """
+        Generar n candidatos de 4 dígitos a la vez.
+        Todas las secuencias avanzan juntas: una llamada al modelo por paso.
+        Con aleatorio=False parten de los últimos 5 dígitos y no se añade ruido.
+        """
+        ventanas = self.ventanas_iniciales(n, aleatorio).astype(np.int64)
+        predicciones = np.empty((n, DIGITOS_PREDICHOS), dtype=np.int64)
+
+        for paso in range(DIGITOS_PREDICHOS):
+            pred_valor = self.predecir_digitos(ventanas)
+
+            # Añadir ruido gaussiano pequeño para variabilidad (todo el lote de una vez)
+            if aleatorio:
+                pred_valor = pred_valor + np.random.normal(0, DESVIACION_RUIDO, size=n)
+
+            # Redondear al dígito más cercano dentro de [0, 9]
+            digitos = np.clip(np.round(np.clip(pred_valor, 0, 9)), 0, 9).astype(np.int64)
+            predicciones[:, paso] = digitos
+
+            # Preparar entrada para siguiente predicción
+            ventanas = np.concatenate([ventanas[:, 1:], digitos[:, None]], axis=1)
+
+        # Guardar la última entrada para referencia
+        self.ultima_entrada = ventanas.copy()
+
+        return [''.join(map(str, fila)) for fila in predicciones]
+
+    def generar(self, aleatorio=True):
+        """Generar una única predicción de 4 dígitos"""
+        return self.generar_lote(1, aleatorio)[0]
+
+    def puntuar_secuencias(self, k=10, haz=None):
+        """
+        Puntuar las 10.000 secuencias de 4 dígitos posibles desde los últimos 5
+        dígitos y devolver las k más probables. Cada paso evalúa todos los
+        prefijos vivos en una sola llamada al modelo (1 + 10 + 100 + 1000
+        contextos). Con haz se conservan solo los mejores prefijos en cada paso.
+        """
+        prefijos = np.zeros((1, 0), dtype=np.int64)
+        ventanas = self.digitos[-VENTANA:].astype(np.int64)[None, :]
+        log_prob = np.zeros(1)
+
+        for _ in range(DIGITOS_PREDICHOS):
+            probs = probabilidades_digito(self.predecir_digitos(ventanas))
+            with np.errstate(divide="ignore"):
+                log_prob = (log_prob[:, None] + np.log(probs)).ravel()
+
+            # Expandir cada prefijo con los 10 dígitos posibles
+            siguiente = np.tile(np.arange(10), len(prefijos))
+            prefijos = np.hstack([np.repeat(prefijos, 10, axis=0), siguiente[:, None]])
+            ventanas = np.hstack([np.repeat(ventanas[:, 1:], 10, axis=0), siguiente[:, None]])
+
+            if haz and len(log_prob) > haz:
+                mejores = np.argpartition(-log_prob, haz - 1)[:haz]
+                prefijos, ventanas, log_prob = prefijos[mejores], ventanas[mejores], log_prob[mejores]
+
+        k = min(k, len(log_prob))
+        mejores = np.argpartition(-log_prob, k - 1)[:k]
+        mejores = mejores[np.argsort(-log_prob[mejores], kind="stable")]
+
+        return [{
+            "secuencia": ''.join(map(str, prefijos[i])),
+            "probabilidad": round(float(np.exp(log_prob[i])), 6)
+        } for i in mejores]
+
+def cargar_backend_keras(model_path="modelo_lstm.keras", scaler_path="scaler.pkl"):
+    """Modelo Keras con llamada compilada y scaler de scikit-learn"""
+    predecir = obtener_artefacto("keras_compilado", model_path,
+                                 lambda ruta: crear_llamada_rapida(obtener_modelo_keras(ruta)))
+    return adaptar_modelo(predecir, obtener_scaler(scaler_path))
+
+def cargar_backend_numpy(pesos_path=RUTA_PESOS):
+    """Pesos exportados a .npz, evaluados con NumPy (no importa TensorFlow)"""
+    modelo = obtener_modelo_numpy(pesos_path)
+    return adaptar_modelo(modelo, modelo.escalador)
+
+def cargar_backend_tabla(tabla_path=RUTA_TABLA):
+    """Tabla precalculada sobre los 100.000 contextos: una búsqueda por paso"""
+    return obtener_tabla_contextos(tabla_path)
+
+def cargar_predictor(backend=None):
+    """
+    Función ventanas de dígitos -> valor predicho para el backend pedido.
+    Si faltan sus artefactos se pasa al siguiente: tabla -> numpy -> keras.
+    """
+    backend = backend or BACKEND_INFERENCIA
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de inferencia desconocido: {backend}")
+
+    for candidato in BACKENDS[BACKENDS.index(backend):]:
+        try:
+            predecir_digitos = obtener_artefacto("predictor", candidato,
+                                                 lambda _: CARGADORES_BACKEND[candidato]())
+            print(f"✓ Backend de inferencia: {candidato}")
+            return predecir_digitos
+        except (FileNotFoundError, ValueError) as e:
+            if candidato == BACKENDS[-1]:
+                raise
+            print(f"⚠ Backend {candidato} no disponible ({e}), probando el siguiente")
+
+BACKENDS = ["tabla", "numpy", "keras"]
+CARGADORES_BACKEND = {
+    "tabla": cargar_backend_tabla,
+    "numpy": cargar_backend_numpy,
+    "keras": cargar_backend_keras,
+}
+
+def cargar_motor(backend=None, ruta_datos=RUTA_DATOS):
+    """Cargar el backend elegido e histórico y construir el motor"""
+    return MotorPrediccion(cargar_predictor(backend), ruta_datos)
+
+def obtener_motor(backend=None):
+    """Motor compartido por todo el proceso, construido la primera vez que se pide"""
+    backend = backend or BACKEND_INFERENCIA
+    return obtener_artefacto("motor", backend, cargar_motor)
@@ -0,0 +1,154 @@
+import numpy as np
+
+# ============ CONFIGURACIÓN ============
+RUTA_PESOS = "modelo_lstm.npz"
+
+def _sigmoide(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+ACTIVACIONES = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": _sigmoide,
+}
+
+# ============ ESCALADOR ============
+class EscaladorMinMax:
+    """Equivalente a MinMaxScaler.transform / inverse_transform sin scikit-learn"""
+
+    def __init__(self, min_, scale_):
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+
+    def transform(self, X):
+        return np.asarray(X) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X) - self.min_) / self.scale_
+
+# ============ EXPORTAR PESOS ============
+def exportar_pesos(model, scaler, ruta=RUTA_PESOS):
+    """
+    Guardar pesos de las capas LSTM/Dense y parámetros del scaler en un .npz plano.
+    Se guarda también qué LSTM devuelven la secuencia completa; las capas sin
+    bias se exportan con bias cero. ValueError si alguna capa no se puede evaluar igual.
+    """
+    arrays = {
+        "scaler_min": scaler.min_,
+        "scaler_scale": scaler.scale_,
+    }
+    tipos, activaciones, secuencias = [], [], []
+
+    for layer in model.layers:
+        nombre = type(layer).__name__
+        if nombre == "Dropout":
+            continue  # Sin efecto en inferencia
+        if nombre not in ("LSTM", "Dense"):
+            raise ValueError(f"Capa no soportada: {nombre}")
+
+        config = layer.get_config()
+        if nombre == "LSTM" and (config["activation"] != "tanh"
+                                 or config["recurrent_activation"] != "sigmoid"):
+            raise ValueError("Solo se soportan LSTM con activaciones tanh/sigmoid")
+        if nombre == "LSTM" and (config.get("go_backwards") or config.get("stateful")
+                                 or config.get("return_state")):
+            raise ValueError(f"LSTM {layer.name}: go_backwards, stateful y return_state no están soportados")
+        if config.get("activation", "linear") not in ACTIVACIONES:
+            raise ValueError(f"Activación no soportada en {layer.name}: {config['activation']}")
+
+        pesos = layer.get_weights()
+        if not config.get("use_bias", True):
+            # El bias tiene el ancho de la salida del kernel (4 compuertas en la LSTM)
+            pesos.append(np.zeros(pesos[0].shape[1], dtype=np.float32))
+
+        i = len(tipos)
+        for j, peso in enumerate(pesos):
+            arrays[f"capa{i}_peso{j}"] = peso.astype(np.float32)
+        tipos.append(nombre.lower())
+        activaciones.append(config.get("activation", "linear"))
+        secuencias.append(bool(config.get("return_sequences", False)))
+
+    arrays["tipos"] = np.array(tipos)
+    arrays["activaciones"] = np.array(activaciones)
+    arrays["secuencias"] = np.array(secuencias)
+    np.savez(ruta, **arrays)
+    print(f"✓ Pesos exportados en: {ruta}")
+
+# ============ MODELO NUMPY ============
+class ModeloNumpy:
+    """Pase hacia adelante del modelo LSTM usando solo NumPy"""
+
+    def __init__(self, ruta=RUTA_PESOS):
+        with np.load(ruta) as datos:
+            self.escalador = EscaladorMinMax(datos["scaler_min"], datos["scaler_scale"])
+            tipos = [str(tipo) for tipo in datos["tipos"]]
+            if "secuencias" in datos.files:
+                secuencias = [bool(s) for s in datos["secuencias"]]
+            else:
+                # Exportaciones anteriores: la LSTM devuelve la secuencia si le sigue otra LSTM
+                secuencias = [i + 1 < len(tipos) and tipos[i + 1] == "lstm" for i in range(len(tipos))]
+            self.capas = []
+            for i, (tipo, activacion) in enumerate(zip(tipos, datos["activaciones"])):
+                pesos = [datos[k] for k in sorted(datos.files)
+                         if k.startswith(f"capa{i}_")]
+                self.capas.append((tipo, ACTIVACIONES[str(activacion)], pesos, secuencias[i]))
+
+    @staticmethod
+    def _lstm(x, kernel, recurrent_kernel, bias, devolver_secuencia):
+        """Capa LSTM vectorizada sobre el lote; x tiene forma (lote, pasos, entradas)"""
+        lote, pasos, _ = x.shape
+        unidades = recurrent_kernel.shape[0]
+
+        # Proyección de la entrada para todos los pasos de una vez
+        z_entrada = x @ kernel + bias
+        h = np.zeros((lote, unidades), dtype=np.float32)
+        c = np.zeros((lote, unidades), dtype=np.float32)
+        salidas = []
+
+        for t in range(pasos):
+            z = z_entrada[:, t, :] + h @ recurrent_kernel
+            # Orden de compuertas de Keras: entrada, olvido, celda, salida
+            i = _sigmoide(z[:, :unidades])
+            f = _sigmoide(z[:, unidades:2 * unidades])
+            g = np.tanh(z[:, 2 * unidades:3 * unidades])
+            o = _sigmoide(z[:, 3 * unidades:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            salidas.append(h)
+
+        return np.stack(salidas, axis=1) if devolver_secuencia else h
+
+    def __call__(self, entrada):
+        """
+        Predicción escalada para un lote de forma (lote, pasos, 1); devuelve (lote, 1),
+        o (lote, pasos, 1) si la última LSTM devuelve la secuencia completa
+        """
+        x = np.asarray(entrada, dtype=np.float32)
+        for tipo, activacion, pesos, devolver_secuencia in self.capas:
+            if tipo == "lstm":
+                x = self._lstm(x, *pesos, devolver_secuencia=devolver_secuencia)
+            else:
+                # Sobre una secuencia, Dense se aplica a cada paso (último eje)
+                kernel, bias = pesos
+                x = activacion(x @ kernel + bias)
+        return x
+
+# ============ EXPORTAR Y VERIFICAR ============
+if __name__ == "__main__":
+    import pickle
+    from tensorflow.keras.models import load_model
+
+    model = load_model("modelo_lstm.keras", compile=False)
+    scaler = pickle.load(open("scaler.pkl", "rb"))
+    exportar_pesos(model, scaler)
+
+    # Comprobación rápida sobre el modelo real (las pruebas completas están en tests/)
+    modelo_numpy = ModeloNumpy()
+    entradas = np.random.default_rng(0).random((256, 5, 1)).astype(np.float32)
+    diferencia = np.max(np.abs(model.predict(entradas, verbose=0) - modelo_numpy(entradas)))
+    if diferencia < 1e-5:
+        print(f"✓ Backend NumPy equivalente al modelo Keras (diferencia máxima {diferencia:.2e})")
+    else:
+        print(f"✗ Las salidas NumPy no coinciden con Keras (diferencia máxima {diferencia:.2e})")
+        raise SystemExit(1)
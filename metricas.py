@@ -1,21 +1,44 @@
 import json
+import os
 import numpy as np
-import pickle
-from tensorflow.keras.models import load_model
-from sklearn.model_selection import cross_val_score, KFold
-import pandas as pd
+from registro_modelos import obtener_modelo_keras, obtener_scaler
 
 class ModelMetrics:
     """Clase para gestionar métricas del modelo"""
     
     def __init__(self, model_path="modelo_lstm.keras", scaler_path="scaler.pkl", metrics_path="metricas_modelo.json"):
-        self.model = load_model(model_path, compile=False)
-        self.scaler = pickle.load(open(scaler_path, "rb"))
+        # Las métricas solo necesitan el JSON; modelo y scaler se piden al
+        # registro compartido únicamente si alguien los usa
+        self.model_path = model_path
+        self.scaler_path = scaler_path
         self.metrics_path = metrics_path
+        self.version = None  # (mtime, tamaño) del JSON cargado
         self.metricas = self.cargar_metricas()
     
+    @property
+    def model(self):
+        return obtener_modelo_keras(self.model_path)
+    
+    @property
+    def scaler(self):
+        return obtener_scaler(self.scaler_path)
+    
+    def _version_archivo(self):
+        try:
+            estado = os.stat(self.metrics_path)
+            return estado.st_mtime_ns, estado.st_size
+        except OSError:
+            return None
+    
+    def refrescar(self):
+        """Volver a leer el JSON si cambió desde la última carga (p. ej. tras reentrenar)"""
+        if self._version_archivo() != self.version:
+            self.metricas = self.cargar_metricas()
+        return self.metricas
+    
     def cargar_metricas(self):
         """Cargar métricas guardadas"""
+        self.version = self._version_archivo()
         try:
             with open(self.metrics_path, "r") as f:
                 return json.load(f)
@@ -104,6 +127,8 @@ def validacion_cruzada_simple(datos_X, datos_y, n_splits=5):
     """
     Realizar validación cruzada simple
     """
+    from sklearn.model_selection import KFold
+    
     print("\n🔄 Realizando validación cruzada...")
     print(f"   Folds: {n_splits}")
     
@@ -0,0 +1,50 @@
+import pickle
+import threading
+
+# ============ REGISTRO DE ARTEFACTOS ============
+# Cada artefacto se carga una sola vez por proceso, la primera vez que se pide,
+# y todos los módulos reciben la misma referencia compartida.
+_artefactos = {}
+_lock = threading.RLock()  # Reentrante: un cargador puede pedir otros artefactos
+
+def obtener_artefacto(tipo, ruta, cargador):
+    """Devolver el artefacto (tipo, ruta), cargándolo con cargador(ruta) si hace falta"""
+    clave = (tipo, ruta)
+    with _lock:
+        if clave not in _artefactos:
+            _artefactos[clave] = cargador(ruta)
+            print(f"✓ Artefacto cargado: {tipo} ({ruta})")
+        return _artefactos[clave]
+
+def artefactos_cargados():
+    """Lista de artefactos cargados en este proceso"""
+    with _lock:
+        return [{"tipo": tipo, "ruta": ruta} for tipo, ruta in _artefactos]
+
+def _cargar_modelo_keras(ruta):
+    from tensorflow.keras.models import load_model
+    return load_model(ruta, compile=False)
+
+def _cargar_scaler(ruta):
+    with open(ruta, "rb") as f:
+        return pickle.load(f)
+
+def _cargar_modelo_numpy(ruta):
+    from lstm_numpy import ModeloNumpy
+    return ModeloNumpy(ruta)
+
+def _cargar_tabla_contextos(ruta):
+    from tabla_contextos import TablaContextos
+    return TablaContextos(ruta)
+
+def obtener_modelo_keras(ruta="modelo_lstm.keras"):
+    return obtener_artefacto("keras", ruta, _cargar_modelo_keras)
+
+def obtener_scaler(ruta="scaler.pkl"):
+    return obtener_artefacto("scaler", ruta, _cargar_scaler)
+
+def obtener_modelo_numpy(ruta="modelo_lstm.npz"):
+    return obtener_artefacto("numpy", ruta, _cargar_modelo_numpy)
+
+def obtener_tabla_contextos(ruta="tabla_contextos.npy"):
+    return obtener_artefacto("tabla", ruta, _cargar_tabla_contextos)
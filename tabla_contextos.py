@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# ============ CONFIGURACIÓN ============
+RUTA_TABLA = "tabla_contextos.npy"
+RUTA_VERSION_TABLA = "tabla_contextos.json"
+RUTA_MODELO = "modelo_lstm.keras"
+VENTANA = 5
+TOTAL_CONTEXTOS = 10 ** VENTANA   # Toda ventana posible de 5 dígitos 0-9
+TAMANO_BLOQUE = 10000
+
+# Peso de cada posición para convertir una ventana de dígitos en su índice
+POTENCIAS = 10 ** np.arange(VENTANA - 1, -1, -1)
+
+def huella_modelo(ruta=RUTA_MODELO):
+    """SHA-256 del modelo, para saber si la tabla corresponde a él"""
+    with open(ruta, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def todos_los_contextos():
+    """Las 100.000 ventanas posibles, forma (100000, 5), en orden de índice"""
+    codigos = np.arange(TOTAL_CONTEXTOS)
+    return (codigos[:, None] // POTENCIAS) % 10
+
+# ============ CONSTRUIR TABLA ============
+def construir_tabla(predecir_digitos, ruta=RUTA_TABLA, ruta_version=RUTA_VERSION_TABLA,
+                    ruta_modelo=RUTA_MODELO):
+    """Evaluar el modelo por lotes sobre todos los contextos y guardar la salida"""
+    contextos = todos_los_contextos()
+    tabla = np.empty(TOTAL_CONTEXTOS, dtype=np.float32)
+
+    for inicio in range(0, TOTAL_CONTEXTOS, TAMANO_BLOQUE):
+        bloque = contextos[inicio:inicio + TAMANO_BLOQUE]
+        tabla[inicio:inicio + len(bloque)] = predecir_digitos(bloque)
+
+    np.save(ruta, tabla)
+    with open(ruta_version, "w") as f:
+        json.dump({
+            "modelo": ruta_modelo,
+            "sha256_modelo": huella_modelo(ruta_modelo),
+            "contextos": TOTAL_CONTEXTOS
+        }, f, indent=4)
+
+    print(f"✓ Tabla de contextos guardada en: {ruta}")
+
+# ============ TABLA EN SERVICIO ============
+class TablaContextos:
+    """Predicción del siguiente dígito como búsqueda O(1) en una tabla mapeada en memoria"""
+
+    def __init__(self, ruta=RUTA_TABLA, ruta_version=RUTA_VERSION_TABLA):
+        with open(ruta_version) as f:
+            version = json.load(f)
+        if version["sha256_modelo"] != huella_modelo(version["modelo"]):
+            raise ValueError(f"{ruta} no corresponde a {version['modelo']}; reconstrúyela")
+
+        self.tabla = np.load(ruta, mmap_mode="r")
+        if self.tabla.shape != (TOTAL_CONTEXTOS,):
+            raise ValueError(f"{ruta} no tiene {TOTAL_CONTEXTOS} contextos")
+
+    def __call__(self, ventanas):
+        """Valor predicho (escala original) para ventanas de dígitos de forma (n, 5)"""
+        return self.tabla[np.asarray(ventanas) @ POTENCIAS]
+
+if __name__ == "__main__":
+    # Construir con el backend NumPy si hay pesos exportados (no requiere TensorFlow)
+    from inferencia import cargar_predictor
+
+    backend = "numpy" if os.path.exists("modelo_lstm.npz") else "keras"
+    construir_tabla(cargar_predictor(backend))
@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+# Los módulos del proyecto están en la raíz del repositorio
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import database
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: pruebas con datos grandes (deselecciona con -m 'not slow')")
+
+@pytest.fixture(scope="session", autouse=True)
+def proyecto(tmp_path_factory):
+    """Ejecutar desde la raíz (rutas relativas del proyecto) y nunca tocar predicciones.db"""
+    anterior = os.getcwd()
+    os.chdir(RAIZ)
+    database.DB_PATH = str(tmp_path_factory.mktemp("bd") / "sesion.db")
+    yield
+    database.cerrar_conexiones()
+    os.chdir(anterior)
+
+@pytest.fixture
+def bd(tmp_path):
+    """Base de datos nueva e inicializada para una prueba"""
+    anterior = database.DB_PATH
+    database.DB_PATH = str(tmp_path / "prueba.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.inicializar_bd()
+    yield database.DB_PATH
+    database.cerrar_conexiones()
+    database.DB_PATH = anterior
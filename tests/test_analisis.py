@@ -0,0 +1,83 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from analisis import AnalisisCacheado, AnalisisIncremental, analizar, consultar_ngramas, transiciones_ordenadas
+from benchmarks import analisis_anterior
+from datos import cargar_digitos, digitos_desde_texto
+
+# ============ ANÁLISIS DE PATRONES ============
+@pytest.mark.parametrize("texto", [
+    "".join(map(str, np.random.default_rng(0).choice(10, size=200_000, p=np.linspace(1, 2, 10) / 15))),
+    "1234512345999",  # Empates: el orden debe seguir la primera aparición
+    "7777",
+])
+def test_igual_que_la_implementacion_anterior(texto):
+    esperado, esperadas = analisis_anterior(texto)
+    digitos = digitos_desde_texto(texto)
+    assert analizar(digitos) == esperado
+    assert transiciones_ordenadas(digitos) == esperadas
+
+# ============ CACHÉ POR VERSIÓN ============
+@pytest.fixture
+def csv_grande(tmp_path):
+    ruta = tmp_path / "numeros.csv"
+    with open(ruta, "w") as f:
+        f.write("numero,fecha\n")
+        f.writelines(f"{n},01/01/2026\n" for n in np.random.default_rng(0).integers(1000, 10000, 5000))
+    return ruta
+
+def cache_de(ruta, **kwargs):
+    return AnalisisCacheado(str(ruta), ruta_historico=str(ruta.parent / "historico.npz"), **kwargs)
+
+def test_cache_incremental_igual_que_recalcular(csv_grande):
+    cache = cache_de(csv_grande, ruta_indice=None)
+    primero = cache.obtener()
+    assert cache.obtener() is primero  # Sin cambios no se recalcula nada
+
+    with open(csv_grande, "a") as f:
+        f.write("4321,02/01/2026\n0677,03/01/2026\n")
+    assert cache.obtener() == analizar(cargar_digitos(str(csv_grande)))
+    assert cache.estadisticas()["actualizaciones"] == 1 and cache.estadisticas()["recalculos"] == 1
+
+    # Cambiar una fila ya procesada obliga a recalcular
+    with open(csv_grande, "r+b") as f:
+        f.seek(len("numero,fecha\n"))
+        f.write(b"0")
+    assert cache.obtener() == analizar(cargar_digitos(str(csv_grande)))
+    assert cache.estadisticas()["recalculos"] == 2
+
+# ============ ÍNDICE DE N-GRAMAS ============
+def test_ngramas_como_counter_agregando_por_partes():
+    # Por partes de 997 dígitos para que la cola entre partes cuente
+    texto = "".join(map(str, np.random.default_rng(1).integers(0, 10, 20_000)))
+    partes = AnalisisIncremental()
+    for inicio in range(0, len(texto), 997):
+        partes.agregar(np.frombuffer(texto[inicio:inicio + 997].encode(), np.uint8) - 48)
+
+    for orden in range(1, 6):
+        esperado = Counter(texto[i:i + orden] for i in range(len(texto) - orden + 1))
+        assert {f"{c:0{orden}d}": int(v) for c, v in enumerate(partes.ngramas[orden]) if v} == esperado
+
+    esperado = Counter(texto[i:i + 3] for i in range(len(texto) - 2) if texto.startswith("71", i))
+    consulta = consultar_ngramas(partes.ngramas[3], 3, "71", 10)
+    assert consulta["total"] == sum(esperado.values())
+    assert [(n["ngrama"], n["cantidad"]) for n in consulta["ngramas"]] == \
+        sorted(esperado.items(), key=lambda par: (-par[1], par[0]))
+
+def test_indice_de_ngramas_sobrevive_al_reinicio(csv_grande):
+    indice = csv_grande.parent / "ngramas.npz"
+    primero = cache_de(csv_grande, ruta_indice=str(indice))
+    esperado = primero.consultar_ngramas(5, "7", 20)
+
+    reiniciado = cache_de(csv_grande, ruta_indice=str(indice))
+    assert reiniciado.consultar_ngramas(5, "7", 20) == esperado
+    assert reiniciado.estadisticas()["recalculos"] == 0
+
+    with open(csv_grande, "a") as f:
+        f.write("7777,02/01/2026\n")
+    reiniciado = cache_de(csv_grande, ruta_indice=str(indice))
+    assert reiniciado.consultar_ngramas(4, "7777")["total"] == \
+        primero.consultar_ngramas(4, "7777")["total"]
+    assert reiniciado.estadisticas()["recalculos"] == 0 and reiniciado.estadisticas()["actualizaciones"] == 1
@@ -0,0 +1,205 @@
+import contextlib
+import io
+import threading
+
+import pytest
+
+@pytest.fixture(scope="module")
+def app_web():
+    # Se importa aquí, con la BD temporal de la sesión ya configurada
+    import app_web
+    return app_web
+
+@pytest.fixture
+def cliente(app_web, bd):
+    return app_web.app.test_client()
+
+def test_correlacion_repetida_responde_409(app_web, cliente, monkeypatch):
+    import database
+
+    monkeypatch.setattr(app_web, "MODO_PERSISTENCIA", "diferida")
+    primera = cliente.get("/api/prediccion", headers={"X-Correlation-ID": "cliente-1"})
+    assert primera.status_code == 200 and primera.get_json()["correlacion"] == "cliente-1"
+
+    repetida = cliente.get("/api/prediccion", headers={"X-Correlation-ID": "cliente-1"})
+    assert repetida.status_code == 409
+
+    database.obtener_escritor().volcar()
+    assert cliente.get("/api/prediccion/correlacion/cliente-1").status_code == 200
+
+def test_resultados_reales_error_de_bd_responde_500(cliente):
+    from test_database import bloquear_resultados
+
+    bloquear_resultados()
+    respuesta = cliente.post("/api/resultados-reales", json=[{"fecha": "2024-01-15", "numeros": "0677"}])
+    assert respuesta.status_code == 500
+    assert respuesta.get_json()["success"] is False
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+def test_resultados_reales_guardados(cliente, bom):
+    import io
+
+    csv = bom + b"numero,fecha\n0677,15/01/2024\n"
+    respuesta = cliente.post("/api/resultados-reales", data=csv, content_type="text/csv")
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["guardados"] == 1
+
+    respuesta = cliente.post("/api/resultados-reales", data={"archivo": (io.BytesIO(csv), "resultados.csv")},
+                             content_type="multipart/form-data")
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["guardados"] == 1
+
+@pytest.mark.parametrize("ruta", [
+    "/api/ngramas?orden=dos", "/api/ngramas?top=diez", "/api/ngramas?orden=2.5", "/api/ngramas?orden=2&top=",
+    "/api/prediccion?n=tres", "/api/prediccion?n=2.5", "/api/prediccion?n=",
+    "/api/prediccion/top?k=diez", "/api/prediccion/top?haz=cien", "/api/prediccion/top?k=5&haz=",
+    "/api/historial?limite=diez", "/api/comparaciones?limite=1e3",
+])
+def test_parametro_no_entero_responde_400(cliente, ruta):
+    respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 400
+    assert "entero" in respuesta.get_json()["error"]
+
+@pytest.mark.parametrize("ruta, clave", [
+    ("/api/historial", [{"a": 1}, 2]),
+    ("/api/historial", ["2026-01-01", [1]]),
+    ("/api/historial", ["2026-01-01", True]),
+    ("/api/historial", ["2026-01-01", 2 ** 64]),
+    ("/api/historial", ["2026-01-01"]),
+    ("/api/comparaciones", ["2026-01-01", 1, None]),
+    ("/api/comparaciones", ["2026-01-01", 1, 1.5]),
+    ("/api/comparaciones", {"fecha": "2026-01-01"}),
+])
+def test_cursor_con_tipos_inesperados_responde_400(cliente, ruta, clave):
+    import base64
+    import json
+
+    cursor = base64.urlsafe_b64encode(json.dumps(clave).encode()).decode()
+    respuesta = cliente.get(f"{ruta}?cursor={cursor}")
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["error"] == "Cursor inválido"
+
+# ============ AGRUPADOR DE PETICIONES ============
+class MotorBloqueado:
+    """Motor cuyo generar_lote espera a que se suelte el evento"""
+
+    def __init__(self):
+        self.soltar = threading.Event()
+        self.lotes = []
+
+    def generar_lote(self, n):
+        self.soltar.wait()
+        self.lotes.append(n)
+        return ["1234"] * n
+
+@pytest.fixture
+def motor_bloqueado():
+    motor = MotorBloqueado()
+    yield motor
+    motor.soltar.set()
+
+def test_agrupador_sin_respuesta_agota_el_tiempo(app_web, motor_bloqueado):
+    agrupador = app_web.AgrupadorPeticiones(motor_bloqueado, ventana_ms=0, timeout_s=0.05)
+    with pytest.raises(app_web.AgrupadorNoDisponible):
+        agrupador.enviar(1)  # Entra en un lote que no termina
+    with pytest.raises(app_web.AgrupadorNoDisponible):
+        agrupador.enviar(2)  # Se queda en la cola y se cancela
+
+    motor_bloqueado.soltar.set()
+    assert agrupador.enviar(3) == ["1234"] * 3
+    assert motor_bloqueado.lotes == [1, 3]  # El lote cancelado no se genera
+    assert agrupador.estadisticas()["peticiones_agotadas"] == 2
+
+def test_agrupador_con_hilo_detenido(app_web, motor_bloqueado):
+    agrupador = app_web.AgrupadorPeticiones(motor_bloqueado, timeout_s=0.05)
+    agrupador.hilo = threading.Thread(target=lambda: None)
+    agrupador.hilo.start()
+    agrupador.hilo.join()
+    with pytest.raises(app_web.AgrupadorNoDisponible, match="se detuvo"):
+        agrupador.enviar(1)
+    assert agrupador.cola.empty()
+
+@pytest.mark.parametrize("ruta", ["/api/prediccion", "/api/prediccion?n=3"])
+def test_prediccion_sin_agrupador_responde_503(app_web, cliente, motor_bloqueado, monkeypatch, ruta):
+    agrupador = app_web.AgrupadorPeticiones(motor_bloqueado, ventana_ms=0, timeout_s=0.05)
+    monkeypatch.setattr(app_web, "cargar_modelo", lambda: agrupador)
+
+    respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 503
+    assert "agrupador" in respuesta.get_json()["error"]
+
+def test_prediccion_lote_guarda_cada_candidato(app_web, cliente, monkeypatch):
+    import database
+
+    class MotorRepetido:
+        def generar_lote(self, n):
+            return ["1234", "1234", "5678"][:n]
+
+    agrupador = app_web.AgrupadorPeticiones(MotorRepetido(), ventana_ms=0)
+    monkeypatch.setattr(app_web, "cargar_modelo", lambda: agrupador)
+    monkeypatch.setattr(app_web, "MODO_PERSISTENCIA", "sincrona")
+
+    respuesta = cliente.get("/api/prediccion?n=3")
+    assert respuesta.get_json()["predicciones"] == ["1234", "1234", "5678"]
+    assert database.obtener_estadisticas_generales()["total_predicciones"] == 3
+
+# ============ CACHÉ HTTP ============
+@pytest.mark.parametrize("ruta", ["/api/analisis", "/api/metricas", "/api/estadisticas-bd",
+                                  "/api/historial?limite=5", "/api/aciertos-posicion"])
+def test_revalidacion_responde_304(cliente, ruta):
+    completa = cliente.get(ruta)
+    assert completa.status_code == 200 and completa.cache_control.no_cache
+    etag, modificado = completa.headers["ETag"], completa.headers["Last-Modified"]
+
+    sin_cambios = cliente.get(ruta, headers={"If-None-Match": etag})
+    assert sin_cambios.status_code == 304 and sin_cambios.data == b""
+    assert sin_cambios.headers["ETag"] == etag
+    assert cliente.get(ruta, headers={"If-Modified-Since": modificado}).status_code == 304
+    assert cliente.get(ruta, headers={"If-None-Match": 'W/"otra"'}).status_code == 200
+
+def test_etag_cambia_con_la_bd(cliente):
+    import database
+
+    etag = cliente.get("/api/historial?limite=5").headers["ETag"]
+    assert cliente.get("/api/historial?limite=6").headers["ETag"] != etag  # Cada consulta, su ETag
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.guardar_prediccion("0677", 50.0)
+    nueva = cliente.get("/api/historial?limite=5", headers={"If-None-Match": etag})
+    assert nueva.status_code == 200 and nueva.headers["ETag"] != etag
+    assert nueva.get_json()["predicciones"][0]["numeros"] == "0677"
+
+def test_respuestas_grandes_con_gzip(cliente):
+    import gzip
+    import json
+    import database
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.guardar_predicciones([f"{i:04d}" for i in range(100)], 50.0)
+    plana = cliente.get("/api/historial?limite=100")
+    comprimida = cliente.get("/api/historial?limite=100", headers={"Accept-Encoding": "gzip"})
+    assert comprimida.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in comprimida.vary
+    assert len(comprimida.data) < len(plana.data)
+    assert json.loads(gzip.decompress(comprimida.data)) == plana.get_json()
+    assert comprimida.headers["ETag"] == plana.headers["ETag"]
+
+def test_metricas_nuevas_tras_reentrenar(app_web, cliente, monkeypatch, tmp_path):
+    import json
+    import os
+    from metricas import ModelMetrics
+
+    ruta = tmp_path / "metricas_modelo.json"
+    ruta.write_text(json.dumps({"exactitud_validacion": 10}))
+    monkeypatch.setitem(app_web.ARCHIVOS_VERSIONADOS, "metricas", str(ruta))
+    monkeypatch.setattr(app_web, "metrics", ModelMetrics(metrics_path=str(ruta)))
+
+    primera = cliente.get("/api/metricas")
+    assert primera.get_json()["metricas_entrenamiento"] == {"exactitud_validacion": 10}
+    assert cliente.get("/api/metricas", headers={"If-None-Match": primera.headers["ETag"]}).status_code == 304
+
+    # Reentrenar con el proceso en marcha
+    ruta.write_text(json.dumps({"exactitud_validacion": 90}))
+    os.utime(ruta, ns=(1, 1))
+    segunda = cliente.get("/api/metricas", headers={"If-None-Match": primera.headers["ETag"]})
+    assert segunda.status_code == 200
+    assert segunda.get_json()["metricas_entrenamiento"] == {"exactitud_validacion": 90}
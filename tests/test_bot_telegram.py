@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+
+class MensajeLocal:
+    """Sustituto de telegram.Message: guarda las respuestas en lugar de enviarlas"""
+
+    def __init__(self):
+        self.respuestas = []
+
+    async def reply_text(self, texto, **kwargs):
+        self.respuestas.append(texto)
+
+@pytest.fixture
+def bot(bd):
+    # Se importa aquí, con la BD temporal ya configurada (inicializa la BD al importarse)
+    import bot_telegram
+    return bot_telegram
+
+async def atender(manejador, chats):
+    """Atender chats simultáneos y medir el mayor retraso de un latido de 1 ms del loop"""
+    retraso_maximo = 0.0
+    activo = True
+
+    async def pulso():
+        nonlocal retraso_maximo
+        while activo:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            retraso_maximo = max(retraso_maximo, time.perf_counter() - inicio - 0.001)
+
+    latido = asyncio.create_task(pulso())
+    updates = [SimpleNamespace(message=MensajeLocal()) for _ in range(chats)]
+    await asyncio.gather(*(manejador(u, None) for u in updates))
+    activo = False
+    await latido
+    return updates, retraso_maximo
+
+def test_chats_simultaneos_reciben_respuesta(bot):
+    import database
+
+    updates, _ = asyncio.run(atender(bot.prediccion, 20))
+
+    assert all(len(u.message.respuestas) == 1 for u in updates)
+    assert not any("Error" in u.message.respuestas[0] for u in updates)
+    # Cada chat guarda su predicción, aunque se repitan en el mismo segundo
+    assert database.obtener_estadisticas_generales()["total_predicciones"] == 20
+
+def test_trabajo_bloqueante_fuera_del_loop(bot, monkeypatch):
+    hilos = []
+
+    def lento():
+        hilos.append(threading.current_thread().name)
+        time.sleep(0.2)  # Inferencia y commit lentos
+        return "1234", 50.0
+
+    monkeypatch.setattr(bot, "generar_y_guardar_prediccion", lento)
+    inicio = time.perf_counter()
+    updates, retraso = asyncio.run(atender(bot.prediccion, bot.MAX_HILOS_BOT))
+    total = time.perf_counter() - inicio
+
+    assert all("1234" in u.message.respuestas[0] for u in updates)
+    assert all(nombre.startswith("bot") for nombre in hilos)
+    # Los chats se atienden en paralelo y el loop sigue respondiendo mientras tanto
+    assert total < 0.2 * bot.MAX_HILOS_BOT
+    assert retraso < 0.1
+
+def test_consultas_en_el_ejecutor(bot):
+    updates, _ = asyncio.run(atender(bot.estadisticas, 5))
+    assert all("Total de predicciones" in u.message.respuestas[0] for u in updates)
+
+    updates, _ = asyncio.run(atender(bot.historial, 5))
+    assert all("Últimas 10 Predicciones" in u.message.respuestas[0] for u in updates)
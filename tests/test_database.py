@@ -0,0 +1,455 @@
+import contextlib
+import io
+import sqlite3
+
+import numpy as np
+import pytest
+
+import database
+
+def insertar_predicciones(filas):
+    """Insertar predicciones (fecha, numero) directamente; devuelve sus IDs"""
+    with database.conexion() as conn:
+        return [conn.execute("INSERT INTO predicciones (fecha, numero) VALUES (?, ?)", fila).lastrowid
+                for fila in filas]
+
+def silencio():
+    return contextlib.redirect_stdout(io.StringIO())
+
+# ============ PLANES DE CONSULTA ============
+def test_consultas_criticas_sin_recorrido_completo(bd):
+    informe = database.verificar_planes_consulta()
+    assert not [nombre for nombre, r in informe.items() if r["recorrido_completo"]], informe
+
+def test_planes_con_estadisticas_de_solo_algunas_tablas(bd):
+    # PRAGMA optimize puede dejar analizada resultados_reales y comparaciones no
+    with database.conexion() as conn:
+        conn.execute("ANALYZE sqlite_schema")
+        conn.execute("INSERT INTO sqlite_stat1 VALUES "
+                     "('resultados_reales', 'sqlite_autoindex_resultados_reales_1', '2000 1')")
+    database.cerrar_conexiones()  # Las estadísticas se leen al abrir la conexión
+    informe = database.verificar_planes_consulta()
+    assert not [nombre for nombre, r in informe.items() if r["recorrido_completo"]], informe
+
+def test_scan_por_indice_no_acotado_se_detecta(bd):
+    # Recorrer predicciones por fecha buscando comparaciones que quizá no existan
+    # no queda acotado por el LIMIT aunque use índices
+    sql = '''
+        SELECT p.id, c.id FROM predicciones p
+        CROSS JOIN comparaciones c ON c.prediccion_id = p.id
+        ORDER BY p.fecha DESC LIMIT ?
+    '''
+    informe = database.verificar_planes_consulta({"cruzada": (sql, (10,))})
+    assert informe["cruzada"]["recorrido_completo"], informe
+    assert database.recorre_completo(["SCAN predicciones USING INDEX idx_predicciones_fecha"],
+                                     "SELECT * FROM predicciones ORDER BY fecha")
+    assert database.recorre_completo(["SCAN predicciones"], "SELECT * FROM predicciones LIMIT 1")
+
+def test_historial_comparaciones_ordenado_y_paginado(bd):
+    ids = insertar_predicciones([(f"2026-01-0{d} 10:00:00", 1000 + d) for d in range(1, 6)])
+    with silencio():
+        database.guardar_resultados_reales([(f"2026-01-0{d}", "1001") for d in range(1, 6)])
+        database.comparar_pendientes()
+        database.comparar_prediccion_con_resultado(ids[0], 1)  # Segunda comparación de la más antigua
+
+    historial = database.obtener_historial_comparaciones(10)
+    assert [h["prediccion"] for h in historial] == ["1005", "1004", "1003", "1002", "1001", "1001"]
+    assert historial[0]["fecha"] == "2026-01-05 10:00:00"
+
+    vistas, cursor = [], None
+    while True:
+        pagina = database.obtener_pagina_comparaciones(2, cursor)
+        vistas += pagina["comparaciones"]
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            break
+    assert vistas == historial
+
+# ============ COMPARAR PENDIENTES ============
+def comparaciones_de(ids):
+    with database.conexion() as conn:
+        return {pid: conn.execute("SELECT aciertos_totales, aciertos_secuencia, porcentaje_acierto "
+                                  "FROM comparaciones WHERE prediccion_id = ?", (pid,)).fetchall()
+                for pid in ids}
+
+def test_comparar_pendientes_con_el_resultado_nuevo(bd):
+    exacta, parcial, fallo, comparada, ultimo_segundo, dia_siguiente = insertar_predicciones([
+        ("2026-01-01 09:00:00", 1234), ("2026-01-01 10:00:00", 1299), ("2026-01-01 11:00:00", 5678),
+        ("2026-01-01 12:00:00", 1230), ("2026-01-01 23:59:59", 4234), ("2026-01-02 00:00:00", 1234)])
+    with silencio():
+        resultado_id = database.guardar_resultado_real("2026-01-01", "1234")
+        database.comparar_prediccion_con_resultado(comparada, resultado_id)
+        resumen = database.comparar_pendientes()
+
+    # La ya comparada no se cuenta de nuevo y la del día siguiente sigue pendiente
+    assert resumen == {"comparadas": 4, "aciertos_secuencia": 1, "porcentaje_promedio": 56.25}
+    assert comparaciones_de([exacta, parcial, fallo, comparada, ultimo_segundo, dia_siguiente]) == {
+        exacta: [(4, 1, 100.0)], parcial: [(2, 0, 50.0)], fallo: [(0, 0, 0.0)],
+        comparada: [(3, 0, 75.0)], ultimo_segundo: [(3, 0, 75.0)], dia_siguiente: []}
+
+    with silencio():
+        assert database.comparar_pendientes()["comparadas"] == 0
+        database.guardar_resultado_real("2026-01-02", "1234")
+        assert database.comparar_pendientes()["comparadas"] == 1
+    assert comparaciones_de([dia_siguiente])[dia_siguiente] == [(4, 1, 100.0)]
+    assert database.obtener_estadisticas_generales()["total_comparaciones"] == 6
+
+def test_comparar_pendientes_igual_que_por_par(bd):
+    rng = np.random.default_rng(0)
+    numeros = rng.integers(0, 10000, 300)
+    ids = insertar_predicciones([(f"2026-01-{1 + i % 10:02d} 12:{i // 10:02d}:00", int(n))
+                                 for i, n in enumerate(numeros)])
+    with silencio():
+        database.guardar_resultados_reales([(f"2026-01-{d:02d}", f"{(d * 7919) % 10000:04d}")
+                                            for d in range(1, 11)])
+        assert database.comparar_pendientes()["comparadas"] == len(ids)
+
+    for i, (pid, filas) in enumerate(comparaciones_de(ids).items()):
+        prediccion, resultado = f"{numeros[i]:04d}", f"{((1 + i % 10) * 7919) % 10000:04d}"
+        aciertos = sum(p == r for p, r in zip(prediccion, resultado))
+        assert filas == [(aciertos, int(prediccion == resultado), aciertos * 25.0)]
+
+def test_migra_fecha_de_comparaciones(tmp_path):
+    ruta = str(tmp_path / "antigua.db")
+    conn = sqlite3.connect(ruta)
+    conn.executescript('''
+        CREATE TABLE predicciones (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP, numeros_predichos TEXT,
+            confianza REAL, punto_inicio TEXT, UNIQUE(fecha, numeros_predichos));
+        CREATE TABLE comparaciones (id INTEGER PRIMARY KEY AUTOINCREMENT, prediccion_id INTEGER,
+            resultado_id INTEGER, aciertos_totales INTEGER, aciertos_secuencia INTEGER,
+            porcentaje_acierto REAL);
+        INSERT INTO predicciones (fecha, numeros_predichos) VALUES ('2026-01-01 08:00:00', '0677');
+        INSERT INTO comparaciones (prediccion_id, resultado_id, aciertos_totales,
+            aciertos_secuencia, porcentaje_acierto) VALUES (1, 1, 2, 0, 50.0);
+    ''')
+    conn.close()
+
+    anterior = database.DB_PATH
+    database.DB_PATH = ruta
+    try:
+        with silencio():
+            database.inicializar_bd()
+        with database.conexion() as conn:
+            assert conn.execute("SELECT fecha_prediccion FROM comparaciones").fetchone() == \
+                ("2026-01-01 08:00:00",)
+    finally:
+        database.cerrar_conexiones()
+        database.DB_PATH = anterior
+
+@contextlib.contextmanager
+def usar_bd(ruta):
+    """Apuntar database a otra BD mientras dura el bloque"""
+    anterior = database.DB_PATH
+    database.DB_PATH = ruta
+    try:
+        yield
+    finally:
+        database.cerrar_conexiones()
+        database.DB_PATH = anterior
+
+def test_migra_numeros_de_texto_y_aparta_los_invalidos(tmp_path):
+    ruta = str(tmp_path / "antigua.db")
+    conn = sqlite3.connect(ruta)
+    conn.executescript('''
+        CREATE TABLE predicciones (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP, numeros_predichos TEXT NOT NULL,
+            confianza REAL, punto_inicio TEXT, UNIQUE(fecha, numeros_predichos));
+        CREATE TABLE resultados_reales (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha DATE UNIQUE NOT NULL, numeros_ganadores TEXT NOT NULL);
+        INSERT INTO predicciones (fecha, numeros_predichos) VALUES
+            ('2026-01-01 08:00:00', '0677'),
+            ('2026-01-01 08:00:01', '[0, 6, 7, 7]'),
+            ('2026-01-01 08:00:02', 'Error: name ''model'' is not defined'),
+            ('2026-01-01 08:00:03', '677');
+        INSERT INTO resultados_reales (fecha, numeros_ganadores) VALUES
+            ('2026-01-01', '[1, 2, 3, 4]'), ('2026-01-02', 'sin sorteo');
+    ''')
+    conn.close()
+
+    with usar_bd(ruta):
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            database.inicializar_bd()
+        assert "predicciones_no_migradas" in salida.getvalue()
+
+        with database.conexion() as conn:
+            assert conn.execute("SELECT id, numero FROM predicciones ORDER BY id").fetchall() == \
+                [(1, 677), (2, 677), (4, 677)]
+            assert conn.execute("SELECT id, numeros_predichos FROM predicciones_no_migradas").fetchall() == \
+                [(3, "Error: name 'model' is not defined")]
+            assert conn.execute("SELECT numeros_ganadores FROM resultados_reales").fetchall() == [("1234",)]
+            assert conn.execute("SELECT fecha FROM resultados_reales_no_migradas").fetchall() == \
+                [("2026-01-02",)]
+        assert database.obtener_estadisticas_generales()["total_predicciones"] == 3
+
+@pytest.mark.slow
+def test_planes_con_un_millon_de_predicciones(bd, tmp_path):
+    from benchmarks import sembrar_bd
+
+    sembrar_bd(str(tmp_path / "grande.db"), 1_000_000)
+    with silencio():
+        database.inicializar_bd()  # PRAGMA optimize con los datos ya cargados
+
+    informe = database.verificar_planes_consulta()
+    assert not [nombre for nombre, r in informe.items() if r["recorrido_completo"]], informe
+
+    # Las comparaciones más recientes son las de las últimas predicciones comparadas
+    historial = database.obtener_historial_comparaciones(3)
+    with database.conexion() as conn:
+        esperado = conn.execute(
+            "SELECT p.fecha FROM comparaciones c JOIN predicciones p ON p.id = c.prediccion_id "
+            "ORDER BY p.fecha DESC, c.id DESC LIMIT 3").fetchall()
+    assert [h["fecha"] for h in historial] == [fila[0] for fila in esperado]
+
+# ============ PREDICCIONES ============
+def test_candidatos_repetidos_se_guardan_todos(bd):
+    with silencio():
+        assert database.guardar_predicciones(["1234", "1234", "5678", "1234"], 50.0) == 4
+        assert database.guardar_prediccion("1234") is not None
+    with database.conexion() as conn:
+        fechas = [f for (f,) in conn.execute("SELECT fecha FROM predicciones ORDER BY id")]
+    assert len(fechas) == 5 and fechas == sorted(set(fechas))
+    assert database.obtener_estadisticas_generales()["total_predicciones"] == 5
+
+# ============ ESTADÍSTICAS ============
+def fila_estadisticas(conn):
+    """Fila acumulada sin la fecha de actualización"""
+    fila = conn.execute("SELECT * FROM estadisticas WHERE id = 1").fetchone()
+    return fila[:1] + fila[2:]
+
+def test_triggers_igual_que_recalcular(bd, tmp_path):
+    from benchmarks import sembrar_bd
+
+    sembrar_bd(str(tmp_path / "estadisticas.db"), 3000, resultados=20, comparaciones=1000)
+    insertar_predicciones([("2020-01-01 00:00:30", 677)])
+    with silencio():
+        database.comparar_pendientes()
+
+    with database.conexion() as conn:
+        incremental = fila_estadisticas(conn)
+        conn.execute("SAVEPOINT recalcular")
+        database.recalcular_estadisticas(conn.cursor())
+        recalculada = fila_estadisticas(conn)
+        conn.execute("ROLLBACK TO recalcular")
+    assert incremental == recalculada
+    assert incremental[1] == 3001  # total_predicciones
+
+def test_aciertos_por_posicion_incluyen_lo_archivado(bd, tmp_path):
+    insertar_predicciones([("2026-01-01 10:00:00", 1234), ("2026-01-02 10:00:00", 1299),
+                           ("2026-01-03 10:00:00", 9234)])
+    with silencio():
+        database.guardar_resultados_reales([("2026-01-01", "1234"), ("2026-01-02", "1200"),
+                                            ("2026-01-03", "1234")])
+        database.comparar_pendientes()
+
+    antes = database.obtener_aciertos_por_posicion()
+    assert antes == {"comparaciones": 3, "posiciones": [66.67, 100.0, 66.67, 66.67]}
+
+    with silencio():
+        database.archivar_antiguas(ruta_archivo=str(tmp_path / "archivo.db"), fecha_corte="2027-01-01")
+    with database.conexion() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM comparaciones").fetchone()[0] == 0
+    assert database.obtener_aciertos_por_posicion() == antes
+    assert database.obtener_estadisticas_generales()["total_comparaciones"] == 3
+
+# ============ ARCHIVO ============
+def test_archivar_mueve_filas_y_conserva_estadisticas(bd, tmp_path):
+    from benchmarks import sembrar_bd
+
+    ruta = str(tmp_path / "archivo.db")
+    ruta_archivo = str(tmp_path / "historico.db")
+    sembrar_bd(ruta, 30000, resultados=30, comparaciones=10000)
+    antes = database.obtener_estadisticas_generales()
+    with database.conexion() as conn:
+        paginas_antes = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    with silencio():
+        resumen = database.archivar_antiguas(ruta_archivo=ruta_archivo, fecha_corte="2020-01-11")
+    assert resumen["predicciones"] == 14400 and resumen["comparaciones"] == 4800
+
+    with database.conexion() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM predicciones").fetchone()[0] == 30000 - 14400
+        assert conn.execute("SELECT MIN(fecha) FROM predicciones").fetchone()[0] >= "2020-01-11"
+        assert conn.execute("SELECT COUNT(*) FROM comparaciones c LEFT JOIN predicciones p "
+                            "ON p.id = c.prediccion_id WHERE p.id IS NULL").fetchone()[0] == 0
+        assert conn.execute("PRAGMA page_count").fetchone()[0] < paginas_antes
+    archivo = sqlite3.connect(ruta_archivo)
+    try:
+        assert archivo.execute("SELECT COUNT(*), MAX(fecha) FROM predicciones").fetchone() == \
+            (14400, "2020-01-10 23:59:00")
+        assert archivo.execute("SELECT COUNT(*) FROM comparaciones").fetchone()[0] == 4800
+    finally:
+        archivo.close()
+    assert database.obtener_estadisticas_generales() == antes
+
+# ============ ESCRITURA DIFERIDA ============
+@pytest.fixture
+def escritor(bd):
+    escritor = database.EscritorDiferido(intervalo_ms=20)
+    yield escritor
+    with silencio():
+        escritor.cerrar()
+
+def test_diferida_guarda_numeros_repetidos(escritor):
+    correlaciones = escritor.encolar(["1234", "1234", "5678"], 50.0)
+    escritor.volcar()
+
+    ids = [database.obtener_prediccion_por_correlacion(c) for c in correlaciones]
+    assert None not in ids and len(set(ids)) == 3
+    assert escritor.estadisticas()["escritas"] == 3
+    assert database.obtener_estadisticas_generales()["total_predicciones"] == 3
+
+def test_diferida_fecha_de_la_peticion(escritor):
+    correlacion = escritor.encolar(["0677"])[0]
+    fecha_encolado = escritor.ultima_fecha
+    escritor.volcar()
+    with database.conexion() as conn:
+        fecha = conn.execute("SELECT fecha FROM predicciones WHERE correlacion = ?",
+                             (correlacion,)).fetchone()[0]
+    assert fecha == fecha_encolado.isoformat(sep=" ", timespec="microseconds")
+
+def test_diferida_rechaza_correlacion_repetida(escritor):
+    escritor.encolar(["1234"], correlaciones=["cliente-1"])
+    with pytest.raises(database.CorrelacionDuplicada):
+        escritor.encolar(["5678"], correlaciones=["cliente-1"])  # Aún en la cola
+    escritor.volcar()
+    with pytest.raises(database.CorrelacionDuplicada):
+        escritor.encolar(["5678"], correlaciones=["cliente-1"])  # Ya guardada
+    with pytest.raises(database.CorrelacionDuplicada):
+        escritor.encolar(["1111", "2222"], correlaciones=["x", "x"])
+
+    with database.conexion() as conn:
+        assert conn.execute("SELECT numeros_predichos FROM predicciones WHERE correlacion = 'cliente-1'"
+                            ).fetchall() == [("1234",)]
+
+def test_diferida_reintenta_lote_fallido(escritor, monkeypatch):
+    original = database.conexion
+    fallos = []
+
+    def conexion_inestable():
+        if not fallos:
+            fallos.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return original()
+
+    monkeypatch.setattr(database, "conexion", conexion_inestable)
+    with silencio():
+        correlaciones = escritor.encolar(["1111", "2222"])
+        escritor.volcar()
+
+    assert all(database.obtener_prediccion_por_correlacion(c) for c in correlaciones)
+    assert escritor.estadisticas()["reintentos"] == 1
+    assert escritor.estadisticas()["escritas"] == 2
+
+def test_diferida_cerrar_guarda_todo_lo_encolado(bd):
+    escritor = database.EscritorDiferido(intervalo_ms=1000, max_pendientes=8)
+    correlaciones = [c for i in range(100) for c in escritor.encolar([f"{i:04d}"], 50.0)]
+    with silencio():
+        escritor.cerrar()
+
+    assert escritor.lotes > 1  # La cola llena fuerza volcados antes del intervalo
+    assert database.obtener_estadisticas_generales()["total_predicciones"] == 100
+    assert all(database.obtener_prediccion_por_correlacion(c) for c in correlaciones)
+
+# ============ VACUUM INCREMENTAL ============
+def test_bd_nueva_con_vacuum_incremental(bd):
+    with database.conexion() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+def test_bd_existente_solo_avisa_al_arrancar(tmp_path):
+    ruta = str(tmp_path / "existente.db")
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE otra (x)")
+    conn.close()
+
+    anterior = database.DB_PATH
+    database.DB_PATH = ruta
+    try:
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            database.inicializar_bd()
+        assert "vacuum-incremental" in salida.getvalue()
+        with database.conexion() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+        with silencio():
+            assert database.activar_vacuum_incremental()
+        with database.conexion() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    finally:
+        database.cerrar_conexiones()
+        database.DB_PATH = anterior
+
+# ============ IMPORTACIÓN DE RESULTADOS ============
+def bloquear_resultados():
+    """Hacer que cualquier inserción en resultados_reales falle en la BD"""
+    with database.conexion() as conn:
+        conn.execute('''
+            CREATE TRIGGER fallo_resultados BEFORE INSERT ON resultados_reales
+            BEGIN SELECT RAISE(ABORT, 'disco lleno'); END
+        ''')
+
+def test_importar_resultados_upsert_y_filas_invalidas(bd):
+    with silencio():
+        resumen = database.guardar_resultados_reales(
+            [("15/01/2024", "0677"), ("2024-01-15", "1234"), ("2024-01-16", "12a4")])
+    assert resumen["guardados"] == 2
+    assert [e["fila"] for e in resumen["errores"]] == [3]
+    assert database.obtener_resultado_por_fecha("2024-01-15")["numeros"] == "1234"
+
+def test_error_de_bd_al_importar_se_propaga(bd):
+    bloquear_resultados()
+    with pytest.raises(sqlite3.IntegrityError), silencio():
+        database.guardar_resultados_reales([("2024-01-15", "0677")])
+
+def test_cli_importar_termina_con_error(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    ruta_db = tmp_path / "predicciones.db"
+    conn = sqlite3.connect(ruta_db)
+    conn.execute(database.SQL_TABLA_RESULTADOS.format(tabla="resultados_reales"))
+    conn.execute("CREATE TRIGGER fallo_resultados BEFORE INSERT ON resultados_reales "
+                 "BEGIN SELECT RAISE(ABORT, 'disco lleno'); END")
+    conn.close()
+    (tmp_path / "resultados.csv").write_text("numero,fecha\n0677,15/01/2024\n")
+
+    script = os.path.join(os.path.dirname(database.__file__), "database.py")
+    proceso = subprocess.run([sys.executable, script, "importar", "resultados.csv"],
+                             cwd=tmp_path, capture_output=True, text=True)
+    assert proceso.returncode == 1, proceso.stdout + proceso.stderr
+    assert "disco lleno" in proceso.stdout
+
+# ============ VERSIÓN DE LOS DATOS ============
+def version():
+    return database.obtener_version_bd()[0]
+
+def test_version_sube_una_vez_por_transaccion(bd):
+    inicial = version()
+    with silencio():
+        database.guardar_resultados_reales([(f"2026-01-{d:02d}", d) for d in range(1, 29)])
+    assert version() == inicial + 1
+
+    insertar_predicciones([(f"2026-01-{d:02d} 10:00:00", d) for d in range(1, 29)])
+    with silencio():
+        database.comparar_pendientes()
+    assert version() == inicial + 3
+
+    database.obtener_ultimas_predicciones(10)
+    database.obtener_pagina_comparaciones(10)
+    assert version() == inicial + 3
+
+def test_version_no_sube_si_la_transaccion_falla(bd):
+    inicial = version()
+    with pytest.raises(sqlite3.IntegrityError):
+        with database.conexion() as conn:
+            conn.execute("INSERT INTO resultados_reales (fecha, numero) VALUES ('2026-01-01', 1)")
+            conn.execute("INSERT INTO resultados_reales (fecha, numero) VALUES ('2026-01-01', 2)")
+    assert version() == inicial
+
+def test_sin_triggers_de_version_por_fila(bd):
+    with database.conexion() as conn:
+        triggers = [fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+    assert not [t for t in triggers if t.startswith("trg_version_")]
@@ -0,0 +1,240 @@
+import numpy as np
+import pytest
+
+from datos import cargar_digitos, escritura_atomica, ingerir_csv, validar_fecha, validar_numero
+
+@pytest.fixture
+def csv_numeros(tmp_path):
+    ruta = tmp_path / "numeros.csv"
+    ruta.write_bytes(b"numero,fecha\n0677,24/01/2026\n1234,25/01/2026\n")
+    return ruta
+
+def digitos(*numeros):
+    return np.array([int(c) for n in numeros for c in n], dtype=np.uint8)
+
+@pytest.mark.parametrize("linea", [
+    b"\xff7,26/01/2026\n",          # Camino vectorizado
+    b'"\xff7",26/01/2026\n',        # Camino csv.reader (bloque con comillas)
+    b"0042,26/01/20\xff6\n",        # Byte inválido en la fecha
+])
+def test_byte_no_utf8_se_anota_como_fila_invalida(csv_numeros, linea):
+    with open(csv_numeros, "ab") as f:
+        f.write(linea + b"0042,27/01/2026\n")
+
+    resultado = ingerir_csv(str(csv_numeros))
+    assert resultado["errores"] == 1
+    assert resultado["detalle_errores"][0]["linea"] == 4
+    np.testing.assert_array_equal(cargar_digitos(str(csv_numeros)), digitos("0677", "1234", "0042"))
+
+def test_byte_no_utf8_en_filas_anadidas(csv_numeros):
+    ingerir_csv(str(csv_numeros))
+    with open(csv_numeros, "ab") as f:
+        f.write(b"\xff7,26/01/2026\n")
+
+    resultado = ingerir_csv(str(csv_numeros))
+    assert not resultado["reconstruido"]
+    assert resultado["detalle_errores"] == [{"linea": 4, "error": "Número inválido: '�7'"}]
+    assert len(cargar_digitos(str(csv_numeros))) == 8
+
+# ============ INGESTA POR BLOQUES ============
+@pytest.mark.parametrize("bytes_por_bloque", [64, 1 << 20])
+def test_ingesta_por_bloques(tmp_path, bytes_por_bloque):
+    from datos import AlmacenDigitos, fecha_desde_dia
+
+    rng = np.random.default_rng(0)
+    numeros = rng.integers(0, 10000, 3000)
+    dias = np.sort(rng.integers(0, 20000, 3000))
+    ruta = tmp_path / "numeros.csv"
+    with open(ruta, "w") as f:
+        f.write("numero,fecha\n")
+        # Sin ceros a la izquierda, como los deja un CSV guardado desde pandas
+        f.writelines(f"{n},{fecha_desde_dia(d)}\n" for n, d in zip(numeros, dias))
+        f.write("12345,01/01/2026\nabc,01/01/2026\n0677,32/01/2026\n")
+
+    resultado = ingerir_csv(str(ruta), bytes_por_bloque)
+    assert (resultado["filas"], resultado["errores"]) == (3000, 3)
+    assert [e["linea"] for e in resultado["detalle_errores"]] == [3002, 3003, 3004]
+
+    almacen = AlmacenDigitos(str(ruta))
+    esperado = "".join(f"{n:04d}" for n in numeros)
+    np.testing.assert_array_equal(almacen.digitos, np.frombuffer(esperado.encode(), dtype=np.uint8) - 48)
+    np.testing.assert_array_equal(almacen.fechas, dias)
+
+    mascara = (dias >= 5000) & (dias <= 5100)
+    np.testing.assert_array_equal(almacen.digitos_entre(fecha_desde_dia(5000), fecha_desde_dia(5100)),
+                                  almacen.numeros()[mascara].ravel())
+
+# ============ AÑADIDOS AL CSV ============
+def test_anadido_solo_ingiere_lo_nuevo(csv_numeros):
+    with open(csv_numeros, "a") as f:
+        f.writelines(f"{i % 10000:04d},24/01/2026\n" for i in range(20000))
+    ingerir_csv(str(csv_numeros))
+
+    with open(csv_numeros, "a") as f:
+        f.write("4321,25/01/2026\n")
+    resultado = ingerir_csv(str(csv_numeros))
+
+    assert not resultado["reconstruido"] and resultado["filas_nuevas"] == 1
+    assert resultado["filas"] == 20003
+    np.testing.assert_array_equal(cargar_digitos(str(csv_numeros))[-8:], digitos("9999", "4321"))
+
+@pytest.mark.parametrize("anadir", [b"", b"4321,25/01/2026\n"])
+def test_edicion_al_principio_reconstruye(csv_numeros, anadir):
+    with open(csv_numeros, "a") as f:
+        f.writelines(f"{i % 10000:04d},24/01/2026\n" for i in range(20000))
+    ingerir_csv(str(csv_numeros))
+
+    # Misma longitud y lejos del final: solo el CRC32 del prefijo entero lo detecta
+    contenido = csv_numeros.read_bytes()
+    csv_numeros.write_bytes(contenido.replace(b"0677,", b"0000,", 1) + anadir)
+
+    resultado = ingerir_csv(str(csv_numeros))
+    assert resultado["reconstruido"]
+    assert resultado["filas"] == 20002 + bool(anadir)
+    np.testing.assert_array_equal(cargar_digitos(str(csv_numeros))[:4], digitos("0000"))
+
+def test_cambio_al_final_de_lo_ingerido_reconstruye(csv_numeros):
+    ingerir_csv(str(csv_numeros))
+    contenido = csv_numeros.read_bytes()
+    csv_numeros.write_bytes(contenido.replace(b"1234", b"4321") + b"0042,26/01/2026\n")
+
+    resultado = ingerir_csv(str(csv_numeros))
+    assert resultado["reconstruido"]
+    np.testing.assert_array_equal(cargar_digitos(str(csv_numeros)), digitos("0677", "4321", "0042"))
+
+# ============ HISTÓRICO .npz ============
+def test_el_csv_manda_y_se_avisa_del_npz_antiguo(csv_numeros, capsys):
+    import os
+    from datos import abrir_historico, exportar_historico
+
+    ruta_npz = str(csv_numeros.parent / "historico.npz")
+    exportar_historico(str(csv_numeros), ruta_npz)
+    os.utime(ruta_npz, ns=(0, 0))
+    with open(csv_numeros, "a") as f:
+        f.write("0042,26/01/2026\n")
+
+    for _ in range(2):
+        historico = abrir_historico(str(csv_numeros), ruta_npz)
+    assert historico.filas == 3
+    assert capsys.readouterr().out.count("historico.npz es anterior") == 1
+
+    os.remove(csv_numeros)
+    assert abrir_historico(str(csv_numeros), ruta_npz).filas == 2
+
+@pytest.fixture
+def historico_npz(tmp_path):
+    from datos import exportar_historico
+
+    rng = np.random.default_rng(0)
+    ruta_csv = tmp_path / "numeros.csv"
+    with open(ruta_csv, "w") as f:
+        f.write("numero,fecha\n")
+        f.writelines(f"{n:04d},{1 + i % 28:02d}/01/2026\n" for i, n in enumerate(rng.integers(0, 10000, 1000)))
+    ruta = tmp_path / "historico.npz"
+    exportar_historico(str(ruta_csv), str(ruta))
+    return ruta_csv, ruta
+
+def test_historico_npz_igual_que_el_almacen(historico_npz):
+    from datos import abrir_almacen, cargar_historico
+
+    ruta_csv, ruta = historico_npz
+    almacen, historico = abrir_almacen(str(ruta_csv)), cargar_historico(str(ruta))
+    np.testing.assert_array_equal(historico.digitos, almacen.digitos)
+    np.testing.assert_array_equal(historico.fechas, almacen.fechas)
+    assert (historico.generacion, historico.fechas_ordenadas) == (almacen.generacion, almacen.fechas_ordenadas)
+
+def _reescribir(ruta, version=None, digitos=None):
+    """Volver a guardar el .npz cambiando la versión de la cabecera o los dígitos"""
+    import json
+
+    with np.load(ruta) as datos:
+        cabecera, columnas = json.loads(str(datos["cabecera"])), {k: datos[k] for k in ("digitos", "fechas")}
+    if version is not None:
+        cabecera["version"] = version
+    if digitos is not None:
+        columnas["digitos"] = digitos(columnas["digitos"])
+    np.savez(ruta, cabecera=json.dumps(cabecera), **columnas)
+
+def _invertir_byte(ruta):
+    datos = bytearray(ruta.read_bytes())
+    datos[len(datos) // 2] ^= 0xFF  # Dentro de las columnas
+    ruta.write_bytes(bytes(datos))
+
+@pytest.mark.parametrize("danar", [
+    _invertir_byte,
+    lambda ruta: ruta.write_bytes(ruta.read_bytes()[:len(ruta.read_bytes()) // 2]),
+    lambda ruta: ruta.write_bytes(b"PK\x03\x04 no es un zip"),
+    lambda ruta: _reescribir(ruta, version=99),
+    lambda ruta: _reescribir(ruta, digitos=lambda d: (d + 1) % 10),        # CRC32 distinto
+    lambda ruta: _reescribir(ruta, digitos=lambda d: d[:-1]),              # Tamaño distinto
+    lambda ruta: _reescribir(ruta, digitos=lambda d: d.astype(np.int64)),  # Tipo distinto
+], ids=["byte", "truncado", "zip", "version", "crc", "tamano", "tipo"])
+def test_historico_npz_danado_da_value_error(historico_npz, danar):
+    from datos import cargar_historico
+
+    _, ruta = historico_npz
+    danar(ruta)
+    with pytest.raises(ValueError):
+        cargar_historico(str(ruta))
+
+# ============ VALIDACIÓN ============
+@pytest.mark.parametrize("entrada, esperado", [
+    ("0677", "0677"), ("677", "0677"), (677, "0677"), (" 0677 ", "0677"),
+    ("0 6 7 7", "0677"), ([0, 6, 7, 7], "0677"), ((1, 2, 3, 4), "1234"), ("5", "0005"),
+])
+def test_validar_numero(entrada, esperado):
+    assert validar_numero(entrada) == esperado
+
+@pytest.mark.parametrize("entrada", ["", "12345", "12a4", "-1", "٣٣", [0, 6, 7], None])
+def test_validar_numero_invalido(entrada):
+    with pytest.raises(ValueError):
+        validar_numero(entrada)
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("15/01/2024", "2024-01-15"), ("2024-01-15", "2024-01-15"), (" 5/1/2024 ", "2024-01-05"),
+])
+def test_validar_fecha(entrada, esperado):
+    assert validar_fecha(entrada) == esperado
+
+@pytest.mark.parametrize("entrada", ["31/02/2024", "2024/01/15", "15-01", "hoy"])
+def test_validar_fecha_invalida(entrada):
+    with pytest.raises(ValueError):
+        validar_fecha(entrada)
+
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])  # Excel guarda el CSV con BOM
+def test_ingesta_e_importacion_aceptan_las_mismas_filas(bd, tmp_path, bom):
+    import contextlib
+    import io
+    import database
+
+    ruta = tmp_path / "numeros.csv"
+    ruta.write_bytes(bom + b"numero,fecha\n677,24/01/2026\n0042,2026-01-25\n12345,26/01/2026\n"
+                     b"7,31/02/2026\n\xff7,27/01/2026\n")
+
+    ingesta = ingerir_csv(str(ruta))
+    with contextlib.redirect_stdout(io.StringIO()):
+        importacion = database.importar_resultados_csv(str(ruta))
+
+    assert ingesta["filas"] == importacion["guardados"] == 2
+    assert [e["linea"] - 1 for e in ingesta["detalle_errores"]] == [e["fila"] for e in importacion["errores"]]
+    np.testing.assert_array_equal(cargar_digitos(str(ruta)), digitos("0677", "0042"))
+    assert database.obtener_resultado_por_fecha("2026-01-24")["numeros"] == "0677"
+
+# ============ ESCRITURA ATÓMICA ============
+def test_escrituras_simultaneas_no_comparten_temporal(tmp_path):
+    ruta = tmp_path / "historico.npz"
+    with escritura_atomica(str(ruta)) as primera, escritura_atomica(str(ruta)) as segunda:
+        primera.write(b"primera")
+        segunda.write(b"segunda")
+    assert ruta.read_bytes() == b"primera"  # La última en cerrarse sustituye a la otra entera
+    assert [p.name for p in tmp_path.iterdir()] == ["historico.npz"]
+
+def test_escritura_fallida_conserva_el_original(tmp_path):
+    ruta = tmp_path / "numeros.almacen.json"
+    ruta.write_text("anterior")
+    with pytest.raises(RuntimeError):
+        with escritura_atomica(str(ruta), "w") as f:
+            f.write("a medias")
+            raise RuntimeError("disco lleno")
+    assert ruta.read_text() == "anterior"
+    assert [p.name for p in tmp_path.iterdir()] == ["numeros.almacen.json"]
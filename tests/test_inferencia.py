@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+
+from inferencia import DESVIACION_RUIDO, MotorPrediccion, probabilidades_digito
+
+def test_probabilidades_digito_como_math_erf():
+    valores = np.linspace(-1, 10, 111)
+    probabilidades = probabilidades_digito(valores)
+
+    bordes = np.arange(0.5, 9, 1.0)
+    esperado = np.array([[0.5 * (1 + math.erf((b - v) / (DESVIACION_RUIDO * math.sqrt(2)))) for b in bordes]
+                         for v in valores])
+    esperado = np.diff(np.hstack([np.zeros((len(valores), 1)), esperado, np.ones((len(valores), 1))]), axis=1)
+
+    assert probabilidades.shape == (111, 10) and probabilidades.dtype == np.float64
+    np.testing.assert_allclose(probabilidades, esperado, atol=1e-15)
+    np.testing.assert_allclose(probabilidades.sum(axis=1), 1)
+
+def test_probabilidades_digito_lote_vacio():
+    assert probabilidades_digito(np.zeros(0)).shape == (0, 10)
+
+def test_importar_inferencia_no_carga_scipy():
+    import subprocess
+    import sys
+
+    codigo = "import sys, inferencia; print('scipy' in sys.modules)"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == "False"
+
+def predecir_falso(ventanas):
+    """Modelo determinista de prueba: ventanas (n, 5) -> valor (n,) en escala 0-9"""
+    return (ventanas * [1, 3, 7, 2, 5]).sum(axis=1) % 97 / 10.0
+
+def test_puntuar_secuencias_como_fuerza_bruta(tmp_path):
+    ruta = tmp_path / "numeros.csv"
+    ruta.write_text("numero,fecha\n0677,24/01/2026\n1234,25/01/2026\n")
+    motor = MotorPrediccion(predecir_falso, str(ruta))
+
+    # Probabilidad de cada una de las 10.000 secuencias, paso a paso
+    secuencias = np.array([[int(c) for c in f"{i:04d}"] for i in range(10000)])
+    ventanas = np.tile(motor.digitos[-5:].astype(np.int64), (10000, 1))
+    probabilidad = np.ones(10000)
+    for paso in range(4):
+        probabilidad *= probabilidades_digito(predecir_falso(ventanas))[np.arange(10000), secuencias[:, paso]]
+        ventanas = np.hstack([ventanas[:, 1:], secuencias[:, paso:paso + 1]])
+    orden = np.argsort(-probabilidad, kind="stable")[:20]
+
+    top = motor.puntuar_secuencias(20)
+    assert [t["secuencia"] for t in top] == [f"{i:04d}" for i in orden]
+    np.testing.assert_allclose([t["probabilidad"] for t in top], probabilidad[orden].round(6))
+    assert motor.puntuar_secuencias(5, haz=10000) == top[:5]
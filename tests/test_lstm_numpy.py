@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from lstm_numpy import ModeloNumpy, exportar_pesos
+
+tf = pytest.importorskip("tensorflow")
+from sklearn.preprocessing import MinMaxScaler
+
+@pytest.fixture(scope="module")
+def modelo_keras():
+    """Modelo pequeño con las mismas capas que entrenar_modelo.py y pesos aleatorios"""
+    from tensorflow.keras import Input, Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+
+    tf.keras.utils.set_random_seed(0)
+    model = Sequential([
+        Input(shape=(5, 1)),
+        LSTM(8, return_sequences=True),
+        Dropout(0.2),
+        LSTM(8),
+        Dropout(0.2),
+        Dense(4, activation="relu"),
+        Dense(1),
+    ])
+    scaler = MinMaxScaler().fit(np.arange(10).reshape(-1, 1))
+    return model, scaler
+
+def test_equivalente_a_keras(modelo_keras, tmp_path):
+    model, scaler = modelo_keras
+    ruta = str(tmp_path / "modelo.npz")
+    exportar_pesos(model, scaler, ruta)
+    modelo_numpy = ModeloNumpy(ruta)
+
+    rng = np.random.default_rng(0)
+    entradas = np.concatenate([
+        rng.random((64, 5, 1)),
+        scaler.transform(rng.integers(0, 10, (64 * 5, 1))).reshape(64, 5, 1),
+    ]).astype(np.float32)
+
+    esperado = model.predict(entradas, verbose=0)
+    np.testing.assert_allclose(modelo_numpy(entradas), esperado, atol=1e-5)
+
+def capas_lstm_secuencia():
+    from tensorflow.keras.layers import LSTM, Dense
+    return [LSTM(8, return_sequences=True), Dense(1)]
+
+def capas_sin_bias():
+    from tensorflow.keras.layers import LSTM, Dense
+    return [LSTM(8, return_sequences=True, use_bias=False), LSTM(8),
+            Dense(4, activation="tanh", use_bias=False), Dense(1)]
+
+@pytest.mark.parametrize("capas", [capas_lstm_secuencia, capas_sin_bias])
+def test_otras_configuraciones_equivalentes_a_keras(capas, tmp_path):
+    from tensorflow.keras import Input, Sequential
+
+    tf.keras.utils.set_random_seed(0)
+    model = Sequential([Input(shape=(5, 1)), *capas()])
+    scaler = MinMaxScaler().fit(np.arange(10).reshape(-1, 1))
+    ruta = str(tmp_path / "modelo.npz")
+    exportar_pesos(model, scaler, ruta)
+
+    entradas = np.random.default_rng(0).random((32, 5, 1)).astype(np.float32)
+    esperado = model.predict(entradas, verbose=0)
+    salida = ModeloNumpy(ruta)(entradas)
+    assert salida.shape == esperado.shape
+    np.testing.assert_allclose(salida, esperado, atol=1e-5)
+
+def test_escalador_equivalente(modelo_keras, tmp_path):
+    model, scaler = modelo_keras
+    ruta = str(tmp_path / "modelo.npz")
+    exportar_pesos(model, scaler, ruta)
+    escalador = ModeloNumpy(ruta).escalador
+
+    muestra = np.random.default_rng(1).random((10, 1)) * 9
+    np.testing.assert_allclose(escalador.transform(muestra), scaler.transform(muestra))
+    np.testing.assert_allclose(escalador.inverse_transform(muestra), scaler.inverse_transform(muestra))
+
+@pytest.mark.parametrize("capa", [
+    lambda: tf.keras.layers.GRU(4),
+    lambda: tf.keras.layers.LSTM(4, go_backwards=True),
+    lambda: tf.keras.layers.LSTM(4, activation="relu"),
+    lambda: tf.keras.layers.Dense(4, activation="softmax"),
+], ids=["gru", "go_backwards", "activacion_lstm", "activacion_dense"])
+def test_capa_no_soportada(capa, tmp_path):
+    from tensorflow.keras import Input, Sequential
+    from tensorflow.keras.layers import Dense
+
+    model = Sequential([Input(shape=(5, 1)), capa(), Dense(1)])
+    scaler = MinMaxScaler().fit(np.arange(10).reshape(-1, 1))
+    with pytest.raises(ValueError):
+        exportar_pesos(model, scaler, str(tmp_path / "modelo.npz"))